@@ -0,0 +1,241 @@
+"""Latency and D-Bus call counts for the CLI and dashboard hot paths.
+
+Each unit count gets a fresh fake systemd (tests/fake_systemd.py)
+preloaded with that many ww-* units plus --noise unrelated ones. Cases:
+
+  cli_ps, cli_ps_async        `ww ps` as a subprocess (fast path / WW_FASTPATH=0)
+  cli_status                  `ww status <name>` as a subprocess
+  cli_ps_agent, cli_status_agent   the same, answered by a `ww agent` on the fake
+  resolve_name/pid/unit       api.Client.resolve() on a warm client
+  pick_free_name              launch.pick_free_name() on one listing, --collisions existing -N units
+  discover                    dash discover_services_ww()
+  dash_rebuild_table          WWDashApp._rebuild_table() (headless app)
+  dash_visible_search         WWDashApp._visible_indices() with a search query
+  dash_refresh_cycle          WWDashApp._refresh_statuses() (one polling pass)
+
+Calls are the D-Bus method calls the fake handled during one iteration.
+
+    python benchmarks/bench_suite.py                       # 10/100/1000 units
+    python benchmarks/bench_suite.py -u 100 --save base.json
+    python benchmarks/bench_suite.py --compare base.json   # exit 1 on regression
+
+A case regresses when its p50 grows by more than --tolerance (default 25%)
+or when it makes more D-Bus calls than the baseline; call counts do not
+depend on the machine, so they are the reliable signal across hosts.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from watchfiles_systemd import launch
+from watchfiles_systemd.api import Client
+from watchfiles_systemd.dash.app import WWDashApp
+from watchfiles_systemd.dash.discovery_ww import discover_services_ww
+from watchfiles_systemd.dash.models import AppState
+from watchfiles_systemd.systemd_bus import SystemdClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tests"))
+from fake_systemd import FakeSystemd  # noqa: E402
+
+WW = [sys.executable, "-c", "import sys; from watchfiles_systemd.entry import main; sys.argv[0] = 'ww'; main()"]
+
+
+def _stats(samples: list[float], calls: dict[str, int]) -> dict[str, Any]:
+    s = sorted(samples)
+    return {
+        "n": len(s),
+        "p50_ms": round(statistics.median(s), 3),
+        "p95_ms": round(s[min(len(s) - 1, int(len(s) * 0.95))], 3),
+        "min_ms": round(s[0], 3),
+        "max_ms": round(s[-1], 3),
+        "mean_ms": round(statistics.fmean(s), 3),
+        "dbus_calls": sum(calls.values()),
+        "calls": dict(sorted(calls.items())),
+    }
+
+
+async def _measure(
+    fake: FakeSystemd,
+    fn: Callable[[], Awaitable[Any]],
+    repeat: int,
+    settle: Callable[[], Awaitable[Any]] | None = None,
+) -> dict[str, Any]:
+    """Time fn; calls are counted on one iteration after a warm-up.
+
+    settle lets follow-up work (e.g. Textual message handlers) finish so it
+    is not attributed to the counted iteration.
+    """
+    await fn()
+    if settle is not None:
+        await settle()
+    fake.calls.clear()
+    await fn()
+    if settle is not None:
+        await settle()
+    calls = dict(fake.calls)
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return _stats(samples, calls)
+
+
+def _cli(fake: FakeSystemd, *argv: str, **env: str) -> Callable[[], Awaitable[None]]:
+    # Never let a real agent on this host answer for the fake
+    full_env = {**os.environ, "WW_AGENT": "0", **fake.env(), **env}
+
+    async def run() -> None:
+        proc = await asyncio.create_subprocess_exec(
+            *WW, *argv, env=full_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        await proc.wait()
+
+    return run
+
+
+async def _bench_units(n: int, args: argparse.Namespace) -> dict[str, dict[str, Any]]:
+    out: dict[str, dict[str, Any]] = {}
+    with FakeSystemd(units=n, noise=args.noise, latency=args.latency_ms / 1000) as fake:
+        os.environ.update(fake.env())
+        # The dashboard's shared connection belongs to the previous fake (and loop)
+        Client.shared().close()
+        client = await SystemdClient.connect()
+        ww = Client(client)
+        mid = f"ww-unit{n // 2}.service"
+        mid_pid = fake.units[mid].main_pid
+
+        async def case(name: str, fn, repeat: int = args.repeat, settle=None) -> None:
+            out[name] = await _measure(fake, fn, repeat, settle)
+            r = out[name]
+            print(
+                f"{n:>5} {name:<22} p50 {r['p50_ms']:9.2f} ms  p95 {r['p95_ms']:9.2f} ms  calls {r['dbus_calls']:>5}",
+                flush=True,
+            )
+
+        await case("cli_ps", _cli(fake, "ps"), args.cli_repeat)
+        await case("cli_ps_async", _cli(fake, "ps", WW_FASTPATH="0"), args.cli_repeat)
+        await case("cli_status", _cli(fake, "status", f"unit{n // 2}"), args.cli_repeat)
+        with tempfile.TemporaryDirectory() as rt:
+            agent = subprocess.Popen(
+                [*WW, "agent"], env={**os.environ, **fake.env(), "XDG_RUNTIME_DIR": rt}, stderr=subprocess.PIPE
+            )
+            agent.stderr.readline()  # "ww agent: ... serving" once the cache is loaded
+            via_agent = {"XDG_RUNTIME_DIR": rt, "WW_AGENT": "1"}
+            await case("cli_ps_agent", _cli(fake, "ps", **via_agent), args.cli_repeat)
+            await case("cli_status_agent", _cli(fake, "status", f"unit{n // 2}", **via_agent), args.cli_repeat)
+            agent.terminate()
+            agent.wait()
+
+        await case("resolve_name", lambda: ww.resolve(f"unit{n // 2}"))
+        await case("resolve_pid", lambda: ww.resolve(str(mid_pid + 1)))
+        await case("resolve_unit", lambda: ww.resolve(mid))
+
+        await case("discover", lambda: discover_services_ww([Path("/srv")], client=client))
+
+        state = AppState(roots=[Path("/srv")])
+        state.services = await discover_services_ww(state.roots, client=client)
+        app = WWDashApp(state=state)
+        # No status stream in the background: the refresh case drives polling itself
+        app._watch_status = _idle  # type: ignore[method-assign]
+        app._start_follow = _idle_follow  # type: ignore[method-assign]
+        async with app.run_test(size=(160, 50)) as pilot:
+
+            async def rebuild() -> None:
+                app._rebuild_table()
+
+            async def search() -> None:
+                app.state.search = "unit1"
+                app._visible_indices()
+                app.state.search = ""
+
+            await case("dash_rebuild_table", rebuild, settle=pilot.pause)
+            await case("dash_visible_search", search, settle=pilot.pause)
+            await case("dash_refresh_cycle", app._refresh_statuses, settle=pilot.pause)
+
+        # Last: the extra units would skew the cases above
+        fake.add_units(["ww-dup.service"] + [f"ww-dup-{i}.service" for i in range(2, args.collisions + 1)])
+
+        async def pick() -> None:
+            launch.pick_free_name((u.name for u in await client.list_ww_units()), "dup")
+
+        await case("pick_free_name", pick)
+        client.disconnect()
+        Client.shared().close()
+    return out
+
+
+async def _idle() -> None:
+    return None
+
+
+async def _idle_follow(*_args, **_kwargs) -> None:
+    return None
+
+
+def _compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    problems = []
+    for key, cur in results["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        if cur["dbus_calls"] > base["dbus_calls"]:
+            problems.append(f"{key}: D-Bus calls {base['dbus_calls']} -> {cur['dbus_calls']}")
+        if base["p50_ms"] > 0 and cur["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            problems.append(f"{key}: p50 {base['p50_ms']:.2f} -> {cur['p50_ms']:.2f} ms")
+    return problems
+
+
+async def main(args: argparse.Namespace) -> int:
+    results: dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "host": platform.node(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "noise": args.noise,
+            "latency_ms": args.latency_ms,
+            "collisions": args.collisions,
+        },
+        "results": {},
+    }
+    for n in args.units:
+        for name, r in (await _bench_units(n, args)).items():
+            results["results"][f"{name}@{n}"] = r
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"saved {args.save}")
+    if args.compare:
+        problems = _compare(results, json.loads(Path(args.compare).read_text()), args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if problems:
+            return 1
+        print(f"no regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-u", "--units", type=int, nargs="+", default=[10, 100, 1000], help="unit counts to test")
+    ap.add_argument("-n", "--repeat", type=int, default=20, help="samples per in-process case")
+    ap.add_argument("--cli-repeat", type=int, default=5, help="samples per subprocess case")
+    ap.add_argument("--noise", type=int, default=100, help="non-ww units in ListUnits")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="artificial delay per D-Bus call")
+    ap.add_argument("--collisions", type=int, default=50, help="existing ww-dup[-N] units for pick_free_name")
+    ap.add_argument("--save", help="write results as JSON (a baseline)")
+    ap.add_argument("--compare", help="baseline JSON to check against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p50 growth")
+    sys.exit(asyncio.run(main(ap.parse_args())))
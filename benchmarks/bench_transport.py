@@ -0,0 +1,78 @@
+"""Compare session-bus vs private-socket latency for ps/status workloads.
+
+Runs against the live systemd user manager (or whatever DBUS_SESSION_BUS_ADDRESS
+/ XDG_RUNTIME_DIR point at). Each sample opens a fresh connection, like a
+one-shot `ww` invocation does.
+
+    python benchmarks/bench_transport.py -n 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from watchfiles_systemd.systemd_bus import SystemdClient, private_socket_path
+
+
+async def _ps(transport: str) -> None:
+    client = await SystemdClient.connect(transport)
+    try:
+        units = await client.list_ww_units()
+        for u in units:
+            await client.get_status(u.path, ("ActiveState", "SubState", "MainPID"))
+    finally:
+        client.disconnect()
+
+
+async def _status(transport: str, unit: str) -> None:
+    client = await SystemdClient.connect(transport)
+    try:
+        await client.get_status(
+            client.unit_path(unit), ("LoadState", "ActiveState", "SubState", "MainPID", "NRestarts", "Result")
+        )
+    finally:
+        client.disconnect()
+
+
+async def _sample(fn, *args, n: int) -> list[float]:
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await fn(*args)
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def _fmt(label: str, samples: list[float]) -> str:
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"{label:<20} p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   n={len(samples)}"
+
+
+async def main(n: int) -> None:
+    transports = ["session"]
+    if private_socket_path():
+        transports.append("private")
+    else:
+        print("private socket not accessible; measuring session bus only")
+
+    client = await SystemdClient.connect("session")
+    units = await client.list_ww_units()
+    client.disconnect()
+    print(f"{len(units)} ww units")
+    unit = units[0].name if units else "ww-missing.service"
+
+    for t in transports:
+        print(_fmt(f"ps [{t}]", await _sample(_ps, t, n=n)))
+        print(_fmt(f"status [{t}]", await _sample(_status, t, unit, n=n)))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", type=int, default=20, help="samples per measurement")
+    args = ap.parse_args()
+    asyncio.run(main(args.n))
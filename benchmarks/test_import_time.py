@@ -0,0 +1,103 @@
+"""Import-time budget for one-shot `ww` invocations.
+
+Runs `python -X importtime -m watchfiles_systemd ...` for commands that must
+stay light and fails when they pull in Typer/Click/Rich, dbus-next or asyncio,
+or when the imports triggered by the package take longer than the budget.
+The bus points at a socket that does not exist, so the commands fail fast
+after their imports (no systemd needed).
+
+    python -m pytest benchmarks/test_import_time.py
+    WW_IMPORT_BUDGET_MS=40 python -m pytest benchmarks/test_import_time.py
+
+The default budget leaves room for slow CI hosts; the heavy-module check is
+the part that does not depend on the machine.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+BUDGET_MS = float(os.getenv("WW_IMPORT_BUDGET_MS", "75"))
+HEAVY = ("typer", "click", "rich", "dbus_next", "asyncio", "textual", "importlib.metadata")
+
+LIGHT_COMMANDS = [
+    ["--version"],
+    ["ps"],
+    ["pid", "app"],
+    ["ww-app.service", "logs"],
+    ["ww-app.service", "restart"],
+    ["./app.py"],
+    ["__complete", "1", "logs", ""],
+]
+
+
+def _importtime(argv: list[str], tmp_path: Path) -> list[tuple[int, int, str]]:
+    """(self_us, cumulative_us, name) rows from -X importtime; name keeps its nesting indent."""
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [str(SRC), os.getenv("PYTHONPATH")])),
+        DBUS_SESSION_BUS_ADDRESS=f"unix:path={tmp_path / 'no-bus'}",
+        XDG_RUNTIME_DIR=str(tmp_path),
+        WW_BUS_TRANSPORT="session",
+    )
+    env.pop("WW_FASTPATH", None)
+    (tmp_path / "app.py").write_text("print('hi')\n")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "watchfiles_systemd", *argv],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cum_us, name = line.split("|", 2)
+        rows.append((int(head.split(":")[1]), int(cum_us), name[1:]))
+    return rows
+
+
+def _package_cost_ms(rows: list[tuple[int, int, str]]) -> float:
+    """Cumulative time of top-level imports from the package's first import onwards.
+
+    Interpreter start-up (site, encodings, runpy) is excluded; stdlib modules
+    imported lazily by ww code show up as top-level rows and are included.
+    """
+    total = 0
+    started = False
+    for _, cum_us, name in rows:
+        started = started or name.strip().startswith("watchfiles_systemd")
+        if started and not name.startswith(" "):
+            total += cum_us
+    return total / 1000
+
+
+@pytest.mark.parametrize("argv", LIGHT_COMMANDS, ids=" ".join)
+def test_light_commands_skip_heavy_imports(argv: list[str], tmp_path: Path) -> None:
+    loaded = {name.strip() for _, _, name in _importtime(argv, tmp_path)}
+    heavy = sorted(m for m in loaded if m.split(".")[0] in HEAVY or m in HEAVY)
+    assert not heavy, f"`ww {' '.join(argv)}` imported {heavy}"
+
+
+@pytest.mark.parametrize("argv", LIGHT_COMMANDS, ids=" ".join)
+def test_import_budget(argv: list[str], tmp_path: Path) -> None:
+    # Best of three: the first run also pays for writing __pycache__
+    cost = min(_package_cost_ms(_importtime(argv, tmp_path)) for _ in range(3))
+    assert cost <= BUDGET_MS, f"`ww {' '.join(argv)}` spent {cost:.1f} ms importing (budget {BUDGET_MS:g} ms)"
+
+
+def test_complete_from_fresh_index_loads_nothing_else(tmp_path: Path) -> None:
+    # Every Tab runs this: with a fresh index it must not touch the bus modules
+    (tmp_path / "ww").mkdir()
+    (tmp_path / "ww" / "units.idx").write_text("ww-api.service\tapi\t4242\n")
+    loaded = {name.strip() for _, _, name in _importtime(["__complete", "1", "logs", "a"], tmp_path)}
+    ours = sorted(m for m in loaded if m.startswith("watchfiles_systemd."))
+    assert ours == ["watchfiles_systemd.complete", "watchfiles_systemd.entry"], ours
@@ -1,18 +1,6 @@
 __all__ = ["__version__"]
 
-# Derive version from installed package metadata to avoid drift with pyproject.toml
-try:
-    from importlib.metadata import version as _pkg_version
-except Exception:  # pragma: no cover
-    _pkg_version = None  # type: ignore
-
-def _detect_version() -> str:
-    try:
-        if _pkg_version is None:
-            return "0.0.0+dev"
-        return _pkg_version("watchfiles-systemd")
-    except Exception:
-        # Fallback for editable/dev checkouts
-        return "0.0.0+dev"
-
-__version__ = _detect_version()
+# The single source of the version: pyproject.toml reads it from here at build
+# time (tool.setuptools.dynamic), so there is nothing to look up at runtime and
+# `ww --version` stays as cheap as any other fast-path command.
+__version__ = "0.1.23"
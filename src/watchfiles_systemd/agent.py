@@ -0,0 +1,319 @@
+"""`ww agent`: a resident per-user process that keeps one systemd connection.
+
+The agent holds a SystemdClient plus a signal-fed UnitCache and answers
+requests on $XDG_RUNTIME_DIR/ww/agent.sock, one JSON object per line:
+
+    -> {"op": "get_statuses", "paths": [...], "fields": ["MainPID"]}
+    <- {"ok": true, "result": [{"MainPID": 1234}]}
+    <- {"ok": false, "error": {"type": "org.freedesktop...", "text": "..."}}
+
+The ops are the methods of syncbus.SyncSystemdClient, and AgentClient
+implements that same interface over the socket, so the short commands and
+`ww <path>` just take whichever client connect() returns. Listings and
+status reads come from memory; GetUnitByPID, jobs and properties the cache
+does not track go to systemd.
+
+Only the client half is loaded by one-shot commands: asyncio and dbus-next
+are imported inside serve().
+"""
+
+import json
+import os
+import socket
+import sys
+from typing import Any, Iterable, Optional
+
+from . import trace as _trace
+from .syncbus import DEFAULT_CALL_TIMEOUT, BusError, SyncSystemdClient, _split
+from .units import (
+    IFACE_MANAGER,
+    STATUS_PROPS,
+    SYSTEMD_DEST,
+    SYSTEMD_PATH,
+    UnitRow,
+    unit_name_from_path,
+    unit_object_path,
+)
+
+# Manager methods the agent runs jobs for (run_job op)
+JOB_METHODS = ("StartUnit", "StopUnit", "RestartUnit", "StartTransientUnit")
+AGENT_ERROR = "io.github.ww.Agent.Error"
+
+
+def socket_path() -> str:
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+    return os.path.join(runtime, "ww", "agent.sock")
+
+
+def connect(transport: Optional[str] = None):
+    """An AgentClient if an agent is listening, else a direct SyncSystemdClient.
+
+    WW_AGENT=0 skips the agent.
+    """
+    if os.getenv("WW_AGENT", "1") != "0":
+        try:
+            return AgentClient.connect()
+        except OSError:
+            pass
+    return SyncSystemdClient.connect(transport)
+
+
+class AgentClient:
+    """SyncSystemdClient look-alike that forwards every call to `ww agent`."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self._rfile = sock.makefile("rb")
+
+    @classmethod
+    def connect(cls, path: Optional[str] = None, timeout: float = DEFAULT_CALL_TIMEOUT) -> "AgentClient":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path or socket_path())
+        except OSError:
+            sock.close()
+            raise
+        return cls(sock)
+
+    def close(self) -> None:
+        try:
+            self._rfile.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self) -> "AgentClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def request(self, op: str, **params: Any) -> Any:
+        """Send one request and return its result; error replies raise BusError."""
+        data = json.dumps({"op": op, **params}, separators=(",", ":")).encode() + b"\n"
+        with _trace.span("agent", op, "", len(data)) as s:
+            self.sock.sendall(data)
+            line = self._rfile.readline()
+            if not line:
+                raise ConnectionError("ww agent closed the connection")
+            if s is not None:
+                s.bytes_in = len(line)
+            reply = json.loads(line)
+            if not reply.get("ok") and s is not None:
+                s.outcome = "error"
+        if not reply.get("ok"):
+            err = reply.get("error") or {}
+            raise BusError(err.get("type", AGENT_ERROR), err.get("text", "ww agent request failed"))
+        return reply.get("result")
+
+    def ping(self) -> dict[str, Any]:
+        return self.request("ping")
+
+    def get_unit_by_pid(self, pid: int) -> Optional[str]:
+        return self.request("get_unit_by_pid", pid=pid)
+
+    def list_ww_units(self, states: Iterable[str] = ()) -> list[UnitRow]:
+        return [UnitRow(*row) for row in self.request("list_ww_units", states=list(states))]
+
+    def get_statuses(self, paths: Iterable[str], fields: Iterable[str]) -> list[dict[str, Any]]:
+        return self.request("get_statuses", paths=list(paths), fields=list(fields))
+
+    def get_status(self, unit_name: str, fields: Iterable[str]) -> dict[str, Any]:
+        return self.get_statuses([unit_object_path(unit_name)], fields)[0]
+
+    def reset_failed_unit(self, unit_name: str) -> None:
+        self.request("reset_failed_unit", unit=unit_name)
+
+    def run_job(
+        self, method: str, signature: str, args: Iterable[Any], timeout: Optional[float]
+    ) -> tuple[str, Optional[str]]:
+        # The reply only comes once the job is done: wait as long as the job may take
+        self.sock.settimeout(None if timeout is None else timeout + DEFAULT_CALL_TIMEOUT)
+        try:
+            job, result = self.request("run_job", method=method, signature=signature, args=list(args), timeout=timeout)
+        finally:
+            self.sock.settimeout(DEFAULT_CALL_TIMEOUT)
+        return job, result
+
+    def run_jobs(
+        self, calls: Iterable[tuple[str, str, Iterable[Any]]], timeout: Optional[float]
+    ) -> list[tuple[Optional[str], Optional[str], Optional[BusError]]]:
+        self.sock.settimeout(None if timeout is None else timeout + DEFAULT_CALL_TIMEOUT)
+        try:
+            rows = self.request(
+                "run_jobs", calls=[[m, sig, list(args)] for m, sig, args in calls], timeout=timeout
+            )
+        finally:
+            self.sock.settimeout(DEFAULT_CALL_TIMEOUT)
+        return [(job, result, BusError(err["type"], err["text"]) if err else None) for job, result, err in rows]
+
+
+# -- server ------------------------------------------------------------------
+
+
+class _Agent:
+    def __init__(self, client, cache):
+        self.client = client
+        self.cache = cache
+
+    async def handle_connection(self, reader, writer) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(json.dumps(await self.dispatch(line), separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # client went away, or a line over the reader limit
+        finally:
+            writer.close()
+
+    async def dispatch(self, line: bytes) -> dict[str, Any]:
+        from dbus_next import DBusError
+
+        try:
+            req = json.loads(line)
+            op = req.pop("op")
+            fn = getattr(self, f"op_{op}", None)
+            if fn is None:
+                raise ValueError(f"unknown op: {op!r}")
+            return {"ok": True, "result": await fn(**req)}
+        except DBusError as e:
+            return {"ok": False, "error": {"type": e.type, "text": e.text}}
+        except Exception as e:
+            return {"ok": False, "error": {"type": AGENT_ERROR, "text": str(e) or type(e).__name__}}
+
+    async def op_ping(self) -> dict[str, Any]:
+        return {"pid": os.getpid(), "units": len(self.cache), "direct": self.client.direct}
+
+    async def op_get_unit_by_pid(self, pid: int) -> Optional[str]:
+        return await self.client.get_unit_by_pid(int(pid))
+
+    async def op_list_ww_units(self, states: list[str] = ()) -> list[list[str]]:
+        rows = []
+        for name in self.cache.names():
+            st = self.cache.get(name)
+            if not states or st.active_state in states or st.sub_state in states:
+                rows.append([name, st.active_state, st.sub_state, st.path])
+        return rows
+
+    async def op_get_statuses(self, paths: list[str], fields: list[str]) -> list[dict[str, Any]]:
+        cached = set(fields) <= set(self.cache.FIELDS)
+        out = []
+        for path in paths:
+            st = self.cache.get(unit_name_from_path(path) or "") if cached else None
+            if st is None:
+                st = await self.client.get_status(path, fields)
+            values = {key: getattr(st, STATUS_PROPS[key][1]) for key in fields}
+            out.append({k: v for k, v in values.items() if v is not None and v != ""})
+        return out
+
+    async def op_reset_failed_unit(self, unit: str) -> None:
+        await self.client.reset_failed_unit(unit)
+        await self.cache.refresh(unit)
+
+    async def op_run_job(self, method: str, signature: str, args: list[Any], timeout: Optional[float]) -> list[Any]:
+        from dbus_next import DBusError, Message, MessageType
+
+        from .systemd_bus import to_dbus
+
+        if method not in JOB_METHODS:
+            raise ValueError(f"not a job method: {method}")
+        await self.client.subscribe()
+        body = [to_dbus(t, a) for t, a in zip(_split(signature), args)]
+        reply = await self.client.bus.call(
+            Message(
+                destination=SYSTEMD_DEST,
+                path=SYSTEMD_PATH,
+                interface=IFACE_MANAGER,
+                member=method,
+                signature=signature,
+                body=body,
+            )
+        )
+        if reply.message_type == MessageType.ERROR:
+            raise DBusError(reply.error_name, reply.body[0] if reply.body else "")
+        job = reply.body[0]
+        result = await self.client.wait_job(job, timeout)
+        # Reads right after the job must not see the state from before it
+        await self.cache.refresh(args[0])
+        return [job, result]
+
+    async def op_run_jobs(self, calls: list[list[Any]], timeout: Optional[float]) -> list[list[Any]]:
+        """op_run_job for each [method, signature, args], concurrently; errors stay per call."""
+        import asyncio
+
+        from dbus_next import DBusError
+
+        done = await asyncio.gather(
+            *(self.op_run_job(method, signature, args, timeout) for method, signature, args in calls),
+            return_exceptions=True,
+        )
+        out = []
+        for item in done:
+            if isinstance(item, DBusError):
+                out.append([None, None, {"type": item.type, "text": item.text}])
+            elif isinstance(item, BaseException):
+                out.append([None, None, {"type": AGENT_ERROR, "text": str(item) or type(item).__name__}])
+            else:
+                out.append([*item, None])
+        return out
+
+
+def _claim(path: str) -> None:
+    """Create the socket directory; remove a stale socket, refuse a live one."""
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"another ww agent is already serving {path}")
+
+
+async def serve(path: Optional[str] = None, transport: Optional[str] = None) -> None:
+    """Run the agent until SIGINT/SIGTERM or until the systemd connection drops."""
+    import asyncio
+    import signal
+
+    from .systemd_bus import SystemdClient, UnitCache
+
+    path = path or socket_path()
+    _claim(path)
+    client = await SystemdClient.connect(transport)
+    cache = await UnitCache(client).start()
+    agent = _Agent(client, cache)
+    # StartTransientUnit requests carry the whole environment
+    server = await asyncio.start_unix_server(agent.handle_connection, path, limit=1 << 20)
+    os.chmod(path, 0o600)
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    print(f"ww agent: {len(cache)} units, serving {path}", file=sys.stderr, flush=True)
+    try:
+        lost = asyncio.ensure_future(client.bus.wait_for_disconnect())
+        stopped = asyncio.ensure_future(stop.wait())
+        await asyncio.wait([lost, stopped], return_when=asyncio.FIRST_COMPLETED)
+        stopped.cancel()
+        if lost.done():
+            err = lost.exception()
+            print(f"ww agent: lost the systemd connection{f': {err}' if err else ''}", file=sys.stderr)
+        else:
+            lost.cancel()
+    finally:
+        server.close()
+        cache.stop()
+        client.disconnect()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
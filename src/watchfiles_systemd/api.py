@@ -0,0 +1,290 @@
+"""Async Python API: what `ww` and `ww dash` do, for embedding.
+
+    from watchfiles_systemd.api import Client
+
+    async with Client() as ww:
+        started = await ww.start("services/api")
+        await ww.restart("api")
+        for row in await ww.ps():
+            print(row.name, row.pid, row.state)
+        async for line in ww.logs("api", follow=True):
+            ...
+
+A Client holds one connection to the systemd user manager and opens it on
+first use. It reconnects if the connection dropped or the client is used
+from another event loop. Client.shared() is the process-wide instance
+(`ww dash` uses it). Status reads for many units go out together on that
+connection instead of one round trip each.
+
+Identifiers are the CLI's: a friendly name (`api`), a PID (any process in
+the unit) or a unit name (`ww-api.service`). resolve() raises
+IdentifierError (a RuntimeError) for ones that match nothing or several
+units. The job methods wait for systemd to finish the job and return a
+JobResult (job_error() explains a failed or unfinished one). D-Bus failures
+propagate as dbus_next.DBusError.
+"""
+
+import asyncio
+import subprocess
+import time
+from pathlib import Path
+from typing import AsyncIterator, Iterable, NamedTuple, Optional, Union
+
+from . import trace as _trace
+from .launch import MATCH_FIELDS, candidate_statuses, plan_starts, start_candidates, transient_properties
+from .systemd_bus import JOB_STATUS_FIELDS, JobResult, SystemdClient, UnitStatus, to_dbus
+from .units import (
+    JOB_TIMEOUT,
+    STATUS_FIELDS,
+    UnitRow,
+    display_state,
+    friendly_from_unit,
+    is_ww_unit,
+    journal_argv,
+)
+from .util import resolve_target, to_slug, unit_name_from_slug
+
+__all__ = [
+    "Client",
+    "IdentifierError",
+    "JobResult",
+    "PsRow",
+    "StartResult",
+    "UnitRow",
+    "UnitStatus",
+    "display_state",
+    "friendly_from_unit",
+    "job_error",
+]
+
+# Properties `ww ps` reads per unit; the states come with the listing
+PS_FIELDS = ("MainPID",)
+
+
+class IdentifierError(RuntimeError):
+    """An identifier that matches no ww unit, or more than one."""
+
+
+class PsRow(NamedTuple):
+    """One `ww ps` line."""
+
+    name: str
+    pid: int
+    state: str  # display_state()
+    unit: str
+
+
+class StartResult(NamedTuple):
+    """Outcome of Client.start(); result is None when reused or still running."""
+
+    unit: str
+    action: str  # "started" | "restarted" | "reused"
+    result: Optional[str]
+    status: UnitStatus
+    elapsed: float
+
+    @property
+    def ok(self) -> bool:
+        return self.action == "reused" or self.result == "done"
+
+
+def job_error(res: Union[JobResult, StartResult], timeout: float) -> Optional[str]:
+    """Human-readable problem with a finished job, or None if it succeeded."""
+    if res.ok:
+        return None
+    if res.result is None:
+        return f"{res.unit}: job still running after {timeout:g}s"
+    return f"{res.unit}: job {res.result}"
+
+
+class Client:
+    """Async access to ww units over one (re)connecting systemd connection.
+
+    Pass systemd to share an existing SystemdClient. It is then used as
+    is, never reconnected, and close() leaves it open.
+    """
+
+    _shared: Optional["Client"] = None
+
+    def __init__(self, systemd: Optional[SystemdClient] = None, transport: Optional[str] = None):
+        self._transport = transport
+        self._given = systemd
+        self._conn: Optional["asyncio.Future[SystemdClient]"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def shared(cls) -> "Client":
+        """The process-wide Client (connects on first use)."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    async def __aenter__(self) -> "Client":
+        await self.systemd()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    def _stale(self, loop: asyncio.AbstractEventLoop) -> bool:
+        if self._conn is None or self._loop is not loop:
+            return True
+        if not self._conn.done():
+            return False
+        return self._conn.cancelled() or self._conn.exception() is not None or not self._conn.result().bus.connected
+
+    async def systemd(self) -> SystemdClient:
+        """The underlying SystemdClient, connected (concurrent callers share one attempt)."""
+        if self._given is not None:
+            return self._given
+        loop = asyncio.get_running_loop()
+        if self._stale(loop):
+            self.close()
+            self._conn = asyncio.ensure_future(SystemdClient.connect(self._transport))
+            self._loop = loop
+        return await asyncio.shield(self._conn)
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if not conn.done():
+            conn.cancel()
+        elif not conn.cancelled() and conn.exception() is None:
+            conn.result().disconnect()
+
+    # -- lookup -----------------------------------------------------------
+
+    async def units(self, states: Iterable[str] = ()) -> list[UnitRow]:
+        """Loaded ww-* units (optionally only those in states)."""
+        return await (await self.systemd()).list_ww_units(states)
+
+    async def resolve(self, ident: str, unloaded: bool = False) -> str:
+        """Unit name for a friendly name, PID or unit name.
+
+        Unit names are returned as given (no round trip), so they may name
+        a unit that is not loaded. With unloaded, so does a friendly name
+        that matches no loaded unit: it becomes ww-<name>.service, the unit
+        `ww <name>` would start.
+        """
+        if ident.endswith(".service") or ident.startswith("ww-"):
+            return ident if ident.endswith(".service") else f"{ident}.service"
+        client = await self.systemd()
+        if ident.isdigit():
+            # Any process in the unit's cgroup (wrapper or the app itself)
+            unit = await client.get_unit_by_pid(int(ident))
+            if unit is None or not is_ww_unit(unit):
+                raise IdentifierError(f"No ww-* unit with PID {ident}")
+            return unit
+        matches = [u.name for u in await client.list_ww_units() if friendly_from_unit(u.name) == ident]
+        if len(matches) == 1:
+            return matches[0]
+        if len(matches) > 1:
+            raise IdentifierError(f"Ambiguous name '{ident}'. Candidates: {', '.join(matches)}")
+        if unloaded:
+            return unit_name_from_slug(to_slug(ident))
+        raise IdentifierError(f"Not found: {ident}")
+
+    async def status(self, ident: str, fields: Iterable[str] = STATUS_FIELDS) -> UnitStatus:
+        """Status of one unit; check .found (when LoadState is among fields) for a unit that is not loaded."""
+        client = await self.systemd()
+        return await client.get_status(client.unit_path(await self.resolve(ident)), fields)
+
+    async def statuses(self, units: Iterable[str], fields: Iterable[str] = STATUS_FIELDS) -> list[UnitStatus]:
+        """Status of many units by unit name, all requests in flight at once; in the order given."""
+        client = await self.systemd()
+        fields = tuple(fields)
+        return list(await asyncio.gather(*(client.get_status(client.unit_path(u), fields) for u in units)))
+
+    async def ps(self) -> list[PsRow]:
+        """The `ww ps` table."""
+        units = await self.units()
+        statuses = await self.statuses((u.name for u in units), PS_FIELDS)
+        return [
+            PsRow(friendly_from_unit(u.name), st.main_pid, display_state(u.active_state, u.sub_state, st.main_pid), u.name)
+            for u, st in zip(units, statuses)
+        ]
+
+    # -- jobs -------------------------------------------------------------
+
+    async def start(self, path: Union[str, Path], mode: str = "reuse", timeout: float = JOB_TIMEOUT) -> StartResult:
+        """Start a transient unit for a Python file or directory, as `ww <path>` does.
+
+        The decision (reuse, restart or which name to start) is
+        launch.plan_starts(), the one `ww <path>` makes on the blocking client.
+
+        mode "reuse" returns a live unit already running the target,
+        "restart" restarts it, "new" always starts another instance.
+        Raises FileNotFoundError for a path without an entrypoint.
+        """
+        t0 = time.monotonic()
+        target = resolve_target(Path(path))
+        client = await self.systemd()
+        units = await client.list_ww_units()
+        live = start_candidates(units, [target], mode)
+        statuses = await self.statuses((u.name for u in live), MATCH_FIELDS)
+        for u, st in zip(live, statuses):
+            st.active_state, st.sub_state = u.active_state, u.sub_state
+        candidates = candidate_statuses(live, (st.as_dict() for st in statuses))
+        ((unit, action, _),) = plan_starts([target], (u.name for u in units), candidates, mode)
+        if action == "reused":
+            st = next(st for u, st in zip(live, statuses) if u.name == unit)
+            return StartResult(unit, action, None, st, time.monotonic() - t0)
+        if action == "restarted":
+            res = await client.restart_unit_and_wait(unit, timeout=timeout)
+        else:
+            props = to_dbus("a(sv)", transient_properties(target, unit))
+            res = await client.start_transient_and_wait(unit, props, timeout=timeout)
+        return StartResult(unit, action, res.result, res.status, time.monotonic() - t0)
+
+    async def restart(
+        self, ident: str, timeout: float = JOB_TIMEOUT, fields: Iterable[str] = JOB_STATUS_FIELDS
+    ) -> JobResult:
+        """Restart (or start) a unit; .status holds fields as of the job's end."""
+        client = await self.systemd()
+        return await client.restart_unit_and_wait(await self.resolve(ident), timeout=timeout, fields=fields)
+
+    async def stop(self, ident: str, timeout: float = JOB_TIMEOUT, fields: Iterable[str] = ()) -> JobResult:
+        client = await self.systemd()
+        return await client.stop_unit_and_wait(await self.resolve(ident), timeout=timeout, fields=fields)
+
+    async def remove(self, ident: str, timeout: float = JOB_TIMEOUT) -> JobResult:
+        """Stop a unit, then reset its failed state so systemd forgets it."""
+        client = await self.systemd()
+        unit = await self.resolve(ident)
+        # Wait for the stop so reset-failed applies to the final state
+        res = await client.stop_unit_and_wait(unit, timeout=timeout, fields=())
+        await client.reset_failed_unit(unit)
+        return res
+
+    # -- logs -------------------------------------------------------------
+
+    async def log_argv(self, ident: str, n: int = 100, follow: bool = False, all: bool = False) -> list[str]:
+        """The journalctl command for `ww logs` (by default only the current run).
+
+        Raises IdentifierError for a unit that is not loaded.
+        """
+        unit = await self.resolve(ident)
+        st = await self.status(unit, ("LoadState", "ActiveEnterTimestamp"))
+        if not st.found:
+            raise IdentifierError(f"Unit not found: {unit}")
+        since = 0 if follow or all else int(st.active_enter_timestamp or 0)
+        return journal_argv(unit, n, follow, since)
+
+    async def logs(self, ident: str, n: int = 100, follow: bool = False, all: bool = False) -> AsyncIterator[str]:
+        """Yield log lines (without the newline); with follow, until the iterator is closed.
+
+        Raises FileNotFoundError when journalctl is missing.
+        """
+        cmd = await self.log_argv(ident, n, follow, all)
+        with _trace.exec_span(cmd):
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, "--no-pager", stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            try:
+                async for line in proc.stdout:
+                    yield line.decode(errors="replace").rstrip("\n")
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                await proc.wait()
@@ -0,0 +1,287 @@
+"""`ww batch`: many ww operations over one D-Bus connection, fed as JSON lines.
+
+Each stdin line is one command object:
+
+    {"cmd": "run", "path": "a.py"}
+    {"cmd": "status", "name": "a"}
+    {"cmd": "logs", "name": "b", "n": 50, "id": "tail-b"}
+
+cmd is one of run, stop, restart, status, pid, ps, logs (alias logs-tail);
+name accepts the same identifiers as the CLI. Optional: id (echoed back),
+timeout (seconds, job commands), restart and new (run, as the CLI flags),
+n and all (logs).
+
+Every command produces one output line:
+
+    {"seq": 0, "id": null, "cmd": "run", "ok": true, "result": {...}}
+    {"seq": 1, "id": null, "cmd": "status", "ok": false, "error": "Not found: a"}
+
+Commands start as soon as they are read. Those that touch different units
+run concurrently. Commands for the same unit (by friendly name, so
+`run a.py` then `status a` is ordered) keep their submission order. `ps` and
+PID identifiers wait for everything submitted before them. Output follows
+submission order unless `--order completion` is given.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, TextIO
+
+from dbus_next import DBusError
+
+from .api import Client, IdentifierError, job_error
+from .launch import start_mode
+from .systemd_bus import SystemdClient
+from .units import JOB_TIMEOUT, friendly_from_unit
+from .util import json_line, resolve_target, to_slug
+
+COMMANDS = ("run", "stop", "restart", "status", "pid", "ps", "logs")
+_ALIASES = {"logs-tail": "logs"}
+_BARRIER = "*"
+
+
+class BatchError(Exception):
+    """A command that failed; the message becomes the output line's error."""
+
+    def __init__(self, message: str, result: Optional[dict[str, Any]] = None):
+        super().__init__(message)
+        self.result = result
+
+
+def _unit_key(ident: str) -> str:
+    """Friendly name a command is about, or the barrier key for PIDs."""
+    if ident.isdigit():
+        return _BARRIER
+    if ident.endswith(".service") or ident.startswith("ww-"):
+        return friendly_from_unit(ident if ident.endswith(".service") else f"{ident}.service")
+    return ident
+
+
+class Batch:
+    """Runs parsed commands against one SystemdClient."""
+
+    def __init__(self, client: SystemdClient, concurrency: int = 16):
+        self.client = client
+        self.api = Client(client)
+        self._sem = asyncio.Semaphore(concurrency)
+        self._last: dict[str, asyncio.Future] = {}
+        self._pending: list[asyncio.Future] = []
+        self._barrier: Optional[asyncio.Future] = None
+
+    def submit(self, req: dict[str, Any]) -> asyncio.Future:
+        """Schedule one command; the future resolves to its output dict (seq excluded)."""
+        cmd = _ALIASES.get(req.get("cmd"), req.get("cmd"))
+        key = self._key(cmd, req)
+        if key == _BARRIER:
+            deps = [f for f in self._pending if not f.done()]
+        else:
+            deps = [f for f in (self._last.get(key), self._barrier) if f is not None]
+        fut = asyncio.ensure_future(self._run(cmd, req, deps))
+        self._pending.append(fut)
+        fut.add_done_callback(lambda f: self._pending.remove(f) if f in self._pending else None)
+        if key == _BARRIER:
+            self._barrier = fut
+        elif key is not None:
+            self._last[key] = fut
+        return fut
+
+    def _key(self, cmd: Optional[str], req: dict[str, Any]) -> Optional[str]:
+        if cmd == "ps":
+            return _BARRIER
+        if cmd == "run":
+            try:
+                return to_slug(resolve_target(Path(str(req.get("path", "")))).default_name)
+            except FileNotFoundError:
+                return None
+        name = req.get("name")
+        return _unit_key(str(name)) if name else None
+
+    async def _run(self, cmd: Optional[str], req: dict[str, Any], deps: list[asyncio.Future]) -> dict[str, Any]:
+        if deps:
+            await asyncio.wait(deps)
+        out: dict[str, Any] = {"id": req.get("id"), "cmd": req.get("cmd")}
+        async with self._sem:
+            try:
+                handler = getattr(self, f"_cmd_{cmd}", None) if cmd in COMMANDS else None
+                if handler is None:
+                    raise BatchError(f"unknown cmd: {req.get('cmd')!r} (expected {', '.join(COMMANDS)})")
+                out.update(ok=True, result=await handler(req))
+            except BatchError as e:
+                out.update(ok=False, error=str(e))
+                if e.result is not None:
+                    out["result"] = e.result
+            except IdentifierError as e:
+                out.update(ok=False, error=str(e))
+            except DBusError as e:
+                out.update(ok=False, error=e.text)
+            except Exception as e:
+                out.update(ok=False, error=f"{type(e).__name__}: {e}")
+        return out
+
+    async def _unit(self, req: dict[str, Any]) -> str:
+        name = req.get("name")
+        if not name:
+            raise BatchError("missing 'name'")
+        return await self.api.resolve(str(name))
+
+    def _timeout(self, req: dict[str, Any]) -> float:
+        return float(req.get("timeout", JOB_TIMEOUT))
+
+    async def _cmd_run(self, req: dict[str, Any]) -> dict[str, Any]:
+        timeout = self._timeout(req)
+        try:
+            mode = start_mode(bool(req.get("restart")), bool(req.get("new")))
+            res = await self.api.start(str(req.get("path", "")), mode, timeout)
+        except (FileNotFoundError, ValueError) as e:
+            raise BatchError(str(e))
+        result = {
+            "name": res.unit,
+            "pid": res.status.main_pid,
+            "state": res.status.active_state,
+            "sub": res.status.sub_state,
+            "job": res.result,
+            "log_hint": f"ww logs {res.unit} -f",
+            "action": res.action,
+        }
+        err = job_error(res, timeout)
+        if err:
+            raise BatchError(err, result)
+        return result
+
+    async def _cmd_stop(self, req: dict[str, Any]) -> dict[str, Any]:
+        unit = await self._unit(req)
+        timeout = self._timeout(req)
+        res = await self.api.stop(unit, timeout=timeout)
+        result = {"unit": unit, "job": res.result}
+        err = job_error(res, timeout)
+        if err:
+            raise BatchError(err, result)
+        return result
+
+    async def _cmd_restart(self, req: dict[str, Any]) -> dict[str, Any]:
+        unit = await self._unit(req)
+        timeout = self._timeout(req)
+        res = await self.api.restart(unit, timeout=timeout)
+        result = {
+            "unit": unit,
+            "job": res.result,
+            "pid": res.status.main_pid,
+            "state": res.status.active_state,
+            "sub": res.status.sub_state,
+        }
+        err = job_error(res, timeout)
+        if err:
+            raise BatchError(err, result)
+        return result
+
+    async def _cmd_status(self, req: dict[str, Any]) -> dict[str, Any]:
+        unit = await self._unit(req)
+        st = await self.api.status(unit, ("LoadState", "ActiveState", "SubState", "MainPID", "NRestarts", "Result"))
+        if not st.found:
+            raise BatchError(f"Unit not found: {unit}")
+        return {
+            "unit": unit,
+            "state": st.active_state,
+            "sub": st.sub_state,
+            "pid": st.main_pid,
+            "restarts": st.n_restarts,
+            "result": st.result,
+        }
+
+    async def _cmd_pid(self, req: dict[str, Any]) -> dict[str, Any]:
+        unit = await self._unit(req)
+        st = await self.api.status(unit, ("LoadState", "MainPID"))
+        if not st.found:
+            raise BatchError(f"Unit not found: {unit}")
+        return {"unit": unit, "pid": st.main_pid}
+
+    async def _cmd_ps(self, req: dict[str, Any]) -> dict[str, Any]:
+        return {"units": [row._asdict() for row in await self.api.ps()]}
+
+    async def _cmd_logs(self, req: dict[str, Any]) -> dict[str, Any]:
+        unit = await self._unit(req)
+        try:
+            lines = [line async for line in self.api.logs(unit, int(req.get("n", 100)), all=bool(req.get("all")))]
+        except FileNotFoundError:
+            raise BatchError("journalctl not found. Ensure systemd-journald is available.")
+        return {"unit": unit, "lines": lines}
+
+
+async def _read_lines(stream: TextIO) -> "asyncio.Queue[Optional[str]]":
+    """Feed stream's lines into a queue from a thread (None marks EOF)."""
+    loop = asyncio.get_running_loop()
+    q: asyncio.Queue = asyncio.Queue()
+
+    def pump() -> None:
+        for line in stream:
+            loop.call_soon_threadsafe(q.put_nowait, line)
+        loop.call_soon_threadsafe(q.put_nowait, None)
+
+    loop.run_in_executor(None, pump)
+    return q
+
+
+async def run_batch(
+    stream: TextIO = sys.stdin,
+    emit: Callable[[str], Any] = lambda line: print(line, flush=True),
+    order: str = "submit",
+    concurrency: int = 16,
+    connect: Callable[[], Awaitable[SystemdClient]] = SystemdClient.connect,
+) -> int:
+    """Execute every command from stream; returns 1 if any failed, else 0."""
+    client = await connect()
+    batch = Batch(client, concurrency)
+    lines = await _read_lines(stream)
+    # Submission order: results are written by one task, in the order queued
+    ordered: asyncio.Queue = asyncio.Queue()
+    pending: list[asyncio.Future] = []
+    failed = False
+
+    def write(seq: int, out: dict[str, Any]) -> None:
+        nonlocal failed
+        failed = failed or not out.get("ok")
+        emit(json_line({"seq": seq, **out}))
+
+    async def write_in_order() -> None:
+        while True:
+            item = await ordered.get()
+            if item is None:
+                return
+            seq, fut = item
+            write(seq, await fut)
+
+    writer = asyncio.ensure_future(write_in_order()) if order == "submit" else None
+    try:
+        seq = 0
+        while True:
+            line = await lines.get()
+            if line is None:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                req = json.loads(line)
+                if not isinstance(req, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                fut: asyncio.Future = asyncio.get_running_loop().create_future()
+                fut.set_result({"id": None, "cmd": None, "ok": False, "error": f"bad request: {e}"})
+            else:
+                fut = batch.submit(req)
+            if writer is not None:
+                ordered.put_nowait((seq, fut))
+            else:
+                fut.add_done_callback(lambda f, s=seq: write(s, f.result()))
+                pending.append(fut)
+            seq += 1
+        if writer is not None:
+            ordered.put_nowait(None)
+            await writer
+        elif pending:
+            await asyncio.wait(pending)
+    finally:
+        client.disconnect()
+    return 1 if failed else 0
@@ -1,40 +1,21 @@
-import asyncio
-import json
+import fnmatch
 import os
-import shutil
-import subprocess
 import sys
+import time
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional
 
 import typer
-from dbus_next import Variant
-
-from . import __version__
-from .systemd_bus import (
-    build_execstart_variant,
-    connect_user_bus,
-    get_main_pid,
-    get_unit_path,
-    list_units,
-    get_unit_status,
-    reset_failed_unit,
-    restart_unit,
-    start_transient,
-    stop_unit,
-)
-from .util import (
-    PY_IGNORES,
-    ResolvedTarget,
-    build_watchfiles_exec,
-    env_list,
-    is_tty,
-    json_line,
-    resolve_target,
-    to_slug,
-    unit_name_from_slug,
-)
-from .util import _resolve_uvx_bin
+
+from . import trace as _trace
+from .units import JOB_TIMEOUT, display_state, friendly_from_unit as _friendly_from_unit
+
+if TYPE_CHECKING:
+    from .api import Client
+    from .systemd_bus import SystemdClient
+
+# asyncio, dbus-next and the async client are imported by the commands that
+# use them: `ww --help` and `ww run` should not pay for the D-Bus stack.
 
 
 app = typer.Typer(
@@ -44,18 +25,25 @@ app = typer.Typer(
     help=(
         "watchfiles + systemd (user) — minimal process manager for Python dev.\n\n"
         "Usage:\n"
-        "  ww <path>                  Start from Python file/dir (live reload)\n"
-        "  ww run <path>              Same as above (explicit subcommand)\n"
-        "  ww ps                      List active services (tab-separated)\n"
+        "  ww <path>...               Start from Python file(s)/dir(s) (live reload)\n"
+        "  ww run <path>...           Same as above (explicit subcommand)\n"
+        "  ww ps [--watch] [--json]   List active services (tab-separated); --watch keeps it live\n"
         "  ww logs <ident> [-n N|-f]  Show logs (journalctl)\n"
         "  ww status|pid <ident>      Show status / print PID\n"
         "  ww restart|stop|rm <ident> Restart / stop / remove unit\n"
-        "  ww dash [opts]             Open Textual dashboard (ww units)\n\n"
+        "  ww dash [opts]             Open Textual dashboard (ww units)\n"
+        "  ww up|down [SERVICE...]    Start / stop the services in ww.toml\n"
+        "  ww events [IDENT...|--all] Stream unit state changes (JSON lines)\n"
+        "  ww wait <ident>...         Block until units reach a state (--state)\n"
+        "  ww batch < cmds.jsonl      Many commands over one connection (JSON lines)\n"
+        "  ww agent                   Resident helper that other ww calls forward to\n"
+        "  ww completion <shell>      Print the completion script (bash|zsh|fish)\n\n"
         "Directory entrypoints: __main__.py | main.py | app.py\n"
         "Examples:\n"
         "  ww app.py\n"
         "  ww ./services/api\n"
-        "  ww run src/my_tool.py\n\n"
+        "  ww run src/my_tool.py\n"
+        "  ww api.py worker.py 'services/*'\n\n"
         "Identifier (<ident>): friendly name from `ww ps`, a PID, or unit name (ww-*.service)."
     ),
     context_settings={"help_option_names": ["-h", "--help"]},
@@ -69,171 +57,114 @@ def _root(
         "--version",
         help="Show version and exit",
         is_eager=True,
-    )
+    ),
+    trace: bool = typer.Option(
+        False,
+        "--trace",
+        help="Time every D-Bus call and child process; print a summary on exit (same as WW_TRACE=1)",
+    ),
 ):
+    if trace:
+        _trace.enable(os.getenv("WW_TRACE_JSON") or None)
+    else:
+        _trace.enable_from_env()
     if version:
+        from . import __version__
+
         typer.echo(__version__)
         raise typer.Exit()
 
 
-def _ensure_tools():
-    # Ensure uvx exists at runtime; advise if missing.
-    uvx_bin = _resolve_uvx_bin()
-    ok = bool(shutil.which(uvx_bin) or os.path.exists(uvx_bin))
-    if not ok:
-        typer.echo(
-            "uvx not found. Install uv (Astral) or set WW_UV_BIN to absolute path.",
-            err=True,
-        )
+def _run(coro):
+    import asyncio
 
+    return asyncio.run(coro)
 
-def _friendly_from_unit(unit_name: str) -> str:
-    n = unit_name
-    if n.endswith(".service"):
-        n = n[: -len(".service")]
-    if n.startswith("ww-"):
-        n = n[len("ww-") :]
-    return n
 
+async def _connect() -> "SystemdClient":
+    from .systemd_bus import SystemdClient
 
-async def _iter_ww_units(bus):
-    units = await list_units(bus)
-    return [u for u in units if u["Name"].startswith("ww-")]
+    return await SystemdClient.connect()
 
 
-async def _resolve_identifier(bus, ident: str) -> str:
-    # 1) Exact unit name
-    if ident.endswith(".service") or ident.startswith("ww-"):
-        unit = ident if ident.endswith(".service") else f"{ident}.service"
-        path = await get_unit_path(bus, unit)
-        if not path:
-            raise RuntimeError(f"Unit not found: {unit}")
-        return unit
+async def _resolve(client: "Client", ident: str) -> str:
+    """client.resolve(), exiting 1 with its message for an unknown or ambiguous identifier."""
+    from .api import IdentifierError
 
-    # 2) Numeric PID
-    if ident.isdigit():
-        pid_target = int(ident)
-        for u in await _iter_ww_units(bus):
-            try:
-                st = await get_unit_status(bus, u["Path"])
-                if int(st.get("MainPID") or 0) == pid_target:
-                    return u["Name"]
-            except Exception:
-                continue
-        raise RuntimeError(f"No ww-* unit with PID {pid_target}")
-
-    # 3) Friendly name (derived from unit)
-    matches = []
-    for u in await _iter_ww_units(bus):
-        if _friendly_from_unit(u["Name"]) == ident:
-            matches.append(u["Name"])
-    if len(matches) == 1:
-        return matches[0]
-    if len(matches) > 1:
-        opts = ", ".join(matches)
-        raise RuntimeError(f"Ambiguous name '{ident}'. Candidates: {opts}")
-    raise RuntimeError(f"Not found: {ident}")
-
-
-async def _pick_free_name(bus, base_slug: str) -> str:
-    # Try ww-<slug>.service, then ww-<slug>-2.service, etc.
-    i = 1
-    while True:
-        suffix = "" if i == 1 else f"-{i}"
-        name = unit_name_from_slug(f"{base_slug}{suffix}")
-        path = await get_unit_path(bus, name)
-        if path is None:
-            return name
-        i += 1
-
-
-def _properties_for_target(target: ResolvedTarget, unit_name: str) -> list[tuple[str, Variant]]:
-    inner = build_watchfiles_exec(target.argv, target.watch_paths)
-    execstart = build_execstart_variant(inner)
-    env = env_list(os.getenv("WW_IGNORE"))
-    props = [
-        ["Description", Variant("s", f"ww:{unit_name}")],
-        ["WorkingDirectory", Variant("s", str(target.workdir))],
-        ["Environment", Variant("as", env)],
-        ["ExecStart", execstart],
-        ["Restart", Variant("s", "on-failure")],
-        ["RestartUSec", Variant("t", 3_000_000)],  # 3s
-        ["StandardOutput", Variant("s", "journal")],
-        ["StandardError", Variant("s", "journal")],
-        ["KillMode", Variant("s", "control-group")],
-        ["Type", Variant("s", "simple")],
-    ]
-    return props
+    try:
+        return await client.resolve(ident)
+    except IdentifierError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
 
 
 @app.command(context_settings={"allow_extra_args": True, "ignore_unknown_options": True})
 def version():
     """Show CLI version (semver)."""
+    from . import __version__
+
     typer.echo(__version__)
 
 
 @app.command("ps")
-def ps():
+def ps(
+    watch: bool = typer.Option(False, "-w", "--watch", help="Keep the table up to date from systemd signals"),
+    json_: bool = typer.Option(False, "--json", help="JSON lines (with --watch: a snapshot, then one line per change)"),
+):
     """List active services. Prints: name\tpid\tstate\tunit"""
-    async def _ps():
-        bus = await connect_user_bus()
-        units = await list_units(bus)
-        rows = []
-        for u in units:
-            name = u["Name"]
-            if not name.startswith("ww-"):
-                continue
-            path = u["Path"]
+    if watch:
+        from .pswatch import watch as _watch
+        from .util import is_tty
+
+        async def _ps_watch():
+            client = await _connect()
             try:
-                st = await get_unit_status(bus, path)
-                act = st.get("ActiveState", "unknown")
-                sub = st.get("SubState", "unknown")
-                pid = int(st.get("MainPID") or 0)
-                # Derive a clearer, human-friendly state
-                if act == "failed":
-                    state = "failed"
-                elif act == "activating":
-                    if sub == "auto-restart":
-                        state = "flapping"
-                    elif pid > 0:
-                        state = f"activating({sub})"
-                    else:
-                        state = "activating"
-                elif act == "active":
-                    state = f"active({sub})" if sub and sub != "running" else "active"
-                else:
-                    state = act
-            except Exception:
-                state = u.get("ActiveState", "unknown")
-                pid = 0
-            friendly = _friendly_from_unit(name)
-            rows.append((friendly, pid, state, name))
-        for friendly, pid, state, unit in rows:
-            typer.echo(f"{friendly}\t{pid}\t{state}\t{unit}")
-
-    asyncio.run(_ps())
+                await _watch(client, "json" if json_ else "screen" if is_tty() else "text")
+            except BrokenPipeError:
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            except ConnectionError as e:
+                typer.echo(f"ww ps: {e}", err=True)
+                raise typer.Exit(code=1)
+
+        try:
+            _run(_ps_watch())
+        except KeyboardInterrupt:
+            pass
+        return
+
+    async def _ps():
+        from .api import Client
+        from .complete import save_index
+        from .util import json_line
+
+        rows = await Client().ps()
+        save_index((row.unit for row in rows), {row.unit: row.pid for row in rows})
+        for row in rows:
+            if json_:
+                typer.echo(json_line(row._asdict()))
+            else:
+                typer.echo("\t".join(map(str, row)))
+
+    _run(_ps())
 
 
 @app.command()
 def status(name: str):
     """Show detailed status for a unit. Accepts friendly name, PID, or unit."""
     async def _status():
-        bus = await connect_user_bus()
-        try:
-            unit = await _resolve_identifier(bus, name)
-        except RuntimeError as e:
-            typer.echo(str(e), err=True)
-            raise typer.Exit(code=1)
-        path = await get_unit_path(bus, unit)
-        if not path:
+        from .api import Client
+
+        client = Client()
+        unit = await _resolve(client, name)
+        st = await client.status(unit, ("LoadState", "ActiveState", "SubState", "MainPID", "NRestarts", "Result"))
+        if not st.found:
             typer.echo(f"Unit not found: {unit}", err=True)
             raise typer.Exit(code=1)
-        st = await get_unit_status(bus, path)
-        state = st.get("ActiveState", "unknown")
-        sub = st.get("SubState", "unknown")
-        pid_val = int(st.get("MainPID") or 0)
-        restarts = st.get("NRestarts")
-        result = st.get("Result")
+        state = st.active_state
+        sub = st.sub_state
+        pid_val = st.main_pid
+        restarts = st.n_restarts
+        result = st.result
         typer.echo(f"name: {unit}")
         typer.echo(f"state: {state} ({sub})")
         typer.echo(f"pid: {pid_val}")
@@ -243,26 +174,24 @@ def status(name: str):
             typer.echo(f"result: {result}")
         typer.echo(f"log: ww logs {unit} -f")
 
-    asyncio.run(_status())
+    _run(_status())
 
 
 @app.command()
 def pid(name: str):
     """Print MainPID for a unit (integer only)."""
     async def _pid():
-        bus = await connect_user_bus()
-        try:
-            unit = await _resolve_identifier(bus, name)
-        except RuntimeError as e:
-            typer.echo(str(e), err=True)
-            raise typer.Exit(code=1)
-        path = await get_unit_path(bus, unit)
-        if not path:
+        from .api import Client
+
+        client = Client()
+        unit = await _resolve(client, name)
+        st = await client.status(unit, ("LoadState", "MainPID"))
+        if not st.found:
+            typer.echo(f"Unit not found: {unit}", err=True)
             raise typer.Exit(code=1)
-        pid_val = await get_main_pid(bus, path)
-        typer.echo(str(pid_val))
+        typer.echo(str(st.main_pid))
 
-    asyncio.run(_pid())
+    _run(_pid())
 
 
 @app.command()
@@ -276,208 +205,219 @@ def logs(
 ):
     """Show journald logs for a unit. Use -f to follow.\n\nDefault: only since last start (use --all for full history)."""
     async def _logs():
-        bus = await connect_user_bus()
+        import subprocess
+
+        from .api import Client, IdentifierError
+
+        client = Client()
         try:
-            unit = await _resolve_identifier(bus, name)
-        except RuntimeError as e:
+            cmd = await client.log_argv(name, n, follow, all)
+        except IdentifierError as e:
             typer.echo(str(e), err=True)
             raise typer.Exit(code=1)
-
-        cmd = [
-            "journalctl",
-            "--user",
-            "-u",
-            unit,
-            "-n",
-            str(n),
-        ]
-        if not follow and not all:
-            try:
-                path = await get_unit_path(bus, unit)
-                if path:
-                    st = await get_unit_status(bus, path)
-                    ts = int(st.get("ActiveEnterTimestamp") or 0)
-                    if ts > 0:
-                        secs = ts // 1_000_000
-                        cmd.extend(["--since", f"@{secs}"])
-            except Exception:
-                pass
-        if follow:
-            cmd.append("-f")
+        # journalctl gets the terminal (pager, colours); nothing else needs the bus
+        client.close()
         try:
-            subprocess.run(cmd, check=False)
+            with _trace.exec_span(cmd):
+                subprocess.run(cmd, check=False)
         except FileNotFoundError:
             typer.echo("journalctl not found. Ensure systemd-journald is available.", err=True)
 
-    asyncio.run(_logs())
+    _run(_logs())
 
 
 @app.command()
-def restart(name: str):
-    """Restart a unit (starts if inactive)."""
+def restart(
+    name: str,
+    timeout: float = typer.Option(JOB_TIMEOUT, "--timeout", help="Seconds to wait for the restart job"),
+):
+    """Restart a unit (starts if inactive). Waits for the job to finish."""
     async def _restart():
-        bus = await connect_user_bus()
+        from dbus_next import DBusError
+
+        from .api import Client, job_error
+
+        client = Client()
+        unit = await _resolve(client, name)
         try:
-            unit = await _resolve_identifier(bus, name)
-        except RuntimeError as e:
-            typer.echo(str(e), err=True)
+            res = await client.restart(unit, timeout=timeout)
+        except DBusError as e:
+            typer.echo(e.text, err=True)
+            raise typer.Exit(code=1)
+        err = job_error(res, timeout)
+        if err:
+            typer.echo(err, err=True)
             raise typer.Exit(code=1)
-        await restart_unit(bus, unit)
         typer.echo(f"restarted {unit}")
+        typer.echo(f"pid: {res.status.main_pid}")
+        typer.echo(f"state: {res.status.active_state} ({res.status.sub_state})")
 
-    asyncio.run(_restart())
+    _run(_restart())
 
 
 @app.command()
-def stop(name: str):
-    """Stop a unit."""
+def stop(
+    name: str,
+    timeout: float = typer.Option(JOB_TIMEOUT, "--timeout", help="Seconds to wait for the stop job"),
+):
+    """Stop a unit. Waits for the job to finish."""
     async def _stop():
-        bus = await connect_user_bus()
+        from dbus_next import DBusError
+
+        from .api import Client, job_error
+
+        client = Client()
+        unit = await _resolve(client, name)
         try:
-            unit = await _resolve_identifier(bus, name)
-        except RuntimeError as e:
-            typer.echo(str(e), err=True)
+            res = await client.stop(unit, timeout=timeout)
+        except DBusError as e:
+            typer.echo(e.text, err=True)
+            raise typer.Exit(code=1)
+        err = job_error(res, timeout)
+        if err:
+            typer.echo(err, err=True)
             raise typer.Exit(code=1)
-        await stop_unit(bus, unit)
         typer.echo(f"stopped {unit}")
 
-    asyncio.run(_stop())
+    _run(_stop())
 
 
 @app.command("rm")
 def rm(name: str):
     """Stop and remove one unit (reset failed state)."""
     async def _rm():
-        bus = await connect_user_bus()
+        from dbus_next import DBusError
+
+        from .api import Client
+
+        client = Client()
+        unit = await _resolve(client, name)
         try:
-            unit = await _resolve_identifier(bus, name)
-        except RuntimeError as e:
-            typer.echo(str(e), err=True)
+            await client.remove(unit)
+        except DBusError as e:
+            typer.echo(e.text, err=True)
             raise typer.Exit(code=1)
-        await stop_unit(bus, unit)
-        await reset_failed_unit(bus, unit)
         typer.echo(f"removed {unit}")
 
-    asyncio.run(_rm())
+    _run(_rm())
 
 
 def _iter_my_units_sync():
     async def _inner():
-        bus = await connect_user_bus()
-        units = await list_units(bus)
-        return [u for u in units if u["Name"].startswith("ww-")]
+        client = await _connect()
+        return await client.list_ww_units()
 
-    return asyncio.run(_inner())
+    return _run(_inner())
 
 
-@app.command("restart-all")
-def restart_all():
-    """Restart all ww-* units."""
-    async def _restart_all():
-        bus = await connect_user_bus()
-        for u in await list_units(bus):
-            name = u["Name"]
-            if name.startswith("ww-"):
-                await restart_unit(bus, name)
-        typer.echo("restarted all ww-* units")
+def _select_units(units, patterns: Optional[list[str]]) -> list[str]:
+    """Unit names matching any glob; all if no patterns.
 
-    asyncio.run(_restart_all())
+    Globs match friendly names, or unit names when they look like one
+    (start with ww- or end in .service): `w*` must not select every ww-* unit.
+    """
+    if not patterns:
+        return [u.name for u in units]
 
+    def matches(name: str, pattern: str) -> bool:
+        if pattern.startswith("ww-") or pattern.endswith(".service"):
+            return fnmatch.fnmatchcase(name, pattern)
+        return fnmatch.fnmatchcase(_friendly_from_unit(name), pattern)
 
-@app.command("stop-all")
-def stop_all():
-    """Stop all ww-* units."""
-    async def _stop_all():
-        bus = await connect_user_bus()
-        for u in await list_units(bus):
-            name = u["Name"]
-            if name.startswith("ww-"):
-                await stop_unit(bus, name)
-        typer.echo("stopped all ww-* units")
+    return [u.name for u in units if any(matches(u.name, p) for p in patterns)]
 
-    asyncio.run(_stop_all())
 
+def _bulk(verb: str, op, patterns: Optional[list[str]], concurrency: int, timeout: float) -> None:
+    """Run op(client, unit, timeout) for the selected ww-* units concurrently and print a result table."""
+    async def _inner():
+        from .api import job_error
+
+        client = await _connect()
+        units = _select_units(await client.list_ww_units(), patterns)
+        if not units:
+            typer.echo("no matching ww-* units")
+            return
+        t0 = time.monotonic()
+        results = await client.run_bulk(lambda u: op(client, u, timeout), units, concurrency)
+        elapsed = time.monotonic() - t0
+        failed = 0
+        for r in results:
+            if r.error:
+                typer.echo(f"{r.unit}: {r.error}", err=True)
+            err = r.error or job_error(r, timeout)
+            failed += bool(err)
+            outcome = r.result or ("error" if r.error else "timeout")
+            typer.echo(f"{_friendly_from_unit(r.unit)}\t{outcome}\t{r.elapsed:.2f}s\t{r.unit}")
+        typer.echo(f"{verb} {len(results) - failed}/{len(results)} ww-* units in {elapsed:.2f}s")
+        if failed:
+            raise typer.Exit(code=1)
 
-@app.command("rm-all")
-def rm_all():
-    """Stop and remove all ww-* units."""
-    async def _rm_all():
-        bus = await connect_user_bus()
-        for u in await list_units(bus):
-            name = u["Name"]
-            if name.startswith("ww-"):
-                await stop_unit(bus, name)
-                await reset_failed_unit(bus, name)
-        typer.echo("removed all ww-* units")
+    _run(_inner())
 
-    asyncio.run(_rm_all())
 
+async def _restart_op(client: "SystemdClient", unit: str, timeout: float):
+    return await client.restart_unit_and_wait(unit, timeout=timeout, fields=())
 
-@app.command()
-def doctor():
-    """Diagnose systemd user bus, journald, and linger."""
-    async def _doctor():
-        ok_dbus = False
-        try:
-            bus = await connect_user_bus()
-            # try simple manager introspection
-            await list_units(bus)
-            ok_dbus = True
-        except Exception:
-            ok_dbus = False
-
-        # journalctl check
-        ok_journal = False
-        try:
-            r = subprocess.run(["journalctl", "--user", "-n", "1"], stdout=subprocess.DEVNULL)
-            ok_journal = r.returncode == 0
-        except FileNotFoundError:
-            ok_journal = False
 
-        # linger check
-        linger_hint = ""
-        try:
-            user = os.environ.get("USER") or subprocess.check_output(["whoami"]).decode().strip()
-            out = subprocess.check_output(["loginctl", "show-user", user, "-p", "Linger"], stderr=subprocess.DEVNULL).decode()
-            if "Linger=no" in out:
-                linger_hint = "loginctl enable-linger $USER"
-        except Exception:
-            # Non-fatal
-            pass
+async def _stop_op(client: "SystemdClient", unit: str, timeout: float):
+    return await client.stop_unit_and_wait(unit, timeout=timeout, fields=())
+
+
+async def _rm_op(client: "SystemdClient", unit: str, timeout: float):
+    res = await client.stop_unit_and_wait(unit, timeout=timeout, fields=())
+    await client.reset_failed_unit(unit)
+    return res
+
+
+_PATTERNS_ARG = typer.Argument(None, help="Only units whose name matches these globs (or unit name, for ww-*/*.service globs)", show_default=False)
+_CONCURRENCY_OPT = typer.Option(16, "-j", "--concurrency", help="Max jobs in flight")
+_BULK_TIMEOUT_OPT = typer.Option(JOB_TIMEOUT, "--timeout", help="Seconds to wait for each job")
+
+
+@app.command("restart-all")
+def restart_all(
+    patterns: Optional[list[str]] = _PATTERNS_ARG,
+    concurrency: int = _CONCURRENCY_OPT,
+    timeout: float = _BULK_TIMEOUT_OPT,
+):
+    """Restart all ww-* units (or those matching PATTERNS) concurrently.
+
+    Prints: name\tresult\telapsed\tunit, then a summary line.
+    """
+    _bulk("restarted", _restart_op, patterns, concurrency, timeout)
+
+
+@app.command("stop-all")
+def stop_all(
+    patterns: Optional[list[str]] = _PATTERNS_ARG,
+    concurrency: int = _CONCURRENCY_OPT,
+    timeout: float = _BULK_TIMEOUT_OPT,
+):
+    """Stop all ww-* units (or those matching PATTERNS) concurrently."""
+    _bulk("stopped", _stop_op, patterns, concurrency, timeout)
 
-        # uvx + watchfiles checks (best-effort)
-        uvx_bin = _resolve_uvx_bin()
-        uvx_ok, uvx_ver = False, ""
-        try:
-            r = subprocess.run([uvx_bin, "--version"], capture_output=True, text=True)
-            uvx_ok = r.returncode == 0
-            uvx_ver = (r.stdout or r.stderr).strip().splitlines()[:1]
-            uvx_ver = uvx_ver[0] if uvx_ver else ""
-        except Exception:
-            uvx_ok = False
-
-        wf_spec = "watchfiles"
-        if os.getenv("WW_WF_VERSION"):
-            wf_spec = f"watchfiles=={os.getenv('WW_WF_VERSION')}"
-        wf_ok = False
-        try:
-            r = subprocess.run([uvx_bin, "--from", wf_spec, "python", "-m", "watchfiles", "--help"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=15)
-            wf_ok = r.returncode == 0
-        except subprocess.TimeoutExpired:
-            wf_ok = False
-        except Exception:
-            wf_ok = False
 
-        typer.echo(f"user D-Bus: {'ok' if ok_dbus else 'FAIL'}")
-        typer.echo(f"journalctl --user: {'ok' if ok_journal else 'FAIL'}")
-        typer.echo(f"uvx: {'ok' if uvx_ok else 'FAIL'} {('(' + uvx_ver + ')') if uvx_ver else ''}")
-        typer.echo(f"watchfiles via uvx: {'ok' if wf_ok else 'FAIL'}")
-        if linger_hint:
-            typer.echo(f"linger: off (enable via: {linger_hint})")
-        else:
-            typer.echo("linger: ok or unknown")
+@app.command("rm-all")
+def rm_all(
+    patterns: Optional[list[str]] = _PATTERNS_ARG,
+    concurrency: int = _CONCURRENCY_OPT,
+    timeout: float = _BULK_TIMEOUT_OPT,
+):
+    """Stop and remove all ww-* units (or those matching PATTERNS) concurrently."""
+    _bulk("removed", _rm_op, patterns, concurrency, timeout)
+
+
+@app.command()
+def doctor(
+    warm: bool = typer.Option(False, "--warm", help="Install watchfiles into the uv cache and pin its version"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Re-run the uv checks even if cached"),
+):
+    """Diagnose systemd user bus, journald, linger, uvx and watchfiles (checks run concurrently)."""
+    from .doctor import run as _doctor
 
-    asyncio.run(_doctor())
+    rc = _run(_doctor(warm=warm, use_cache=not no_cache))
+    if rc:
+        raise typer.Exit(code=rc)
 
 
 @app.command()
@@ -508,73 +448,254 @@ def dash(
     run_dash(roots=roots, max_depth=max_depth, last=200, columns=columns, terminal_backend=terminal_backend)
 
 
-def _start_from_path(path: str) -> None:
-    """Internal: start a background unit from a Python file or directory."""
-    _ensure_tools()
-    p = Path(path)
-    try:
-        target = resolve_target(p)
-    except FileNotFoundError as e:
-        typer.echo(str(e), err=True)
+@app.command()
+def batch(
+    order: str = typer.Option("submit", "--order", help="Output order: submit|completion"),
+    concurrency: int = typer.Option(16, "-j", "--concurrency", help="Max commands in flight"),
+):
+    """Run JSON-lines commands from stdin over one D-Bus connection.
+
+    One object per line, e.g. {"cmd": "run", "path": "a.py"} or
+    {"cmd": "logs", "name": "a", "n": 50}; cmd is run, stop, restart,
+    status, pid, ps or logs. Each result is printed as one JSON line.
+    Exits 1 if any command failed.
+    """
+    if order not in ("submit", "completion"):
+        typer.echo("--order must be submit or completion", err=True)
         raise typer.Exit(code=2)
+    from .batch import run_batch
+
+    rc = _run(run_batch(order=order, concurrency=concurrency))
+    if rc:
+        raise typer.Exit(code=rc)
+
+
+@app.command()
+def agent(
+    socket: Optional[str] = typer.Option(
+        None, "--socket", help="Socket path (default: $XDG_RUNTIME_DIR/ww/agent.sock)", show_default=False
+    ),
+):
+    """Keep one systemd connection and a live unit table; other ww calls forward to it.
 
-    async def _start():
-        bus = await connect_user_bus()
-        base_slug = to_slug(target.default_name)
-        unit_name = await _pick_free_name(bus, base_slug)
-        props = _properties_for_target(target, unit_name)
+    Runs in the foreground (e.g. as a user service). ps/status/pid/logs,
+    stop/restart/rm and `ww <path>` use it while the socket exists; set
+    WW_AGENT=0 to bypass it.
+    """
+    from .agent import serve
+
+    try:
+        _run(serve(socket))
+    except (RuntimeError, OSError) as e:
+        typer.echo(f"ww agent: {e}", err=True)
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def events(
+    names: Optional[List[str]] = typer.Argument(None, help="Units to follow (friendly name, PID or unit)"),
+    all_: bool = typer.Option(False, "--all", help="Follow every ww unit (the default without names)"),
+):
+    """Stream unit state transitions as JSON lines until interrupted.
+
+    One line per change of ActiveState/SubState/MainPID/NRestarts/Result,
+    per unit appearing or going away, and per finished job; systemd pushes
+    them, nothing is polled.
+    """
+    from .events import stream
+
+    async def _events():
+        from .api import Client
+
+        client = await _connect()
+        units = None
+        if names and not all_:
+            units = [await _resolve(Client(client), name) for name in names]
         try:
-            await start_transient(bus, unit_name, props)
-        except Exception as e:
-            typer.echo(f"Failed to start unit: {e}", err=True)
+            await stream(client, units)
+        except BrokenPipeError:
+            # Reader went away (e.g. `ww events | head -1`); keep the exit flush quiet too
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        except ConnectionError as e:
+            typer.echo(f"ww events: {e}", err=True)
             raise typer.Exit(code=1)
 
-        # Report status, pid and hint (use live properties)
-        path_obj = await get_unit_path(bus, unit_name)
-        pid_val = 0
-        state = "unknown"
-        sub = ""
-        if path_obj:
-            try:
-                st = await get_unit_status(bus, path_obj)
-                pid_val = int(st.get("MainPID") or 0)
-                state = st.get("ActiveState", "unknown")
-                sub = st.get("SubState", "")
-            except Exception:
-                pass
-
-        hint = f"ww logs {unit_name} -f"
-        # Human-friendly output
-        typer.echo(f"name: {unit_name}")
-        typer.echo(f"pid: {pid_val}")
-        if sub and sub != "running":
-            typer.echo(f"state: {state} ({sub})")
-        else:
-            typer.echo(f"state: {state}")
-        typer.echo(f"log: {hint}")
-        # Machine-tail line if non-TTY
+    try:
+        _run(_events())
+    except KeyboardInterrupt:
+        raise typer.Exit(code=130)
+
+
+@app.command()
+def wait(
+    names: List[str] = typer.Argument(..., help="Units to wait for (friendly name, PID or unit)"),
+    state: Optional[str] = typer.Option(
+        None, "--state", help="ActiveState to wait for: active|inactive|failed|... (default: active)", show_default=False
+    ),
+    sub: Optional[str] = typer.Option(None, "--sub", help="SubState to wait for, e.g. running", show_default=False),
+    pid_change: bool = typer.Option(False, "--pid-change", help="Wait for a new MainPID"),
+    timeout: float = typer.Option(JOB_TIMEOUT, "--timeout", help="Seconds to wait (0: no limit)"),
+    all_of: bool = typer.Option(False, "--all-of", help="Wait until every unit is there (default)"),
+    any_of: bool = typer.Option(False, "--any-of", help="Return once one unit is there"),
+):
+    """Wait until units reach a state, driven by systemd signals (no polling).
+
+    Prints `name pid state unit elapsed` for each unit as it gets there
+    (plus a JSON line when stdout is not a TTY). Exits 0 when the wait is
+    satisfied and 1 on timeout. A name that matches no loaded unit means
+    ww-<name>.service, so `ww wait api` works before `ww api.py` starts it.
+
+    Examples:
+      - ww wait api --state active
+      - ww wait api worker --state failed --any-of --timeout 120
+      - ww wait ww-api.service --pid-change
+    """
+    from .events import WaitCondition, wait_for
+    from .util import is_tty, json_line
+
+    if all_of and any_of:
+        typer.echo("--all-of and --any-of are mutually exclusive", err=True)
+        raise typer.Exit(code=2)
+    try:
+        cond = WaitCondition(state, sub, pid_change)
+    except ValueError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=2)
+
+    def reached(unit: str, st, elapsed: float) -> None:
+        pid_val = st.main_pid if st is not None else 0
+        active = st.active_state if st is not None else "inactive"
+        sub_state = st.sub_state if st is not None else "dead"
+        typer.echo(f"{_friendly_from_unit(unit)}\t{pid_val}\t{display_state(active, sub_state, pid_val)}\t{unit}\t{elapsed:.3f}s")
         if not is_tty():
-            print(json_line({"name": unit_name, "pid": pid_val, "state": state, "log_hint": hint}))
+            typer.echo(
+                json_line(
+                    {"name": unit, "pid": pid_val, "state": active, "sub": sub_state, "elapsed": round(elapsed, 6)}
+                )
+            )
+
+    async def _wait() -> int:
+        from .api import Client, IdentifierError
 
-    asyncio.run(_start())
+        client = await _connect()
+        try:
+            # A stopped transient unit is gone; its name is still worth waiting on
+            units = [await Client(client).resolve(name, unloaded=True) for name in names]
+        except IdentifierError as e:
+            typer.echo(str(e), err=True)
+            return 1
+        try:
+            done = await wait_for(client, units, cond, any_of, timeout or None, reached)
+        except ConnectionError as e:
+            typer.echo(f"ww wait: {e}", err=True)
+            return 1
+        if len(done) >= (1 if any_of else len(units)):
+            return 0
+        missing = ", ".join(u for u in units if u not in done)
+        typer.echo(f"Timed out after {timeout:g}s waiting for {cond}: {missing}", err=True)
+        return 1
+
+    try:
+        rc = _run(_wait())
+    except KeyboardInterrupt:
+        raise typer.Exit(code=130)
+    if rc:
+        raise typer.Exit(code=rc)
+
+
+@app.command()
+def completion(shell: str = typer.Argument(..., help="bash, zsh or fish")):
+    """Print the shell completion script.
+
+    Load it with e.g. `eval "$(ww completion bash)"` in ~/.bashrc,
+    `source <(ww completion zsh)` in ~/.zshrc, or
+    `ww completion fish > ~/.config/fish/completions/ww.fish`.
+    """
+    from .complete import script
+
+    try:
+        typer.echo(script(shell), nl=False)
+    except ValueError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=2)
+
+
+@app.command()
+def up(
+    services: Optional[List[str]] = typer.Argument(None, help="Services to start (default: all); dependencies come along"),
+    file: Optional[str] = typer.Option(None, "-f", "--file", help="Manifest (default: nearest ww.toml)", show_default=False),
+    timeout: float = typer.Option(JOB_TIMEOUT, "--timeout", help="Seconds to wait for each level's start jobs"),
+    restart: bool = typer.Option(False, "--restart", help="Restart services that are already running"),
+):
+    """Start the services declared in ww.toml, in dependency order.
+
+    Services whose dependencies are up start together; running services
+    are reused unless --restart is given.
+    """
+    from .manifest import up as _up
+
+    rc = _up(file, services or (), timeout, restart)
+    if rc:
+        raise typer.Exit(code=rc)
+
+
+@app.command()
+def down(
+    services: Optional[List[str]] = typer.Argument(None, help="Services to stop (default: all)"),
+    file: Optional[str] = typer.Option(None, "-f", "--file", help="Manifest (default: nearest ww.toml)", show_default=False),
+    timeout: float = typer.Option(JOB_TIMEOUT, "--timeout", help="Seconds to wait for each level's stop jobs"),
+):
+    """Stop the services declared in ww.toml, dependents first."""
+    from .manifest import down as _down
+
+    rc = _down(file, services or (), timeout)
+    if rc:
+        raise typer.Exit(code=rc)
 
 
 @app.command("run", context_settings={"allow_extra_args": True, "ignore_unknown_options": True})
 def run(
-    path: str = typer.Argument(..., help="Python file or directory to run with live reload"),
+    paths: List[str] = typer.Argument(..., help="Python files, directories or glob patterns to run with live reload"),
+    timeout: float = typer.Option(JOB_TIMEOUT, "--timeout", help="Seconds to wait for the start job"),
+    restart: bool = typer.Option(False, "--restart", help="Restart the unit already running this target"),
+    new: bool = typer.Option(False, "--new", help="Start another instance even if one is running"),
 ):
     """Start from any Python file or directory with live reload.
 
+    If a live ww unit already runs the same target (WorkingDirectory and
+    command), it is reported instead of starting a duplicate. Several paths
+    (or globs) start concurrently and are reported as one table.
+
     Examples:
       - ww app.py
       - ww ./pkg_dir
-      - ww run src/tool.py
+      - ww run src/tool.py --restart
+      - ww run api.py worker.py 'services/*'
     """
-    _start_from_path(path)
+    from .launch import ignored_args, split_targets, start_mode, start_paths
+
+    try:
+        mode = start_mode(restart, new)
+    except ValueError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=2)
+    # Unknown options reach here as arguments (ignore_unknown_options)
+    paths, ignored = split_targets(paths)
+    if not paths:
+        typer.echo("Missing path to run", err=True)
+        raise typer.Exit(code=2)
+    ignored_args(ignored)
+    rc = start_paths(paths, timeout, mode)
+    if rc:
+        raise typer.Exit(code=rc)
 
 
 @app.command("main", hidden=True, context_settings={"allow_extra_args": True, "ignore_unknown_options": True})
 def main_alias(
     path: str = typer.Argument(..., help="Alias of 'run'. Use 'ww <path>' or 'ww run <path>'."),
 ):
-    _start_from_path(path)
+    from .launch import start_from_path
+
+    rc = start_from_path(path)
+    if rc:
+        raise typer.Exit(code=rc)
@@ -0,0 +1,257 @@
+"""Shell completion: `ww completion bash|zsh|fish` and the `ww __complete` helper.
+
+The scripts call `ww __complete <index> <words...>` on Tab (words after
+`ww`, index of the one being completed), which prints one candidate per
+line; a `:files` line asks the shell to add its own file completion.
+
+Identifiers come from a small index, $XDG_RUNTIME_DIR/ww/units.idx (one
+`unit<TAB>friendly name<TAB>MainPID` line per unit), that `ww ps`, name
+lookups and `ww <path>` rewrite as a side effect. Only an index older than
+INDEX_TTL is refreshed from systemd (one listing call), so a Tab normally
+costs a file read. entry.main() runs this module before anything else is
+imported, and it imports only os and time: typing, re, json and the
+rest of the package would cost more than the whole lookup.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Iterable
+
+INDEX_TTL = 10.0  # seconds
+
+# Commands taking identifiers (events and wait take several)
+IDENT_COMMANDS = ("logs", "status", "pid", "stop", "restart", "rm", "events", "wait")
+MULTI_IDENT_COMMANDS = ("events", "wait")
+# `ww <unit> <action>` shorthands
+UNIT_ACTIONS = ("logs", "follow", "pid", "status", "restart", "stop", "rm")
+COMMANDS = (
+    "run",
+    "ps",
+    "logs",
+    "status",
+    "pid",
+    "restart",
+    "stop",
+    "rm",
+    "restart-all",
+    "stop-all",
+    "rm-all",
+    "up",
+    "down",
+    "events",
+    "wait",
+    "batch",
+    "agent",
+    "doctor",
+    "dash",
+    "completion",
+    "version",
+)
+OPTIONS = {
+    "run": ("--restart", "--new", "--timeout"),
+    "ps": ("--watch", "--json"),
+    "logs": ("-n", "-f", "-a", "--all"),
+    "restart": ("--timeout",),
+    "stop": ("--timeout",),
+    "restart-all": ("-j", "--timeout"),
+    "stop-all": ("-j", "--timeout"),
+    "rm-all": ("-j", "--timeout"),
+    "up": ("-f", "--file", "--restart", "--timeout"),
+    "down": ("-f", "--file", "--timeout"),
+    "events": ("--all",),
+    "wait": ("--state", "--sub", "--pid-change", "--timeout", "--all-of", "--any-of"),
+    "batch": ("--order", "-j"),
+    "agent": ("--socket",),
+}
+# Options followed by a value, never an identifier (-f is one only for up/down)
+VALUE_OPTIONS = ("-n", "--timeout", "--state", "--sub", "--file", "-j", "--order", "--socket")
+STATES = ("active", "inactive", "failed", "activating", "deactivating", "reloading")
+
+
+def index_path() -> str:
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+    return os.path.join(runtime, "ww", "units.idx")
+
+
+def load_index(max_age: float | None = None) -> dict[str, tuple[str, int]] | None:
+    """unit name -> (friendly name, MainPID or 0); None if missing or older than max_age."""
+    path = index_path()
+    try:
+        if max_age is not None and time.time() - os.stat(path).st_mtime > max_age:
+            return None
+        with open(path) as f:
+            rows = [line.rstrip("\n").split("\t") for line in f]
+        return {unit: (name, int(pid)) for unit, name, pid in rows}
+    except (OSError, ValueError):
+        return None
+
+
+def save_index(units: Iterable[str], pids: dict[str, int] | None = None) -> None:
+    """Replace the index with units; PIDs not given are kept from the old index. Never raises."""
+    from .units import friendly_from_unit
+
+    known = load_index() or {}
+    pids = pids or {}
+    lines = []
+    for unit in units:
+        pid = pids.get(unit) or known.get(unit, ("", 0))[1]
+        lines.append(f"{unit}\t{friendly_from_unit(unit)}\t{int(pid or 0)}\n")
+    path = index_path()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        with open(tmp, "w") as f:
+            f.writelines(lines)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _refresh(with_pids: bool) -> dict[str, tuple[str, int]] | None:
+    """Re-list the units from systemd (or `ww agent`) and rewrite the index."""
+    from . import agent as _agent
+    from .syncbus import BusError
+
+    try:
+        with _agent.connect() as client:
+            rows = client.list_ww_units()
+            pids = None
+            if with_pids:
+                statuses = client.get_statuses([r.path for r in rows], ("MainPID",))
+                pids = {r.name: st.get("MainPID", 0) for r, st in zip(rows, statuses)}
+    except (BusError, OSError, ValueError):
+        return None
+    save_index([r.name for r in rows], pids)
+    return load_index()
+
+
+def identifiers(prefix: str) -> list[str]:
+    """Friendly names, unit names and (for a numeric prefix) PIDs starting with prefix."""
+    pids_wanted = prefix.isdigit()
+    units = load_index(INDEX_TTL)
+    if units is None or (pids_wanted and not any(pid for _, pid in units.values())):
+        units = _refresh(pids_wanted) or load_index() or {}
+    if pids_wanted:
+        return sorted(str(pid) for _, pid in units.values() if pid and str(pid).startswith(prefix))
+    names = {name for name, _ in units.values()} | set(units)
+    return sorted(n for n in names if n.startswith(prefix))
+
+
+def _manifest_services(prefix: str) -> list[str]:
+    """Service names from the nearest ww.toml (for `ww up|down`)."""
+    from .manifest import find_manifest
+
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import tomli as tomllib
+    try:
+        with open(find_manifest(), "rb") as f:
+            services = tomllib.load(f).get("services") or {}
+    except (OSError, ValueError):
+        return []
+    return sorted(s for s in services if s.startswith(prefix))
+
+
+def candidates(index: int, words: list[str]) -> list[str]:
+    """Completions for words[index] given the words before it (`ww` itself excluded)."""
+    cur = words[index] if index < len(words) else ""
+    before = words[:index]
+    if not before:
+        return [c for c in COMMANDS if c.startswith(cur)] + [":files"]
+    cmd = before[0]
+    if cur.startswith("-"):
+        return [o for o in OPTIONS.get(cmd, ()) if o.startswith(cur)]
+    if before[-1] == "--state":
+        return [s for s in STATES if s.startswith(cur)]
+    if before[-1] == "--file" or (before[-1] == "-f" and cmd in ("up", "down")):
+        return [":files"]
+    if before[-1] in VALUE_OPTIONS:
+        return []
+    if cmd in IDENT_COMMANDS:
+        positional = [
+            w for i, w in enumerate(before[1:], 1) if not w.startswith("-") and before[i - 1] not in VALUE_OPTIONS
+        ]
+        if not positional or cmd in MULTI_IDENT_COMMANDS:
+            return identifiers(cur)
+        return []
+    if cmd in ("up", "down"):
+        return _manifest_services(cur)
+    if cmd == "completion":
+        return [s for s in ("bash", "zsh", "fish") if s.startswith(cur)] if index == 1 else []
+    if cmd.startswith("ww-") or cmd.endswith(".service"):
+        return [a for a in UNIT_ACTIONS if a.startswith(cur)] if index == 1 else []
+    if cmd == "run" or cmd not in COMMANDS:
+        # `ww run <path>...` / `ww <path>...`
+        return [":files"]
+    return []
+
+
+_BASH = """\
+_ww() {
+    local IFS=$'\\n' cur="${COMP_WORDS[COMP_CWORD]}" w
+    COMPREPLY=()
+    for w in $(ww __complete "$((COMP_CWORD - 1))" "${COMP_WORDS[@]:1:COMP_CWORD}" 2>/dev/null); do
+        if [ "$w" = ":files" ]; then
+            COMPREPLY+=($(compgen -f -- "$cur"))
+        else
+            COMPREPLY+=("$w")
+        fi
+    done
+}
+complete -o filenames -F _ww ww
+"""
+
+_ZSH = """\
+#compdef ww
+_ww() {
+    local -a out
+    out=("${(@f)$(ww __complete $((CURRENT - 2)) "${(@)words[2,CURRENT]}" 2>/dev/null)}")
+    if (( ${out[(I):files]} )); then
+        out=("${(@)out:#:files}")
+        _files
+    fi
+    (( ${#out} )) && compadd -a out
+}
+compdef _ww ww
+"""
+
+_FISH = """\
+function __ww_complete
+    set -l words (commandline -opc) (commandline -ct)
+    for w in (ww __complete (math (count $words) - 2) $words[2..-1] 2>/dev/null)
+        if test "$w" = ":files"
+            __fish_complete_path (commandline -ct)
+        else
+            echo $w
+        end
+    end
+end
+complete -c ww -f -a '(__ww_complete)'
+"""
+
+SCRIPTS = {"bash": _BASH, "zsh": _ZSH, "fish": _FISH}
+
+
+def script(shell: str) -> str:
+    """Completion script for shell; raises ValueError for an unsupported one."""
+    try:
+        return SCRIPTS[shell]
+    except KeyError:
+        raise ValueError(f"Unsupported shell {shell!r} (expected bash, zsh or fish)")
+
+
+def main(argv: list[str]) -> int:
+    """`ww __complete <index> <words...>`: print candidates, one per line."""
+    try:
+        index = int(argv[0])
+    except (IndexError, ValueError):
+        return 2
+    for c in candidates(index, argv[1:]):
+        print(c)
+    return 0
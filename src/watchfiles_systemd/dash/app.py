@@ -15,7 +15,9 @@ from textual.containers import Container, Horizontal
 from textual.widgets import DataTable, Footer, Input, Tabs, Tab, RichLog, Label, ContentSwitcher
 from textual.timer import Timer
 
-from .discovery_ww import discover_services_ww
+from ..events import until_disconnect
+from ..systemd_bus import UnitCache, UnitEvent
+from .discovery_ww import discover_services_ww, service_from_status, sort_services
 from .models import AppState, Service
 from .commands_ww import (
     follow_argv,
@@ -25,6 +27,7 @@ from .commands_ww import (
     restart_sequence,
     run_command,
     probe_status,
+    shared_client,
 )
 from .terminals import TerminalRegistry, terminal_supported
 from .tmux_support import TmuxSession  # type: ignore
@@ -70,6 +73,7 @@ class WWDashApp(App):
         self._rows: list[int] = []  # maps row index -> service index
         self._follow_task: Task | None = None
         self._status_task: Task | None = None
+        self._cache: UnitCache | None = None
         self._search_timer: Timer | None = None
         self._follow_current: tuple[str | None, bool] = (None, False)  # (unit, journal?)
         self._tmux_refresh_timer: Timer | None = None
@@ -118,8 +122,8 @@ class WWDashApp(App):
         if self.state.services:
             self._select_row(0)
             await self._start_follow(self.state.services[0])
-        # Periodic status refresher
-        self._status_task = asyncio.create_task(self._periodic_status_refresh())
+        # Live status updates (signal-driven; falls back to polling)
+        self._status_task = asyncio.create_task(self._watch_status())
 
     async def on_unmount(self) -> None:
         if self._follow_task and not self._follow_task.done():
@@ -195,7 +199,11 @@ class WWDashApp(App):
         # Probe and update status lazily
         if 0 <= idx < len(self.state.services):
             svc = self.state.services[idx]
-            active, pid = await probe_status(svc)
+            st = self._cache.get(svc.unit) if self._cache else None
+            if st is not None:
+                active, pid = st.active_state, st.main_pid
+            else:
+                active, pid = await probe_status(svc)
             if active:
                 svc.active = active
                 if pid is not None:
@@ -304,7 +312,7 @@ class WWDashApp(App):
 
     async def action_do_refresh(self) -> None:
         # Re-discover services and refresh table
-        self.state.services = await discover_services_ww(self.state.roots)
+        self.state.services = await discover_services_ww(self.state.roots, client=await shared_client())
         self._rebuild_table(select_same=True)
         if self.state.services and not self._rows:
             self._select_row(0)
@@ -632,36 +640,107 @@ class WWDashApp(App):
             return "-"
         return time.strftime("%H:%M:%S", time.localtime(svc.updated_at))
 
-    async def _periodic_status_refresh(self) -> None:
+    async def _watch_status(self) -> None:
+        """Apply unit changes pushed by systemd; poll if subscribing fails or the bus drops."""
+        try:
+            client = await shared_client()
+            self._cache = await UnitCache(client).start()
+        except asyncio.CancelledError:
+            return
+        except Exception:
+            self._cache = None
+            await self._periodic_status_refresh()
+            return
+
+        async def apply_changes() -> None:
+            async for ev in self._cache.changes():
+                try:
+                    self._apply_unit_event(ev)
+                except Exception:
+                    continue
+
+        try:
+            # changes() never ends on its own, so race it against the connection
+            await until_disconnect(client, asyncio.ensure_future(apply_changes()))
+        except asyncio.CancelledError:
+            return
+        except ConnectionError as e:
+            self._toast(f"{e}; polling unit status every 10s")
+        finally:
+            self._cache.stop()
+            self._cache = None
+        await self._periodic_status_refresh()
+
+    def _apply_unit_event(self, ev: UnitEvent) -> None:
         import time
+        services = self.state.services
+        if ev.kind == "job":
+            return
+        if ev.kind == "changed":
+            idx = next((i for i, s in enumerate(services) if s.unit == ev.unit), None)
+            if idx is None:
+                return
+            svc = services[idx]
+            svc.active = ev.status.active_state
+            svc.pid = ev.status.main_pid
+            svc.updated_at = time.time()
+            if self.state.filter != "all" and "ActiveState" in ev.changed:
+                # Row may enter or leave the Active/Failed views
+                self._rebuild_table(select_same=True)
+            elif idx in self._rows:
+                self._update_row_by_row(self._rows.index(idx), svc)
+            return
+
+        # Membership changed: keep the same service selected across the re-sort
+        cur = services[self.state.selected_index] if 0 <= self.state.selected_index < len(services) else None
+        if ev.kind == "new":
+            if any(s.unit == ev.unit for s in services):
+                return
+            roots = [Path(r).resolve() for r in self.state.roots]
+            services.append(service_from_status(ev.unit, ev.status, roots))
+            sort_services(services)
+        elif ev.kind == "removed":
+            services[:] = [s for s in services if s.unit != ev.unit]
+        for i, s in enumerate(services):
+            if s is cur:
+                self.state.selected_index = i
+                break
+        self._rebuild_table(select_same=True)
+
+    async def _periodic_status_refresh(self) -> None:
         while True:
             try:
                 await asyncio.sleep(10)
-                rows = list(range(len(self._rows)))
-                sem = asyncio.Semaphore(4)
-
-                async def probe_row(row: int):
-                    async with sem:
-                        idx = self._rows[row]
-                        svc = self.state.services[idx]
-                        active, pid = await probe_status(svc)
-                        changed = False
-                        if active and active != svc.active:
-                            svc.active = active
-                            changed = True
-                        if pid is not None and pid != svc.pid:
-                            svc.pid = pid
-                            changed = True
-                        if changed:
-                            svc.updated_at = time.time()
-                            self._update_row_by_row(row, svc)
-
-                await asyncio.gather(*(probe_row(r) for r in rows))
+                await self._refresh_statuses()
             except asyncio.CancelledError:
                 break
             except Exception:
                 continue
 
+    async def _refresh_statuses(self) -> None:
+        """One polling pass: probe every visible row and update the ones that changed."""
+        import time
+        rows = list(range(len(self._rows)))
+        sem = asyncio.Semaphore(4)
+
+        async def probe_row(row: int):
+            async with sem:
+                idx = self._rows[row]
+                svc = self.state.services[idx]
+                active, pid = await probe_status(svc)
+                changed = False
+                if active and active != svc.active:
+                    svc.active = active
+                    changed = True
+                if pid is not None and pid != svc.pid:
+                    svc.pid = pid
+                    changed = True
+                if changed:
+                    svc.updated_at = time.time()
+                    self._update_row_by_row(row, svc)
+
+        await asyncio.gather(*(probe_row(r) for r in rows))
+
 
 def run_dash(roots: Iterable[Path], max_depth: int = 5, last: int = 200, columns: str = "minimal", terminal_backend: str = "auto") -> None:
     del max_depth  # ww discovery is global; we keep the flag for parity only
@@ -5,7 +5,14 @@ from asyncio.subprocess import PIPE
 from pathlib import Path
 
 from .models import Service
-from ..systemd_bus import connect_user_bus, get_unit_status
+from .. import trace as _trace
+from ..api import Client
+from ..systemd_bus import SystemdClient
+
+
+async def shared_client() -> SystemdClient:
+    """Return the dashboard's long-lived SystemdClient (that of api.Client.shared())."""
+    return await Client.shared().systemd()
 
 
 def follow_argv(service: Service) -> list[str]:
@@ -37,29 +44,31 @@ async def run_command(
     on_stderr_line: callable | None = None,
 ) -> int:
     """Run a command streaming output via provided callbacks."""
-    proc = await asyncio.create_subprocess_exec(
-        *argv, cwd=str(cwd), stdout=PIPE, stderr=PIPE
-    )
+    with _trace.exec_span(argv) as span:
+        proc = await asyncio.create_subprocess_exec(
+            *argv, cwd=str(cwd), stdout=PIPE, stderr=PIPE
+        )
 
-    async def _stream(reader, cb):
-        if cb is None:
-            # Drain
-            while True:
-                b = await reader.readline()
-                if not b:
-                    break
-        else:
+        async def _stream(reader, cb):
             while True:
                 b = await reader.readline()
                 if not b:
                     break
+                if span is not None:
+                    span.bytes_in += len(b)
+                if cb is None:
+                    # Drain
+                    continue
                 try:
                     cb(b.decode(errors="ignore"))
                 except Exception:
                     pass
 
-    await asyncio.gather(_stream(proc.stdout, on_stdout_line), _stream(proc.stderr, on_stderr_line))
-    return await proc.wait()
+        await asyncio.gather(_stream(proc.stdout, on_stdout_line), _stream(proc.stderr, on_stderr_line))
+        rc = await proc.wait()
+        if span is not None and rc != 0:
+            span.outcome = f"exit {rc}"
+    return rc
 
 
 async def probe_status(service: Service) -> tuple[str | None, int | None]:
@@ -68,27 +77,10 @@ async def probe_status(service: Service) -> tuple[str | None, int | None]:
     On error, returns (None, None).
     """
     try:
-        bus = await connect_user_bus()
-        # We need the object path for the unit; run a fast snapshot via unit status
-        # The caller updates only two fields from this method.
-        # Since we don't have the path here, let ww caller keep prior state when this fails.
-        # Optimization: could fetch and cache unit paths if needed later.
-        # Here we just attempt to find PID/Active from a properties snapshot.
-        # NOTE: Without the exact DBus object path we cannot fetch; so fallback to systemctl if needed.
-        # However, our discovery stores unit names only; to avoid extra list_units roundtrip here,
-        # we accept a minor inefficiency: reuse discovery approach later if optimizing.
-        # For now, do a subprocess call as a safe fallback when path resolution isn't present.
-        # But to keep pure D‑Bus, we do a light list_units scan.
-        from ..systemd_bus import list_units
-        for u in await list_units(bus):
-            if u.get("Name") == service.unit:
-                path = u.get("Path")
-                if path:
-                    st = await get_unit_status(bus, path)
-                    active = st.get("ActiveState")
-                    pid = int(st.get("MainPID") or 0)
-                    return active, pid
-        return None, None
+        # Unit names resolve locally, so only the properties reads hit the bus
+        st = await Client.shared().status(service.unit, ("LoadState", "ActiveState", "MainPID"))
+        if not st.found:
+            return None, None
+        return st.active_state, st.main_pid
     except Exception:
         return None, None
-
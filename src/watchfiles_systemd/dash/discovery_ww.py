@@ -4,16 +4,9 @@ from pathlib import Path
 from typing import Iterable
 
 from .models import Service
-from ..systemd_bus import connect_user_bus, list_units, get_unit_status
-
-
-def _friendly_from_unit(unit_name: str) -> str:
-    n = unit_name
-    if n.endswith(".service"):
-        n = n[: -len(".service")]
-    if n.startswith("ww-"):
-        n = n[len("ww-") :]
-    return n
+from ..api import Client
+from ..systemd_bus import SystemdClient, UnitStatus
+from ..units import friendly_from_unit
 
 
 def _infer_project(service_dir: Path, roots: list[Path]) -> str | None:
@@ -29,47 +22,44 @@ def _infer_project(service_dir: Path, roots: list[Path]) -> str | None:
     return None
 
 
-async def discover_services_ww(roots: Iterable[Path], max_depth: int = 5) -> list[Service]:
+def service_from_status(unit: str, st: UnitStatus, roots_resolved: list[Path]) -> Service:
+    """Map a unit's status record to a dashboard Service row."""
+    wd = st.working_directory
+    try:
+        workdir = Path(wd) if isinstance(wd, str) and wd else Path.cwd()
+    except Exception:
+        workdir = Path.cwd()
+    return Service(
+        name=friendly_from_unit(unit),
+        dir=workdir,
+        pid=st.main_pid,
+        unit=unit,
+        runlog=None,  # we prefer ww logs/journal, no file reliance
+        project=_infer_project(workdir, roots_resolved),
+        active=st.active_state or "unknown",
+    )
+
+
+def sort_services(services: list[Service]) -> None:
+    # Stable sort by name then path
+    services.sort(key=lambda s: (s.name.lower(), str(s.dir)))
+
+
+async def discover_services_ww(
+    roots: Iterable[Path], max_depth: int = 5, client: SystemdClient | None = None
+) -> list[Service]:
     """Discover ww units via D‑Bus and map to Service rows.
 
     - roots are used only to compute a 'project' label by path prefix.
     - max_depth is ignored here (ww discovery is global); retained for option parity.
+    - client: reuse an existing connection; the shared api.Client otherwise.
     """
-    bus = await connect_user_bus()
-    units = await list_units(bus)
+    ww = Client(client) if client is not None else Client.shared()
+    units = [u for u in await ww.units() if u.path]
     roots_resolved = [Path(r).resolve() for r in roots]
 
-    services: list[Service] = []
-    for u in units:
-        name = u.get("Name") or ""
-        if not name.startswith("ww-"):
-            continue
-        path = u.get("Path")
-        if not path:
-            continue
-        st = await get_unit_status(bus, path)
-        wd = st.get("WorkingDirectory")
-        try:
-            workdir = Path(wd) if isinstance(wd, str) and wd else Path.cwd()
-        except Exception:
-            workdir = Path.cwd()
-        friendly = _friendly_from_unit(name)
-        pid = int(st.get("MainPID") or 0)
-        active = st.get("ActiveState") or "unknown"
-        proj = _infer_project(workdir, roots_resolved)
-        services.append(
-            Service(
-                name=friendly,
-                dir=workdir,
-                pid=pid,
-                unit=name,
-                runlog=None,  # we prefer ww logs/journal, no file reliance
-                project=proj,
-                active=active,
-            )
-        )
+    statuses = await ww.statuses((u.name for u in units), ("ActiveState", "MainPID", "WorkingDirectory"))
+    services = [service_from_status(u.name, st, roots_resolved) for u, st in zip(units, statuses)]
 
-    # Stable sort by name then path
-    services.sort(key=lambda s: (s.name.lower(), str(s.dir)))
+    sort_services(services)
     return services
-
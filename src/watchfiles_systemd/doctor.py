@@ -0,0 +1,248 @@
+"""`ww doctor`: environment checks, run concurrently.
+
+The user D-Bus, journald, linger, uvx and watchfiles-via-uvx checks start
+together, so the slowest check sets the total time, not the sum. Each line
+shows how long its check took.
+
+The two uv checks are cached in $XDG_CACHE_HOME/ww/doctor.json for
+CACHE_TTL, but only after they succeed. The cache key is the identity of the
+uvx/uv binaries (path, size, mtime: it changes whenever uv is upgraded), the
+watchfiles requirement (WW_WF_VERSION or the pin) and UV_CACHE_DIR. The
+other checks report live state and always run.
+
+`--warm` installs watchfiles into the uv cache without the usual timeout
+and pins the version it got ($XDG_CACHE_HOME/ww/watchfiles-version, read by
+util.watchfiles_spec()). The first `ww run` afterwards then starts from a
+resolved, cached environment instead of downloading inside the unit.
+WW_WF_VERSION still wins over the pin.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from . import trace as _trace
+from .util import _resolve_uvx_bin, cache_dir, pin_path, watchfiles_spec
+
+CACHE_TTL = 24 * 3600.0  # seconds; `uv cache clean` can drop the environment
+DBUS_TIMEOUT = 5.0
+WF_TIMEOUT = 15.0  # a cold uv cache needs --warm, not a longer check
+WARM_TIMEOUT = 600.0
+# Prints the watchfiles version inside the environment uvx builds for units
+_WF_VERSION_CODE = "import importlib.metadata as m; print(m.version('watchfiles'))"
+
+
+@dataclass
+class Check:
+    label: str
+    ok: bool
+    detail: str = ""
+    elapsed: float = 0.0
+    cached: bool = False
+    info: bool = False  # informational: print detail instead of ok/FAIL
+
+    def line(self) -> str:
+        when = "cached" if self.cached else f"{self.elapsed * 1000:.0f} ms"
+        if self.info:
+            return f"{self.label}: {self.detail} [{when}]"
+        detail = f" {self.detail}" if self.detail else ""
+        return f"{self.label}: {'ok' if self.ok else 'FAIL'}{detail} [{when}]"
+
+
+async def _exec(argv: list[str], timeout: Optional[float] = None) -> tuple[int, str]:
+    """(returncode, first line of stdout, else stderr); the child is killed on timeout.
+
+    Raises OSError if the program cannot be started, asyncio.TimeoutError on timeout.
+    """
+    with _trace.exec_span(argv):
+        # Own process group, so a timeout also kills what uv started (and releases the pipes)
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+            raise
+    text = (out.strip() or err.strip()).decode(errors="replace")
+    return proc.returncode, text.splitlines()[0] if text else ""
+
+
+async def _timed(label: str, probe) -> Check:
+    """Run probe() -> (ok, detail) as check label; an exception means FAIL."""
+    t0 = time.monotonic()
+    try:
+        ok, detail = await probe()
+    except asyncio.TimeoutError:
+        ok, detail = False, "(timed out)"
+    except Exception as e:
+        ok, detail = False, f"({e})" if str(e) else f"({type(e).__name__})"
+    return Check(label, ok, detail, time.monotonic() - t0)
+
+
+async def _dbus() -> tuple[bool, str]:
+    from .systemd_bus import SystemdClient
+
+    client = await asyncio.wait_for(SystemdClient.connect(), DBUS_TIMEOUT)
+    try:
+        units = await asyncio.wait_for(client.list_ww_units(), DBUS_TIMEOUT)
+    finally:
+        client.disconnect()
+    return True, f"({len(units)} ww units)"
+
+
+async def _journal() -> tuple[bool, str]:
+    rc, _ = await _exec(["journalctl", "--user", "-n", "1", "-q"])
+    return rc == 0, ""
+
+
+async def _linger() -> tuple[bool, str]:
+    import pwd
+
+    user = os.environ.get("USER") or pwd.getpwuid(os.getuid()).pw_name
+    try:
+        _, out = await _exec(["loginctl", "show-user", user, "-p", "Linger"])
+    except OSError:
+        return True, "unknown"
+    if out == "Linger=no":
+        return True, "off (enable via: loginctl enable-linger $USER)"
+    return True, "on" if out == "Linger=yes" else "unknown"
+
+
+async def _uvx_version(uvx_bin: str) -> tuple[bool, str]:
+    rc, out = await _exec([uvx_bin, "--version"])
+    return rc == 0, f"({out})" if out else ""
+
+
+async def _watchfiles(uvx_bin: str, spec: str, timeout: float) -> tuple[bool, str]:
+    rc, out = await _exec([uvx_bin, "--from", spec, "python", "-c", _WF_VERSION_CODE], timeout)
+    return rc == 0, out if rc == 0 else ""
+
+
+# -- cache ------------------------------------------------------------------
+
+
+def _cache_key(uvx_bin: str, spec: str) -> Optional[dict]:
+    """What the uv checks depend on; None when uvx is missing (nothing to cache)."""
+    tools = []
+    for path in (uvx_bin, os.path.join(os.path.dirname(uvx_bin), "uv")):
+        try:
+            st = os.stat(path)
+        except OSError:
+            if path == uvx_bin:
+                return None
+            continue
+        tools.append([os.path.realpath(path), st.st_size, st.st_mtime_ns])
+    return {"tools": tools, "spec": spec, "uv_cache": os.getenv("UV_CACHE_DIR", "")}
+
+
+def _load_cache(key: dict) -> dict[str, dict]:
+    """label -> cached Check fields, for entries that match key and are fresh."""
+    try:
+        with open(cache_dir() / "doctor.json") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("key") != key:
+        return {}
+    now = time.time()
+    return {
+        label: entry
+        for label, entry in (data.get("checks") or {}).items()
+        if isinstance(entry, dict) and now - entry.get("at", 0) < CACHE_TTL
+    }
+
+
+def _save_cache(key: dict, checks: list[Check]) -> None:
+    """Store the passed checks under key; failures are not cached. Never raises."""
+    now = time.time()
+    data = {"key": key, "checks": {c.label: {"detail": c.detail, "at": now} for c in checks if c.ok}}
+    path = cache_dir() / "doctor.json"
+    tmp = path.with_name(f"doctor.json.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def _pin(version: str) -> None:
+    path = pin_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(version + "\n")
+
+
+# -- doctor -----------------------------------------------------------------
+
+
+async def _cached_checks(entries: dict[str, dict]) -> list[Check]:
+    return [Check(label, True, entry["detail"], cached=True) for label, entry in entries.items()]
+
+
+async def _uv_checks(uvx_bin: str, spec: str, warm: bool) -> list[Check]:
+    """The uvx and watchfiles checks; with warm, install (and pin) watchfiles first."""
+    uvx, wf = await asyncio.gather(
+        _timed("uvx", lambda: _uvx_version(uvx_bin)),
+        _timed(
+            "watchfiles via uvx",
+            lambda: _watchfiles(uvx_bin, spec, WARM_TIMEOUT if warm else WF_TIMEOUT),
+        ),
+    )
+    if warm and wf.ok and wf.detail and not os.getenv("WW_WF_VERSION"):
+        pinned = f"watchfiles=={wf.detail}"
+        if pinned != spec:
+            # Resolve the pinned requirement too: that is what units will ask uvx for
+            again = await _timed("watchfiles via uvx", lambda: _watchfiles(uvx_bin, pinned, WARM_TIMEOUT))
+            again.elapsed += wf.elapsed
+            wf = again
+            if wf.ok:
+                _pin(wf.detail)
+        if wf.ok:
+            wf.detail += f" (pinned in {pin_path()})"
+    return [uvx, wf]
+
+
+async def run(warm: bool = False, use_cache: bool = True) -> int:
+    """Print one line per check; returns 1 if --warm could not install watchfiles, else 0."""
+    uvx_bin = _resolve_uvx_bin()
+    spec = watchfiles_spec()
+    key = _cache_key(uvx_bin, spec)
+    cached = _load_cache(key) if key is not None and use_cache and not warm else {}
+
+    uv_labels = ("uvx", "watchfiles via uvx")
+    if all(label in cached for label in uv_labels):
+        uv = _cached_checks({label: cached[label] for label in uv_labels})
+    else:
+        # --warm resolves afresh (moving an old pin forward) unless WW_WF_VERSION is set
+        uv = _uv_checks(uvx_bin, spec if not warm or os.getenv("WW_WF_VERSION") else "watchfiles", warm)
+    dbus, journal, linger, (uvx, wf) = await asyncio.gather(
+        _timed("user D-Bus", _dbus),
+        _timed("journalctl --user", _journal),
+        _timed("linger", _linger),
+        uv,
+    )
+    linger.info = True
+    if key is not None and not (uvx.cached and wf.cached):
+        # Re-read the key: --warm may just have pinned a version
+        _save_cache(_cache_key(uvx_bin, watchfiles_spec()) or key, [uvx, wf])
+
+    for check in (dbus, journal, uvx, wf, linger):
+        print(check.line(), flush=True)
+    return 1 if warm and not wf.ok else 0
@@ -1,8 +1,7 @@
-import sys
-from typing import List
+from __future__ import annotations
 
-from .cli import app, run as start_command
-from . import cli as _cli
+import os
+import sys
 
 
 SUBCOMMANDS = {
@@ -18,6 +17,14 @@ SUBCOMMANDS = {
     "rm-all",
     "doctor",
     "dash",
+    "agent",
+    "batch",
+    "completion",
+    "__complete",
+    "up",
+    "events",
+    "wait",
+    "down",
     "run",
     "main",
     "version",
@@ -28,10 +35,51 @@ SUBCOMMANDS = {
 }
 
 
-def main(argv: List[str] | None = None):
+def _dispatch(args: list[str]):
+    # Short commands (and so every unit-first shorthand) run synchronously
+    # without loading Typer or dbus-next
+    from .fastpath import run as _fast
+
+    rc = _fast(args)
+    if rc is not None:
+        if rc:
+            sys.exit(rc)
+        return
+    from .cli import app
+
+    sys.argv = ["ww"] + args
+    return app()
+
+
+def main(argv: list[str] | None = None):
     if argv is None:
         argv = sys.argv[1:]
 
+    # Shell completion runs on every Tab: answer before anything else loads
+    if argv and argv[0] == "__complete":
+        from .complete import main as _complete
+
+        sys.exit(_complete(argv[1:]))
+    if len(argv) == 2 and argv[0] == "completion" and not argv[1].startswith("-"):
+        from .complete import script
+
+        try:
+            sys.stdout.write(script(argv[1]))
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            sys.exit(2)
+        return
+
+    # --trace is accepted anywhere on the command line (before a bare "--")
+    from . import trace as _trace
+
+    cut = argv.index("--") if "--" in argv else len(argv)
+    if "--trace" in argv[:cut]:
+        argv = [a for a in argv[:cut] if a != "--trace"] + argv[cut:]
+        _trace.enable(os.getenv("WW_TRACE_JSON") or None)
+    else:
+        _trace.enable_from_env()
+
     # Handle version early to avoid Click group error
     if argv and argv[0] in {"--version", "-V"}:
         from . import __version__
@@ -53,38 +101,41 @@ def main(argv: List[str] | None = None):
 
             # Map common actions; "follow" is a friendly alias for logs -f
             if action in {"logs", "log"}:
-                sys.argv = ["ww", "logs", unit] + rest
-                return app()
+                return _dispatch(["logs", unit] + rest)
             if action in {"follow", "f"}:
-                sys.argv = ["ww", "logs", unit, "-f"] + rest
-                return app()
+                return _dispatch(["logs", unit, "-f"] + rest)
             if action == "pid":
-                sys.argv = ["ww", "pid", unit] + rest
-                return app()
+                return _dispatch(["pid", unit] + rest)
             if action == "restart":
-                sys.argv = ["ww", "restart", unit] + rest
-                return app()
+                return _dispatch(["restart", unit] + rest)
             if action == "stop":
-                sys.argv = ["ww", "stop", unit] + rest
-                return app()
+                return _dispatch(["stop", unit] + rest)
             if action == "rm":
-                sys.argv = ["ww", "rm", unit] + rest
-                return app()
+                return _dispatch(["rm", unit] + rest)
             if action == "status":
-                sys.argv = ["ww", "status", unit] + rest
-                return app()
+                return _dispatch(["status", unit] + rest)
 
             # If only a unit was provided, default to showing logs
             if action is None:
-                sys.argv = ["ww", "logs", unit] + rest
-                return app()
+                return _dispatch(["logs", unit] + rest)
 
             # Unknown action after a unit name; fall through to app() which will print help
 
-    # Default command: ww <path>
+    # Default command: ww <path>...
     if argv and not argv[0].startswith("-") and argv[0] not in SUBCOMMANDS:
-        # Call the start command directly (runs the same logic as 'ww <path>')
-        return start_command(argv[0])
+        # Same as 'ww run <path>...', without building the Typer app
+        from .launch import ignored_args, parse_run_args, start_paths
+
+        try:
+            paths, timeout, mode, ignored = parse_run_args(argv)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            sys.exit(2)
+        ignored_args(ignored)
+        rc = start_paths(paths, timeout, mode)
+        if rc:
+            sys.exit(rc)
+        return
 
-    # Otherwise, dispatch to Typer app (subcommands / flags)
-    app()
+    # Otherwise, dispatch to the fast path or the Typer app (subcommands / flags)
+    return _dispatch(list(argv))
@@ -0,0 +1,185 @@
+"""`ww events` / `ww wait`: unit state transitions, pushed by systemd.
+
+Built on systemd_bus.UnitCache, so every PropertiesChanged/UnitNew/
+UnitRemoved/JobRemoved signal of a ww unit turns into one line as soon as
+it arrives; nothing is polled:
+
+    {"ts": 8123.402117, "event": "changed", "unit": "ww-api.service", "name": "api",
+     "state": "activating", "sub": "auto-restart", "pid": 0, "restarts": 3,
+     "changed": {"ActiveState": ["active", "activating"], "SubState": ["running", "auto-restart"], "MainPID": [4242, 0]}}
+
+event is new, changed, removed or job (with "job" and "result"); ts is
+time.monotonic() when the signal was processed.
+
+wait_for() uses the same table to return as soon as units reach a state.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from .systemd_bus import SystemdClient, UnitCache, UnitEvent, UnitStatus
+from .units import friendly_from_unit
+from .util import json_line
+
+# Changes to other cached properties (timestamps, WorkingDirectory) are not reported
+EVENT_FIELDS = ("ActiveState", "SubState", "MainPID", "NRestarts", "Result")
+# systemd's ActiveState values (what `ww wait --state` accepts)
+ACTIVE_STATES = ("active", "reloading", "inactive", "failed", "activating", "deactivating")
+
+
+def _print(line: str) -> None:
+    print(line, flush=True)
+
+
+def event_record(ev: UnitEvent) -> Optional[dict[str, Any]]:
+    """The JSON object for ev, or None if nothing reportable changed."""
+    st = ev.status
+    rec: dict[str, Any] = {
+        "ts": round(ev.timestamp, 6),
+        "event": ev.kind,
+        "unit": ev.unit,
+        "name": friendly_from_unit(ev.unit),
+        "state": st.active_state,
+        "sub": st.sub_state,
+        "pid": st.main_pid,
+        "restarts": st.n_restarts,
+    }
+    if ev.kind == "changed":
+        changed = {key: list(ev.changed[key]) for key in EVENT_FIELDS if key in ev.changed}
+        if not changed:
+            return None
+        rec["changed"] = changed
+    elif ev.kind == "job":
+        rec["job"], rec["result"] = ev.changed["Job"]
+    return rec
+
+
+async def until_disconnect(client: SystemdClient, work: "asyncio.Future[Any]") -> Any:
+    """Await work; raise ConnectionError if the bus goes away first."""
+    lost = asyncio.ensure_future(client.bus.wait_for_disconnect())
+    try:
+        done, _ = await asyncio.wait([work, lost], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        lost.cancel()
+        if not work.done():
+            work.cancel()
+            # cancel() only asks: let work unwind before its outcome is read
+            await asyncio.wait([work])
+    if lost in done:
+        lost.exception()  # a disconnect error means the same as a clean disconnect here
+        if work.cancelled() or work.exception() is not None:
+            raise ConnectionError("lost the systemd connection")
+    return work.result()
+
+
+async def stream(
+    client: SystemdClient,
+    units: Optional[Iterable[str]] = None,
+    emit: Callable[[str], None] = _print,
+) -> None:
+    """Emit one JSON line per transition of units (default: every ww unit) until cancelled.
+
+    Raises ConnectionError when the systemd connection drops.
+    """
+    cache = await UnitCache(client, units).start()
+
+    async def pump() -> None:
+        async for ev in cache.changes():
+            rec = event_record(ev)
+            if rec is not None:
+                emit(json_line(rec))
+
+    try:
+        await until_disconnect(client, asyncio.ensure_future(pump()))
+    finally:
+        cache.stop()
+
+
+class WaitCondition:
+    """What `ww wait` waits for; every given part must hold.
+
+    A unit that is not loaded (never started, or a transient unit that has
+    stopped) counts as inactive/dead. pid_change means MainPID differs from
+    its value when the wait began and is not 0.
+    """
+
+    def __init__(self, state: Optional[str] = None, sub: Optional[str] = None, pid_change: bool = False):
+        if state is not None and state not in ACTIVE_STATES:
+            raise ValueError(f"unknown state {state!r} (expected one of {', '.join(ACTIVE_STATES)})")
+        if state is None and sub is None and not pid_change:
+            state = "active"
+        self.state = state
+        self.sub = sub
+        self.pid_change = pid_change
+
+    def holds(self, st: Optional[UnitStatus], first_pid: int) -> bool:
+        active = st.active_state if st is not None else "inactive"
+        sub = st.sub_state if st is not None else "dead"
+        pid = st.main_pid if st is not None else 0
+        if self.state is not None and active != self.state:
+            return False
+        if self.sub is not None and sub != self.sub:
+            return False
+        return not self.pid_change or (pid != 0 and pid != first_pid)
+
+    def __str__(self) -> str:
+        parts = [f"state {self.state}"] if self.state else []
+        if self.sub:
+            parts.append(f"substate {self.sub}")
+        if self.pid_change:
+            parts.append("a new MainPID")
+        return " and ".join(parts)
+
+
+async def wait_for(
+    client: SystemdClient,
+    units: Iterable[str],
+    cond: WaitCondition,
+    any_of: bool = False,
+    timeout: Optional[float] = None,
+    on_reached: Optional[Callable[[str, Optional[UnitStatus], float], None]] = None,
+) -> dict[str, Optional[UnitStatus]]:
+    """Wait until every unit (or, with any_of, one unit) satisfies cond.
+
+    Returns the units that did, with their status at that moment (None for
+    a unit that is not loaded); fewer than asked for means the timeout hit.
+    on_reached(unit, status, elapsed) is called as each unit gets there.
+    Raises ConnectionError when the systemd connection drops.
+    """
+    started = time.monotonic()
+    units = list(dict.fromkeys(units))
+    cache = await UnitCache(client, units).start()
+    first_pid = {}
+    for unit in units:
+        st = cache.get(unit)
+        first_pid[unit] = st.main_pid if st is not None else 0
+    need = 1 if any_of else len(units)
+    reached: dict[str, Optional[UnitStatus]] = {}
+
+    def check(unit: str) -> None:
+        st = cache.get(unit)
+        if unit not in reached and cond.holds(st, first_pid[unit]):
+            reached[unit] = st
+            if on_reached is not None:
+                on_reached(unit, st, time.monotonic() - started)
+
+    async def watch() -> None:
+        for unit in units:
+            check(unit)
+            if len(reached) >= need:
+                return
+        async for ev in cache.changes():
+            if ev.unit in first_pid:
+                check(ev.unit)
+                if len(reached) >= need:
+                    return
+
+    try:
+        left = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+        await asyncio.wait_for(until_disconnect(client, asyncio.ensure_future(watch())), left)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        cache.stop()
+    return reached
@@ -0,0 +1,236 @@
+"""Synchronous implementations of the short commands: ps, pid, status, logs, stop, restart, rm.
+
+entry.main() tries these before importing Typer/dbus-next. Output and exit
+codes match the Typer commands in cli.py. run() returns None for anything it
+does not handle (help flags, unknown options, a bus address or auth method
+the blocking client does not speak) so the caller can fall through to the
+full CLI. Set WW_FASTPATH=0 to disable.
+
+When `ww agent` is running, the client here is its socket (agent.connect()).
+"""
+
+import os
+import sys
+from typing import Optional
+
+from . import agent as _agent
+from . import trace as _trace
+from .complete import save_index
+from .syncbus import BusError, SyncSystemdClient
+from .units import JOB_TIMEOUT, display_state, friendly_from_unit, is_ww_unit, journal_argv
+
+
+def _err(msg: str) -> int:
+    print(msg, file=sys.stderr)
+    return 1
+
+
+def _resolve_identifier(client: SyncSystemdClient, ident: str) -> str:
+    """Blocking twin of api.Client.resolve()."""
+    if ident.endswith(".service") or ident.startswith("ww-"):
+        return ident if ident.endswith(".service") else f"{ident}.service"
+    if ident.isdigit():
+        pid_target = int(ident)
+        unit = client.get_unit_by_pid(pid_target)
+        if unit is None or not is_ww_unit(unit):
+            raise RuntimeError(f"No ww-* unit with PID {pid_target}")
+        return unit
+    units = client.list_ww_units()
+    save_index(u.name for u in units)
+    matches = [u.name for u in units if friendly_from_unit(u.name) == ident]
+    if len(matches) == 1:
+        return matches[0]
+    if len(matches) > 1:
+        raise RuntimeError(f"Ambiguous name '{ident}'. Candidates: {', '.join(matches)}")
+    raise RuntimeError(f"Not found: {ident}")
+
+
+def _ps(client: SyncSystemdClient) -> int:
+    units = client.list_ww_units()
+    # The listing already carries the states; only MainPID needs a read
+    statuses = client.get_statuses([u.path for u in units], ("MainPID",))
+    save_index((u.name for u in units), {u.name: st.get("MainPID", 0) for u, st in zip(units, statuses)})
+    for u, st in zip(units, statuses):
+        pid = st.get("MainPID", 0)
+        state = display_state(u.active_state, u.sub_state, pid)
+        print(f"{friendly_from_unit(u.name)}\t{pid}\t{state}\t{u.name}")
+    return 0
+
+
+def _status(client: SyncSystemdClient, unit: str) -> int:
+    st = client.get_status(unit, ("LoadState", "ActiveState", "SubState", "MainPID", "NRestarts", "Result"))
+    if st.get("LoadState") in (None, "not-found"):
+        return _err(f"Unit not found: {unit}")
+    print(f"name: {unit}")
+    print(f"state: {st.get('ActiveState', 'unknown')} ({st.get('SubState', 'unknown')})")
+    print(f"pid: {st.get('MainPID', 0)}")
+    if isinstance(st.get("NRestarts"), int):
+        print(f"restarts: {st['NRestarts']}")
+    if st.get("Result"):
+        print(f"result: {st['Result']}")
+    print(f"log: ww logs {unit} -f")
+    return 0
+
+
+def _pid(client: SyncSystemdClient, unit: str) -> int:
+    st = client.get_status(unit, ("LoadState", "MainPID"))
+    if st.get("LoadState") in (None, "not-found"):
+        return _err(f"Unit not found: {unit}")
+    print(st.get("MainPID", 0))
+    return 0
+
+
+def _logs(client: SyncSystemdClient, unit: str, n: int, follow: bool, all_: bool) -> int:
+    st = client.get_status(unit, ("LoadState", "ActiveEnterTimestamp"))
+    if st.get("LoadState") in (None, "not-found"):
+        return _err(f"Unit not found: {unit}")
+    since = 0 if follow or all_ else int(st.get("ActiveEnterTimestamp") or 0)
+    cmd = journal_argv(unit, n, follow, since)
+    # Nothing else to ask the manager; don't hold the connection while journalctl runs
+    client.close()
+    import subprocess
+
+    try:
+        with _trace.exec_span(cmd):
+            subprocess.run(cmd, check=False)
+    except FileNotFoundError:
+        print("journalctl not found. Ensure systemd-journald is available.", file=sys.stderr)
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+def _rm(client: SyncSystemdClient, unit: str) -> int:
+    try:
+        # Wait for the stop so reset-failed applies to the final state
+        client.run_job("StopUnit", "ss", (unit, "fail"), JOB_TIMEOUT)
+        client.reset_failed_unit(unit)
+    except BusError as e:
+        return _err(e.text)
+    print(f"removed {unit}")
+    return 0
+
+
+def _job(client: SyncSystemdClient, command: str, unit: str, timeout: float) -> int:
+    method, mode = ("RestartUnit", "replace") if command == "restart" else ("StopUnit", "fail")
+    try:
+        _, result = client.run_job(method, "ss", (unit, mode), timeout)
+    except BusError as e:
+        return _err(e.text)
+    if result is None:
+        return _err(f"{unit}: job still running after {timeout:g}s")
+    if result != "done":
+        return _err(f"{unit}: job {result}")
+    if command == "stop":
+        print(f"stopped {unit}")
+        return 0
+    st = client.get_status(unit, ("ActiveState", "SubState", "MainPID"))
+    print(f"restarted {unit}")
+    print(f"pid: {st.get('MainPID', 0)}")
+    print(f"state: {st.get('ActiveState', 'unknown')} ({st.get('SubState', 'unknown')})")
+    return 0
+
+
+class _Args:
+    """Parsed invocation: the identifier plus the options its command takes."""
+
+    def __init__(self, command: str):
+        self.command = command
+        self.ident: Optional[str] = None
+        self.timeout = JOB_TIMEOUT
+        self.n = 100
+        self.follow = False
+        self.all = False
+
+
+def _parse(argv: list[str]) -> Optional[_Args]:
+    """Arguments for invocations handled here, else None."""
+    if not argv:
+        return None
+    args = _Args(argv[0])
+    rest = argv[1:]
+    if args.command == "ps":
+        return args if not rest else None
+    if args.command not in ("pid", "status", "logs", "stop", "restart", "rm"):
+        return None
+    i = 0
+    while i < len(rest):
+        arg = rest[i]
+        key, eq, value = arg.partition("=")
+        if args.command in ("stop", "restart") and key == "--timeout":
+            if not eq:
+                if i + 1 >= len(rest):
+                    return None
+                i += 1
+                value = rest[i]
+            try:
+                args.timeout = float(value)
+            except ValueError:
+                return None
+        elif args.command == "logs" and arg.startswith("-n"):
+            value = arg[2:]
+            if not value:
+                if i + 1 >= len(rest):
+                    return None
+                i += 1
+                value = rest[i]
+            try:
+                args.n = int(value)
+            except ValueError:
+                return None
+        elif args.command == "logs" and arg == "-f":
+            args.follow = True
+        elif args.command == "logs" and arg in ("-a", "--all"):
+            args.all = True
+        elif arg.startswith("-") or args.ident is not None:
+            return None
+        else:
+            args.ident = arg
+        i += 1
+    if args.ident is None:
+        return None
+    return args
+
+
+def run(argv: list[str]) -> Optional[int]:
+    """Run argv on the fast path; exit code, or None to defer to the Typer app."""
+    if os.getenv("WW_FASTPATH", "1") == "0":
+        return None
+    args = _parse(argv)
+    if args is None:
+        return None
+    try:
+        client = _agent.connect()
+    except ValueError as e:
+        return _err(str(e))
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        # Nothing listening; dbus-next would fail the same way, only slower
+        return _err(f"Cannot reach the systemd user manager: {e}")
+    except OSError:
+        return None
+    with client:
+        try:
+            return _dispatch(client, args)
+        except BusError as e:
+            return _err(e.text)
+        except OSError as e:
+            # Connection dropped or a reply timed out mid-command
+            return _err(f"Lost the systemd user manager: {e}")
+
+
+def _dispatch(client: SyncSystemdClient, args: "_Args") -> int:
+    if args.command == "ps":
+        return _ps(client)
+    try:
+        unit = _resolve_identifier(client, args.ident)
+    except RuntimeError as e:
+        return _err(str(e))
+    if args.command == "status":
+        return _status(client, unit)
+    if args.command == "pid":
+        return _pid(client, unit)
+    if args.command == "logs":
+        return _logs(client, unit, args.n, args.follow, args.all)
+    if args.command == "rm":
+        return _rm(client, unit)
+    return _job(client, args.command, unit, args.timeout)
@@ -0,0 +1,425 @@
+"""`ww <path>...` / `ww run <path>...`: start (or reuse) transient units for Python files or directories.
+
+Runs on the blocking client (syncbus) so the most common invocation never
+imports Typer, asyncio or dbus-next. Output and exit codes are those of the
+`run` command in cli.py, which delegates here. What to start, reuse or
+restart is decided by plan_starts(), which api.Client.start() uses as well.
+"""
+
+import os
+import re
+import shlex
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from . import agent as _agent
+from .complete import save_index
+from .syncbus import BusError
+from .units import JOB_TIMEOUT, UnitRow, display_state, friendly_from_unit, unit_object_path
+from .util import (
+    ResolvedTarget,
+    _resolve_uvx_bin,
+    build_watchfiles_exec,
+    env_list,
+    is_tty,
+    json_line,
+    resolve_target,
+    to_slug,
+    unit_name_from_slug,
+)
+
+# A unit in one of these states counts as already running its target
+LIVE_STATES = ("active", "activating", "reloading")
+# Properties a reuse check reads for each candidate (all on the Service
+# interface: one GetAll each; the states come with the listing)
+MATCH_FIELDS = ("MainPID", "WorkingDirectory", "ExecStart")
+# Properties read back once the start jobs are done
+REPORT_FIELDS = ("LoadState", "ActiveState", "SubState", "MainPID", "Result")
+TRANSIENT_SIGNATURE = "ssa(sv)a(sa(sv))"
+# report_table() actions that involve no job
+NO_JOB_ACTIONS = ("reused", "inactive")
+
+
+def ensure_tools() -> None:
+    # Ensure uvx exists at runtime; advise if missing.
+    import shutil
+
+    uvx_bin = _resolve_uvx_bin()
+    if not (shutil.which(uvx_bin) or os.path.exists(uvx_bin)):
+        print("uvx not found. Install uv (Astral) or set WW_UV_BIN to absolute path.", file=sys.stderr)
+
+
+def pick_free_name(taken: Iterable[str], base_slug: str) -> str:
+    """ww-<slug>.service, else the first free ww-<slug>-N.service."""
+    taken = set(taken)
+    i = 1
+    while True:
+        suffix = "" if i == 1 else f"-{i}"
+        name = unit_name_from_slug(f"{base_slug}{suffix}")
+        if name not in taken:
+            return name
+        i += 1
+
+
+def transient_properties(
+    target: ResolvedTarget,
+    unit_name: str,
+    env: Iterable[str] = (),
+    ignores: Iterable[str] = (),
+    extra: Iterable[tuple[str, tuple[str, Any]]] = (),
+) -> list[tuple[str, tuple[str, Any]]]:
+    """StartTransientUnit properties as (name, (signature, value)) pairs.
+
+    env adds KEY=VALUE entries, ignores adds watchfiles ignore paths and
+    extra appends further properties (After=, MemoryMax=, ...).
+    """
+    inner = build_watchfiles_exec(target.argv, target.watch_paths, ignores)
+    return [
+        ("Description", ("s", f"ww:{unit_name}")),
+        ("WorkingDirectory", ("s", str(target.workdir))),
+        ("Environment", ("as", env_list(os.getenv("WW_IGNORE")) + list(env))),
+        ("ExecStart", ("a(sasb)", [(inner[0], inner, False)])),
+        ("Restart", ("s", "on-failure")),
+        ("RestartUSec", ("t", 3_000_000)),  # 3s
+        ("StandardOutput", ("s", "journal")),
+        ("StandardError", ("s", "journal")),
+        ("KillMode", ("s", "control-group")),
+        ("Type", ("s", "simple")),
+        *extra,
+    ]
+
+
+def is_instance_name(unit_name: str, base_slug: str) -> bool:
+    """True for ww-<slug>.service and the ww-<slug>-N.service names pick_free_name() hands out."""
+    return re.fullmatch(rf"ww-{re.escape(base_slug)}(-\d+)?\.service", unit_name) is not None
+
+
+def runs_target(target: ResolvedTarget, status: dict[str, Any]) -> bool:
+    """Whether a unit's WorkingDirectory/ExecStart (MATCH_FIELDS) say it runs target."""
+    if status.get("WorkingDirectory") != str(target.workdir):
+        return False
+    # The watchfiles wrapper gets the target as one shell-quoted argument
+    command = " ".join(shlex.quote(a) for a in target.argv)
+    return any(len(entry) > 1 and command in entry[1] for entry in status.get("ExecStart") or ())
+
+
+def running_instance(
+    target: ResolvedTarget, statuses: Iterable[tuple[str, dict[str, Any]]]
+) -> Optional[tuple[str, dict[str, Any]]]:
+    """First live (name, status) pair that already runs target."""
+    for name, st in statuses:
+        if st.get("ActiveState") in LIVE_STATES and runs_target(target, st):
+            return name, st
+    return None
+
+
+def start_candidates(units: Iterable[UnitRow], targets: Iterable[ResolvedTarget], mode: str) -> list[UnitRow]:
+    """Live ww-<slug>[-N] units that may already run one of targets (none for mode "new").
+
+    The reuse check reads MATCH_FIELDS for each of them.
+    """
+    if mode == "new":
+        return []
+    slugs = {to_slug(t.default_name) for t in targets}
+    return [u for u in units if u.active_state in LIVE_STATES and any(is_instance_name(u.name, s) for s in slugs)]
+
+
+def candidate_statuses(rows: Iterable[UnitRow], statuses: Iterable[dict[str, Any]]) -> list[tuple[str, dict[str, Any]]]:
+    """(name, status) pairs for plan_starts(): the MATCH_FIELDS reads plus the listing's states."""
+    pairs = []
+    for u, st in zip(rows, statuses):
+        st.update(ActiveState=u.active_state, SubState=u.sub_state)
+        pairs.append((u.name, st))
+    return pairs
+
+
+def plan_starts(
+    targets: Iterable[ResolvedTarget],
+    taken: Iterable[str],
+    candidates: list[tuple[str, dict[str, Any]]],
+    mode: str,
+) -> list[tuple[str, str, ResolvedTarget]]:
+    """(unit name, action, target) for each target: what `ww <path>...` does.
+
+    A live candidate that already runs the target is "reused" (mode
+    "reuse") or "restarted" (mode "restart"); otherwise the target is
+    "started" under the first name free of taken and the names handed out
+    before it.
+    """
+    taken = set(taken)
+    plan = []
+    for target in targets:
+        match = running_instance(target, candidates) if mode != "new" else None
+        if match is not None:
+            plan.append((match[0], "reused" if mode == "reuse" else "restarted", target))
+            continue
+        unit_name = pick_free_name(taken, to_slug(target.default_name))
+        taken.add(unit_name)
+        plan.append((unit_name, "started", target))
+    return plan
+
+
+def job_call(unit_name: str, action: str, target: ResolvedTarget) -> Optional[tuple[str, str, tuple[Any, ...]]]:
+    """The Manager call (method, signature, args) for a plan_starts() row; None when reused."""
+    if action == "restarted":
+        return "RestartUnit", "ss", (unit_name, "replace")
+    if action == "started":
+        props = transient_properties(target, unit_name)
+        return "StartTransientUnit", TRANSIENT_SIGNATURE, (unit_name, "fail", props, [])
+    return None
+
+
+def _report(unit_name: str, st: dict[str, Any], action: str, result: Optional[str], timeout: float) -> int:
+    # Report status, pid and hint (as of the start job's completion)
+    pid_val = st.get("MainPID", 0)
+    state = st.get("ActiveState", "unknown")
+    sub = st.get("SubState", "unknown")
+    hint = f"ww logs {unit_name} -f"
+    print(f"name: {unit_name}")
+    print(f"pid: {pid_val}")
+    if sub and sub != "running":
+        print(f"state: {state} ({sub})")
+    else:
+        print(f"state: {state}")
+    print(f"log: {hint}")
+    # Machine-tail line if non-TTY
+    if not is_tty():
+        print(
+            json_line(
+                {"name": unit_name, "pid": pid_val, "state": state, "job": result, "log_hint": hint, "action": action}
+            )
+        )
+    if action == "reused":
+        print(f"{unit_name} already runs this target (--restart to restart it, --new for another instance)", file=sys.stderr)
+        return 0
+    if result is None:
+        print(f"{unit_name}: job still running after {timeout:g}s", file=sys.stderr)
+        return 1
+    if result != "done":
+        print(f"{unit_name}: job {result}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def start_mode(restart: bool = False, new: bool = False) -> str:
+    """start_from_path() mode for the --restart / --new flags."""
+    if restart and new:
+        raise ValueError("--restart and --new are mutually exclusive")
+    return "restart" if restart else "new" if new else "reuse"
+
+
+def start_from_path(path: str, timeout: float = JOB_TIMEOUT, mode: str = "reuse") -> int:
+    """Start a background unit from a Python file or directory; returns the exit code.
+
+    mode: "reuse" (default) reports a live unit that already runs the same
+    target instead of starting another, "restart" restarts that unit, and
+    "new" always starts a fresh ww-<slug>[-N] instance.
+    """
+    ensure_tools()
+    try:
+        target = resolve_target(Path(path))
+    except FileNotFoundError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+    try:
+        client = _agent.connect()
+    except (OSError, ValueError) as e:
+        print(f"Cannot reach the systemd user manager: {e}", file=sys.stderr)
+        return 1
+    with client:
+        try:
+            units = client.list_ww_units()
+            save_index(u.name for u in units)
+            # One pipelined GetAll per live candidate, not a lookup per name
+            live = start_candidates(units, [target], mode)
+            statuses = client.get_statuses([u.path for u in live], MATCH_FIELDS) if live else []
+            candidates = candidate_statuses(live, statuses)
+            ((unit_name, action, _),) = plan_starts([target], (u.name for u in units), candidates, mode)
+            if action == "reused":
+                return _report(unit_name, dict(candidates)[unit_name], action, None, timeout)
+            _, result = client.run_job(*job_call(unit_name, action, target), timeout)
+            st = client.get_status(unit_name, REPORT_FIELDS)
+        except (BusError, OSError) as e:
+            print(f"Failed to start unit: {e}", file=sys.stderr)
+            return 1
+    save_index({*(u.name for u in units), unit_name}, {unit_name: st.get("MainPID", 0)})
+    return _report(unit_name, st, action, result, timeout)
+
+
+def expand_paths(args: Iterable[str]) -> list[str]:
+    """Expand shell-style globs (for quoted patterns); plain paths pass through.
+
+    Raises FileNotFoundError for a pattern that matches nothing.
+    """
+    import glob
+
+    paths: list[str] = []
+    for arg in args:
+        if not glob.has_magic(arg):
+            paths.append(arg)
+            continue
+        matches = sorted(glob.glob(arg))
+        if not matches:
+            raise FileNotFoundError(f"No match for pattern: {arg}")
+        paths.extend(matches)
+    return paths
+
+
+def split_targets(words: list[str]) -> tuple[list[str], list[str]]:
+    """(targets, rest): the words before the first option are targets.
+
+    ww passes no arguments to the target, so `ww app.py --port 8000` runs
+    app.py and leaves `--port 8000` to ignored_args().
+    """
+    for i, word in enumerate(words):
+        if word.startswith("-"):
+            return words[:i], words[i:]
+    return list(words), []
+
+
+def parse_run_args(argv: list[str]) -> tuple[list[str], float, str, list[str]]:
+    """(targets, timeout, mode, ignored) for `ww <path>... [--restart|--new] [--timeout S]`.
+
+    The run options are recognised anywhere; other words follow
+    split_targets(). Raises ValueError for a bad or conflicting option.
+    """
+    words: list[str] = []
+    timeout, restart, new = JOB_TIMEOUT, False, False
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        key, eq, value = arg.partition("=")
+        if arg == "--restart":
+            restart = True
+        elif arg == "--new":
+            new = True
+        elif key == "--timeout":
+            if not eq:
+                if i + 1 >= len(argv):
+                    raise ValueError("--timeout needs a value")
+                i += 1
+                value = argv[i]
+            try:
+                timeout = float(value)
+            except ValueError:
+                raise ValueError(f"--timeout: not a number: {value!r}")
+        else:
+            words.append(arg)
+        i += 1
+    targets, ignored = split_targets(words)
+    return targets, timeout, start_mode(restart, new), ignored
+
+
+def ignored_args(words: list[str]) -> None:
+    if words:
+        print(f"Ignoring arguments ww does not take: {' '.join(words)}", file=sys.stderr)
+
+
+def start_paths(args: Iterable[str], timeout: float = JOB_TIMEOUT, mode: str = "reuse") -> int:
+    """start_from_path() for one path, start_many() once globs expand to several."""
+    try:
+        paths = expand_paths(args)
+    except FileNotFoundError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    if len(paths) == 1:
+        return start_from_path(paths[0], timeout, mode)
+    return start_many(paths, timeout, mode)
+
+
+def start_many(paths: Iterable[str], timeout: float = JOB_TIMEOUT, mode: str = "reuse") -> int:
+    """Start (or reuse) one unit per path, all on one connection; returns the exit code.
+
+    Every target is resolved before anything starts, unit names are handed
+    out in one pass, and the StartTransientUnit/RestartUnit calls go out
+    together, so bring-up takes about as long as the slowest start. Prints a
+    table (name, pid, state, unit, action), plus a JSON line per unit when
+    stdout is not a TTY.
+    """
+    ensure_tools()
+    targets: dict[tuple[str, tuple[str, ...]], ResolvedTarget] = {}
+    unresolved = 0
+    for path in paths:
+        try:
+            target = resolve_target(Path(path))
+        except FileNotFoundError as e:
+            print(str(e), file=sys.stderr)
+            unresolved += 1
+            continue
+        # The same target named twice (or matched by two patterns) starts once
+        targets.setdefault((str(target.workdir), tuple(target.argv)), target)
+    if unresolved:
+        return 2
+
+    try:
+        client = _agent.connect()
+    except (OSError, ValueError) as e:
+        print(f"Cannot reach the systemd user manager: {e}", file=sys.stderr)
+        return 1
+    started_at = time.monotonic()
+    with client:
+        try:
+            units = client.list_ww_units()
+            live = start_candidates(units, targets.values(), mode)
+            statuses = client.get_statuses([u.path for u in live], MATCH_FIELDS) if live else []
+            plan = plan_starts(targets.values(), (u.name for u in units), candidate_statuses(live, statuses), mode)
+            calls = [call for call in (job_call(*row) for row in plan) if call is not None]
+            outcomes = iter(client.run_jobs(calls, timeout) if calls else ())
+            jobs = [(None, None, None) if action == "reused" else next(outcomes) for _, action, _ in plan]
+            statuses = client.get_statuses([unit_object_path(name) for name, _, _ in plan], REPORT_FIELDS)
+        except (BusError, OSError) as e:
+            print(f"Failed to start units: {e}", file=sys.stderr)
+            return 1
+    save_index(
+        {*(u.name for u in units), *(name for name, _, _ in plan)},
+        {name: st.get("MainPID", 0) for (name, _, _), st in zip(plan, statuses)},
+    )
+    rows = [
+        (unit_name, "failed" if error else action, result, error, st)
+        for (unit_name, action, _), (_, result, error), st in zip(plan, jobs, statuses)
+    ]
+    return report_table(rows, timeout, time.monotonic() - started_at)
+
+
+def report_table(
+    rows: Iterable[tuple[str, str, Optional[str], Optional[Exception], dict[str, Any]]],
+    timeout: float,
+    elapsed: float,
+) -> int:
+    """Print one line per (unit, action, job result, error, status) row and a summary; returns the exit code.
+
+    Lines are `name pid state unit action` (ps columns plus the action),
+    each followed by a JSON line when stdout is not a TTY. A row counts as
+    up when its action needed no job ("reused", "inactive") or its job
+    finished as "done"; anything else is explained on stderr and exits 1.
+    """
+    rc = up = total = 0
+    machine = not is_tty()
+    for unit_name, action, result, error, st in rows:
+        total += 1
+        pid_val = st.get("MainPID", 0)
+        state = st.get("ActiveState", "unknown")
+        shown = display_state(state, st.get("SubState", "unknown"), pid_val)
+        print(f"{friendly_from_unit(unit_name)}\t{pid_val}\t{shown}\t{unit_name}\t{action}")
+        if machine:
+            hint = f"ww logs {unit_name} -f"
+            print(
+                json_line(
+                    {"name": unit_name, "pid": pid_val, "state": state, "job": result, "log_hint": hint, "action": action}
+                )
+            )
+        if error is not None:
+            print(f"{unit_name}: {error}", file=sys.stderr)
+        elif action not in NO_JOB_ACTIONS and result is None:
+            print(f"{unit_name}: job still running after {timeout:g}s", file=sys.stderr)
+        elif action not in NO_JOB_ACTIONS and result != "done":
+            print(f"{unit_name}: job {result}", file=sys.stderr)
+        else:
+            up += 1
+            continue
+        rc = 1
+    print(f"{up}/{total} units ok in {elapsed:.2f}s", file=sys.stderr)
+    return rc
@@ -0,0 +1,352 @@
+"""`ww up` / `ww down`: a project's services declared in ww.toml.
+
+    [services.db]
+    path = "services/db"
+
+    [services.api]
+    path = "api.py"
+    args = ["--port", "8000"]
+    env = { DEBUG = "1" }
+    watch = ["api.py", "lib"]      # default: the target itself
+    ignore = ["data"]              # extra watchfiles ignore paths
+    after = ["db"]                 # After= + Wants= on ww-db.service
+    memory_max = "512M"            # MemoryMax= (or "infinity")
+    cpu_quota = "50%"              # CPUQuota=
+    tasks_max = 64                 # TasksMax= (or "infinity")
+
+Paths are relative to the manifest. Service `api` runs as ww-api.service.
+`ww up` starts services in dependency levels: every service of a level
+starts concurrently (one connection, jobs awaited together), and a level
+starts once the previous one is up. `ww down` stops them in reverse order.
+"""
+
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from . import agent as _agent
+from .launch import (
+    LIVE_STATES,
+    MATCH_FIELDS,
+    REPORT_FIELDS,
+    TRANSIENT_SIGNATURE,
+    ensure_tools,
+    report_table,
+    runs_target,
+    transient_properties,
+)
+from .syncbus import BusError
+from .units import JOB_TIMEOUT, unit_object_path
+from .util import ResolvedTarget, resolve_target, to_slug, unit_name_from_slug
+
+MANIFEST_NAME = "ww.toml"
+SERVICE_KEYS = ("path", "args", "env", "watch", "ignore", "after", "memory_max", "cpu_quota", "tasks_max")
+_SIZE_SUFFIXES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+_INFINITY = (1 << 64) - 1  # what systemd stores for a limit of "infinity"
+
+
+class ManifestError(Exception):
+    pass
+
+
+@dataclass
+class Service:
+    name: str
+    unit: str
+    target: ResolvedTarget
+    env: list[str] = field(default_factory=list)  # KEY=VALUE
+    ignores: list[str] = field(default_factory=list)
+    after: list[str] = field(default_factory=list)  # service names
+    limits: list[tuple[str, tuple[str, Any]]] = field(default_factory=list)
+
+
+def find_manifest(start: Optional[Path] = None) -> Path:
+    """ww.toml in start (default: cwd) or the nearest parent directory."""
+    here = (start or Path.cwd()).resolve()
+    for d in (here, *here.parents):
+        candidate = d / MANIFEST_NAME
+        if candidate.is_file():
+            return candidate
+    raise FileNotFoundError(f"No {MANIFEST_NAME} in {here} or its parents")
+
+
+def _size(value: Any, key: str) -> int:
+    if _is_infinity(value):
+        return _INFINITY
+    if isinstance(value, int) and not isinstance(value, bool):
+        n = value
+    else:
+        text = str(value).strip().upper()
+        try:
+            if text and text[-1] in _SIZE_SUFFIXES:
+                n = int(float(text[:-1]) * _SIZE_SUFFIXES[text[-1]])
+            else:
+                n = int(text)
+        except ValueError:
+            raise ManifestError(f"{key}: expected bytes or a size like 512M, got {value!r}")
+    if not 0 <= n < _INFINITY:
+        raise ManifestError(f"{key}: out of range: {value!r}")
+    return n
+
+
+def _count(value: Any, key: str) -> int:
+    """A plain count such as TasksMax=: a non-negative integer or "infinity"."""
+    if _is_infinity(value):
+        return _INFINITY
+    if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value < _INFINITY:
+        raise ManifestError(f'{key}: expected a non-negative integer or "infinity", got {value!r}')
+    return value
+
+
+def _is_infinity(value: Any) -> bool:
+    return isinstance(value, str) and value.strip().lower() == "infinity"
+
+
+def _cpu_quota(value: Any, key: str) -> int:
+    """CPUQuota= percentage as CPUQuotaPerSecUSec."""
+    text = str(value).strip()
+    try:
+        percent = float(text[:-1] if text.endswith("%") else text)
+    except ValueError:
+        raise ManifestError(f"{key}: expected a percentage like 50%, got {value!r}")
+    if percent < 0:
+        raise ManifestError(f"{key}: out of range: {value!r}")
+    return int(percent * 10_000)
+
+
+def _strings(value: Any, key: str) -> list[str]:
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ManifestError(f"{key}: expected a string or a list of strings")
+    return list(value)
+
+
+def _service(name: str, spec: Any, root: Path) -> Service:
+    where = f"services.{name}"
+    if not isinstance(spec, dict):
+        raise ManifestError(f"{where}: expected a table")
+    unknown = sorted(set(spec) - set(SERVICE_KEYS))
+    if unknown:
+        raise ManifestError(f"{where}: unknown keys {', '.join(unknown)}")
+    if "path" not in spec:
+        raise ManifestError(f"{where}: missing path")
+    try:
+        target = resolve_target(root / str(spec["path"]))
+    except FileNotFoundError as e:
+        raise ManifestError(f"{where}: {e}")
+    target.argv.extend(_strings(spec.get("args", []), f"{where}.args"))
+    if "watch" in spec:
+        target.watch_paths = [str((root / p).resolve()) for p in _strings(spec["watch"], f"{where}.watch")]
+    env = spec.get("env", {})
+    if not isinstance(env, dict):
+        raise ManifestError(f"{where}.env: expected a table")
+    limits: list[tuple[str, tuple[str, Any]]] = []
+    if "memory_max" in spec:
+        limits.append(("MemoryMax", ("t", _size(spec["memory_max"], f"{where}.memory_max"))))
+    if "cpu_quota" in spec:
+        limits.append(("CPUQuotaPerSecUSec", ("t", _cpu_quota(spec["cpu_quota"], f"{where}.cpu_quota"))))
+    if "tasks_max" in spec:
+        limits.append(("TasksMax", ("t", _count(spec["tasks_max"], f"{where}.tasks_max"))))
+    return Service(
+        name=name,
+        unit=unit_name_from_slug(to_slug(name)),
+        target=target,
+        env=[f"{k}={v}" for k, v in env.items()],
+        ignores=_strings(spec.get("ignore", []), f"{where}.ignore"),
+        after=_strings(spec.get("after", []), f"{where}.after"),
+        limits=limits,
+    )
+
+
+def load(path: Path) -> dict[str, Service]:
+    """Services of a ww.toml by name; raises ManifestError for invalid content."""
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import tomli as tomllib
+
+    try:
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    except tomllib.TOMLDecodeError as e:
+        raise ManifestError(f"{path}: {e}")
+    specs = data.get("services")
+    if not isinstance(specs, dict) or not specs:
+        raise ManifestError(f"{path}: no [services.<name>] tables")
+    services = {name: _service(name, spec, path.parent) for name, spec in specs.items()}
+    for svc in services.values():
+        missing = [dep for dep in svc.after if dep not in services]
+        if missing:
+            raise ManifestError(f"services.{svc.name}.after: unknown services {', '.join(missing)}")
+    return services
+
+
+def levels(services: dict[str, Service]) -> list[list[Service]]:
+    """Topological levels: each service comes one level after its last dependency."""
+    remaining = {name: set(svc.after) & set(services) for name, svc in services.items()}
+    out: list[list[Service]] = []
+    while remaining:
+        ready = sorted(name for name, deps in remaining.items() if not deps)
+        if not ready:
+            raise ManifestError(f"dependency cycle between {', '.join(sorted(remaining))}")
+        out.append([services[name] for name in ready])
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return out
+
+
+def select(services: dict[str, Service], names: Iterable[str], with_deps: bool) -> dict[str, Service]:
+    """The named services (all when none are named), plus their dependencies if with_deps."""
+    names = list(names)
+    unknown = [n for n in names if n not in services]
+    if unknown:
+        raise ManifestError(f"not in the manifest: {', '.join(unknown)}")
+    if not names:
+        return services
+    picked: dict[str, Service] = {}
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name in picked:
+            continue
+        picked[name] = services[name]
+        if with_deps:
+            stack.extend(services[name].after)
+    return picked
+
+
+def _dependency_properties(svc: Service, services: dict[str, Service]) -> list[tuple[str, tuple[str, Any]]]:
+    units = [services[dep].unit for dep in svc.after]
+    return [("After", ("as", units)), ("Wants", ("as", units))] if units else []
+
+
+def _open(manifest: Optional[str], names: Iterable[str], with_deps: bool) -> tuple[dict[str, Service], dict[str, Service]]:
+    path = Path(manifest) if manifest else find_manifest()
+    services = load(path)
+    return services, select(services, names, with_deps)
+
+
+def up(
+    manifest: Optional[str] = None,
+    names: Iterable[str] = (),
+    timeout: float = JOB_TIMEOUT,
+    restart: bool = False,
+) -> int:
+    """Start the manifest's services (and their dependencies) level by level; returns the exit code.
+
+    A live ww-<service>.service that runs the same target is reused (or
+    restarted with restart=True); one running something else is an error.
+    Services whose dependencies did not come up are skipped.
+    """
+    ensure_tools()
+    try:
+        services, picked = _open(manifest, names, with_deps=True)
+        order = levels(picked)
+    except (FileNotFoundError, ManifestError) as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    try:
+        client = _agent.connect()
+    except (OSError, ValueError) as e:
+        print(f"Cannot reach the systemd user manager: {e}", file=sys.stderr)
+        return 1
+
+    started_at = time.monotonic()
+    rows: list[tuple[str, str, Optional[str], Optional[Exception], dict[str, Any]]] = []
+    failed: set[str] = set()
+    with client:
+        try:
+            loaded = {u.name: u for u in client.list_ww_units()}
+            live = [loaded[s.unit] for s in picked.values() if s.unit in loaded and loaded[s.unit].active_state in LIVE_STATES]
+            statuses = client.get_statuses([u.path for u in live], MATCH_FIELDS) if live else []
+            running = {u.name: st for u, st in zip(live, statuses)}
+
+            for level in order:
+                plan: list[tuple[Service, str]] = []
+                calls: list[tuple[str, str, tuple[Any, ...]]] = []
+                for svc in level:
+                    blocked = [dep for dep in svc.after if dep in failed]
+                    if blocked:
+                        failed.add(svc.name)
+                        rows.append((svc.unit, "skipped", None, ManifestError(f"not started: {', '.join(blocked)} failed"), {}))
+                        continue
+                    st = running.get(svc.unit)
+                    if st is not None and not runs_target(svc.target, st):
+                        failed.add(svc.name)
+                        rows.append((svc.unit, "failed", None, ManifestError("already runs a different target (ww down it first)"), {}))
+                        continue
+                    if st is not None and not restart:
+                        plan.append((svc, "reused"))
+                        continue
+                    if st is not None:
+                        plan.append((svc, "restarted"))
+                        calls.append(("RestartUnit", "ss", (svc.unit, "replace")))
+                        continue
+                    if svc.unit in loaded:
+                        # A failed transient unit stays loaded and blocks its name
+                        client.reset_failed_unit(svc.unit)
+                    props = transient_properties(
+                        svc.target,
+                        svc.unit,
+                        env=svc.env,
+                        ignores=svc.ignores,
+                        extra=_dependency_properties(svc, services) + svc.limits,
+                    )
+                    plan.append((svc, "started"))
+                    calls.append(("StartTransientUnit", TRANSIENT_SIGNATURE, (svc.unit, "fail", props, [])))
+
+                outcomes = iter(client.run_jobs(calls, timeout) if calls else ())
+                jobs = [(None, None, None) if action == "reused" else next(outcomes) for _, action in plan]
+                statuses = client.get_statuses([unit_object_path(svc.unit) for svc, _ in plan], REPORT_FIELDS)
+                for (svc, action), (_, result, error), st in zip(plan, jobs, statuses):
+                    if error is not None or (action != "reused" and result != "done"):
+                        failed.add(svc.name)
+                    rows.append((svc.unit, "failed" if error else action, result, error, st))
+        except (BusError, OSError) as e:
+            print(f"Failed to start units: {e}", file=sys.stderr)
+            return 1
+    return report_table(rows, timeout, time.monotonic() - started_at)
+
+
+def down(manifest: Optional[str] = None, names: Iterable[str] = (), timeout: float = JOB_TIMEOUT) -> int:
+    """Stop the manifest's services, dependents before their dependencies; returns the exit code."""
+    try:
+        _, picked = _open(manifest, names, with_deps=False)
+        order = levels(picked)
+    except (FileNotFoundError, ManifestError) as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    try:
+        client = _agent.connect()
+    except (OSError, ValueError) as e:
+        print(f"Cannot reach the systemd user manager: {e}", file=sys.stderr)
+        return 1
+
+    started_at = time.monotonic()
+    rows: list[tuple[str, str, Optional[str], Optional[Exception], dict[str, Any]]] = []
+    gone = {"ActiveState": "inactive", "SubState": "dead", "MainPID": 0}
+    with client:
+        try:
+            loaded = {u.name for u in client.list_ww_units()}
+            for level in reversed(order):
+                present = [svc for svc in level if svc.unit in loaded]
+                rows.extend((svc.unit, "inactive", None, None, gone) for svc in level if svc.unit not in loaded)
+                if not present:
+                    continue
+                outcomes = client.run_jobs([("StopUnit", "ss", (svc.unit, "replace")) for svc in present], timeout)
+                for svc in present:
+                    client.reset_failed_unit(svc.unit)
+                statuses = client.get_statuses([unit_object_path(svc.unit) for svc in present], REPORT_FIELDS)
+                for svc, (_, result, error), st in zip(present, outcomes, statuses):
+                    if st.get("LoadState") in (None, "not-found"):
+                        st = gone
+                    rows.append((svc.unit, "failed" if error else "stopped", result, error, st))
+        except (BusError, OSError) as e:
+            print(f"Failed to stop units: {e}", file=sys.stderr)
+            return 1
+    return report_table(rows, timeout, time.monotonic() - started_at)
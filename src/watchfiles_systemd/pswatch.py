@@ -0,0 +1,205 @@
+"""`ww ps --watch`: one snapshot, then the rows systemd reports as changed.
+
+The table comes from a UnitCache (one load, then PropertiesChanged/UnitNew/
+UnitRemoved signals), so watching costs no D-Bus calls per refresh, unlike
+`watch -n1 ww ps`. On a terminal only the rows that changed are redrawn and
+recent transitions are highlighted for HIGHLIGHT_SECS: failed (red),
+flapping (yellow), a new MainPID or a restart (cyan), any other state
+change (bold). Without a terminal each change prints its `ww ps` line
+(plus a note), or with --json one object per line:
+
+    {"event": "snapshot", "name": "api", "pid": 4242, "state": "active", "unit": "ww-api.service"}
+    {"event": "changed", "ts": 8123.4, "name": "api", "pid": 0, "state": "flapping", "unit": "ww-api.service",
+     "note": "flapping", "changed": {"ActiveState": ["active", "activating"], ...}}
+"""
+
+import asyncio
+import shutil
+import sys
+import time
+from typing import Any, Callable, Optional
+
+from .systemd_bus import UnitCache, UnitEvent, UnitStatus
+from .units import display_state, friendly_from_unit
+from .util import json_line
+
+HIGHLIGHT_SECS = 5.0
+_COLORS = {"failed": "31", "flapping": "33", "pid": "36", "state": "1"}
+
+
+def ps_line(unit: str, st: UnitStatus) -> str:
+    """The `ww ps` line for a unit: name, pid, state, unit (tab-separated)."""
+    return f"{friendly_from_unit(unit)}\t{st.main_pid}\t{display_state(st.active_state, st.sub_state, st.main_pid)}\t{unit}"
+
+
+def ps_record(unit: str, st: UnitStatus) -> dict[str, Any]:
+    return {
+        "name": friendly_from_unit(unit),
+        "pid": st.main_pid,
+        "state": display_state(st.active_state, st.sub_state, st.main_pid),
+        "unit": unit,
+    }
+
+
+def transition(ev: UnitEvent) -> Optional[tuple[str, str]]:
+    """(kind, note) for a change worth highlighting; kind is a _COLORS key."""
+    st = ev.status
+    state = display_state(st.active_state, st.sub_state, st.main_pid)
+    if state in ("failed", "flapping") and (
+        "ActiveState" in ev.changed or "SubState" in ev.changed or ev.kind == "new"
+    ):
+        return state, state
+    if "MainPID" in ev.changed:
+        old, new = ev.changed["MainPID"]
+        if old and new:
+            return "pid", f"pid {old}->{new}"
+    if "NRestarts" in ev.changed and ev.changed["NRestarts"][1]:
+        return "pid", f"restart #{ev.changed['NRestarts'][1]}"
+    if "ActiveState" in ev.changed or "SubState" in ev.changed:
+        old_active = ev.changed.get("ActiveState", (st.active_state,))[0]
+        old_sub = ev.changed.get("SubState", (st.sub_state,))[0]
+        old_pid = ev.changed.get("MainPID", (st.main_pid,))[0] or 0
+        old_state = display_state(old_active, old_sub, old_pid)
+        if old_state != state:
+            return "state", f"was {old_state}"
+    return None
+
+
+class PsWatch:
+    """Keeps the row table and renders it (screen, text deltas or JSON deltas)."""
+
+    def __init__(self, cache: UnitCache, mode: str = "screen", write: Optional[Callable[[str], Any]] = None):
+        self.cache = cache
+        self.mode = mode  # "screen" | "text" | "json"
+        self._out = write  # None: whatever sys.stdout is at the time of writing
+        self.order: list[str] = []  # unit names as drawn
+        self.marks: dict[str, tuple[str, str, float]] = {}  # unit -> (kind, note, expires)
+        self.height = 0
+
+    # -- rendering --------------------------------------------------------
+
+    def write(self, text: str) -> None:
+        (self._out or sys.stdout.write)(text)
+
+    def _line(self, unit: str) -> str:
+        st = self.cache.get(unit)
+        line = ps_line(unit, st) if st is not None else f"{friendly_from_unit(unit)}\t0\tinactive\t{unit}"
+        mark = self.marks.get(unit)
+        if mark is None:
+            return line
+        return f"\x1b[{_COLORS[mark[0]]}m{line}\t{mark[1]}\x1b[0m"
+
+    def draw_all(self) -> None:
+        self.order = sorted(self.cache.names())
+        self.height = shutil.get_terminal_size().lines
+        rows = self.order[: max(1, self.height - 1)]
+        out = ["\x1b[H"]
+        out.extend(f"{self._line(unit)}\x1b[K\n" for unit in rows)
+        hidden = len(self.order) - len(rows)
+        out.append(f"... {hidden} more (resize to see them)\x1b[K" if hidden > 0 else "")
+        out.append("\x1b[J")
+        self.write("".join(out))
+        sys.stdout.flush()
+
+    def draw_row(self, unit: str) -> None:
+        i = self.order.index(unit)
+        if i >= self.height - 1:
+            return
+        self.write(f"\x1b[{i + 1};1H{self._line(unit)}\x1b[K")
+        sys.stdout.flush()
+
+    def snapshot(self) -> None:
+        if self.mode == "screen":
+            self.draw_all()
+            return
+        for unit in sorted(self.cache.names()):
+            st = self.cache.get(unit)
+            if self.mode == "json":
+                self.write(json_line({"event": "snapshot", **ps_record(unit, st)}) + "\n")
+            else:
+                self.write(ps_line(unit, st) + "\n")
+        sys.stdout.flush()
+
+    # -- updates ----------------------------------------------------------
+
+    def apply(self, ev: UnitEvent) -> None:
+        if ev.kind == "job":
+            return
+        if ev.kind == "changed" and not {"ActiveState", "SubState", "MainPID", "NRestarts"} & set(ev.changed):
+            return
+        mark = transition(ev)
+        if mark is not None:
+            self.marks[ev.unit] = (mark[0], mark[1], ev.timestamp + HIGHLIGHT_SECS)
+        if self.mode == "json":
+            rec: dict[str, Any] = {"event": ev.kind, "ts": round(ev.timestamp, 6), **ps_record(ev.unit, ev.status)}
+            if mark is not None:
+                rec["note"] = mark[1]
+            if ev.kind == "changed":
+                rec["changed"] = {k: list(v) for k, v in ev.changed.items()}
+            self.write(json_line(rec) + "\n")
+            sys.stdout.flush()
+        elif self.mode == "text":
+            line = ps_line(ev.unit, ev.status)
+            note = "removed" if ev.kind == "removed" else mark[1] if mark is not None else ""
+            self.write(f"{line}\t{note}\n" if note else f"{line}\n")
+            sys.stdout.flush()
+        elif ev.kind == "changed" and ev.unit in self.order:
+            self.draw_row(ev.unit)
+        else:
+            if ev.kind == "removed":
+                self.marks.pop(ev.unit, None)
+            self.draw_all()
+
+    def expire(self, now: float) -> Optional[float]:
+        """Drop highlights that ran out (redrawing their rows); when the next one does (monotonic), if any."""
+        for unit, (_, _, until) in list(self.marks.items()):
+            if until <= now:
+                del self.marks[unit]
+                if self.mode == "screen" and unit in self.order:
+                    self.draw_row(unit)
+        return min((until for _, _, until in self.marks.values()), default=None)
+
+    async def run(self) -> None:
+        """Render the snapshot, then every change, until cancelled."""
+        events: asyncio.Queue = asyncio.Queue()
+        # Subscribe before the snapshot: a change right after it is not lost
+        changes = self.cache.changes()
+
+        async def feed() -> None:
+            async for ev in changes:
+                events.put_nowait(ev)
+
+        feeder = asyncio.ensure_future(feed())
+        self.snapshot()
+        try:
+            while True:
+                now = time.monotonic()
+                next_expiry = self.expire(now)
+                wait = None if next_expiry is None or self.mode != "screen" else max(0.0, next_expiry - now)
+                try:
+                    ev = await asyncio.wait_for(events.get(), wait)
+                except asyncio.TimeoutError:
+                    continue
+                self.apply(ev)
+                if self.mode == "screen" and shutil.get_terminal_size().lines != self.height:
+                    self.draw_all()
+        finally:
+            feeder.cancel()
+
+
+async def watch(client, mode: str = "screen") -> None:
+    """`ww ps --watch` on client until cancelled; raises ConnectionError if the bus drops."""
+    from .events import until_disconnect
+
+    cache = await UnitCache(client).start()
+    view = PsWatch(cache, mode)
+    if mode == "screen":
+        # Alternate screen, cursor hidden; both restored on exit
+        sys.stdout.write("\x1b[?1049h\x1b[?25l")
+    try:
+        await until_disconnect(client, asyncio.ensure_future(view.run()))
+    finally:
+        cache.stop()
+        if mode == "screen":
+            sys.stdout.write("\x1b[?25h\x1b[?1049l")
+            sys.stdout.flush()
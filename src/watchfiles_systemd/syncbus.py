@@ -0,0 +1,554 @@
+"""Blocking, stdlib-only D-Bus client for one-shot commands.
+
+`ww pid foo` needs one or two method calls; spinning up asyncio, importing
+dbus-next and building proxies costs far more than the calls themselves. This
+module speaks just enough of the wire protocol for those calls: EXTERNAL
+auth, fixed method signatures and an unmarshaller for their replies. Calls
+can be pipelined (send several, then collect the replies) so `ww ps` costs
+one round trip for the whole table instead of one per unit.
+
+The dashboard, follow modes and bulk commands keep using SystemdClient.
+"""
+
+import os
+import socket
+import struct
+import time
+from typing import Any, Iterable, NamedTuple, Optional
+
+from . import trace as _trace
+from .units import (
+    IFACE_MANAGER,
+    IFACE_PROPERTIES,
+    STATUS_FIELDS,
+    STATUS_PROPS,
+    SYSTEMD_DEST,
+    SYSTEMD_PATH,
+    UnitRow,
+    WW_UNIT_PATTERN,
+    is_ww_unit,
+    unit_name_from_path,
+    unit_object_path,
+)
+
+
+_METHOD_CALL, _METHOD_RETURN, _ERROR, _SIGNAL = 1, 2, 3, 4
+_NO_REPLY_EXPECTED = 0x1
+# Header field codes
+_PATH, _INTERFACE, _MEMBER, _ERROR_NAME, _REPLY_SERIAL, _DESTINATION, _SENDER, _SIGNATURE = range(1, 9)
+_HEADER_SIGS = {_PATH: "o", _INTERFACE: "s", _MEMBER: "s", _ERROR_NAME: "s", _DESTINATION: "s", _SIGNATURE: "g"}
+
+_ALIGN = {"y": 1, "g": 1, "v": 1, "n": 2, "q": 2, "b": 4, "i": 4, "u": 4, "h": 4, "s": 4, "o": 4, "a": 4,
+          "x": 8, "t": 8, "d": 8, "(": 8, "{": 8}
+_FIXED = {"y": "B", "n": "h", "q": "H", "b": "I", "i": "i", "u": "I", "h": "I", "x": "q", "t": "Q", "d": "d"}
+
+DEFAULT_CALL_TIMEOUT = 25.0
+
+
+class BusError(Exception):
+    """Error reply from the peer; mirrors dbus_next.DBusError's type/text."""
+
+    def __init__(self, type_: str, text: str):
+        super().__init__(text)
+        self.type = type_
+        self.text = text
+
+
+def _type_end(sig: str, i: int) -> int:
+    """Index just past the single complete type starting at sig[i]."""
+    c = sig[i]
+    if c == "a":
+        return _type_end(sig, i + 1)
+    if c in "({":
+        close = ")" if c == "(" else "}"
+        i += 1
+        while sig[i] != close:
+            i = _type_end(sig, i)
+        return i + 1
+    return i + 1
+
+
+def _split(sig: str) -> list[str]:
+    out, i = [], 0
+    while i < len(sig):
+        j = _type_end(sig, i)
+        out.append(sig[i:j])
+        i = j
+    return out
+
+
+class _Writer:
+    """Little-endian marshaller for the argument types ww sends."""
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def align(self, n: int) -> None:
+        self.buf.extend(b"\0" * (-len(self.buf) % n))
+
+    def put(self, sig: str, value: Any) -> None:
+        c = sig[0]
+        self.align(_ALIGN[c])
+        if c in "so":
+            raw = value.encode()
+            self.buf += struct.pack("<I", len(raw)) + raw + b"\0"
+        elif c == "g":
+            raw = value.encode()
+            self.buf += bytes((len(raw),)) + raw + b"\0"
+        elif c == "a":
+            at = len(self.buf)
+            self.buf += b"\0\0\0\0"
+            elem = sig[1:]
+            self.align(_ALIGN[elem[0]])
+            start = len(self.buf)
+            for item in value:
+                self.put(elem, item)
+            struct.pack_into("<I", self.buf, at, len(self.buf) - start)
+        elif c == "(":
+            for sub, item in zip(_split(sig[1:-1]), value):
+                self.put(sub, item)
+        elif c == "v":
+            # Variants are passed as (signature, value)
+            inner, item = value
+            self.put("g", inner)
+            self.put(inner, item)
+        else:
+            self.buf += struct.pack("<" + _FIXED[c], value)
+
+
+class _Reader:
+    """Unmarshaller for any signature; variants are unwrapped to their values."""
+
+    def __init__(self, data: bytes, endian: str, offset: int = 0):
+        self.data = data
+        self.pos = offset
+        self.e = endian
+
+    def _align(self, n: int) -> None:
+        self.pos += -self.pos % n
+
+    def get(self, sig: str) -> Any:
+        c = sig[0]
+        self._align(_ALIGN[c])
+        data = self.data
+        if c in "so":
+            (n,) = struct.unpack_from(self.e + "I", data, self.pos)
+            s = data[self.pos + 4 : self.pos + 4 + n].decode(errors="replace")
+            self.pos += 5 + n
+            return s
+        if c == "g":
+            n = data[self.pos]
+            s = data[self.pos + 1 : self.pos + 1 + n].decode()
+            self.pos += 2 + n
+            return s
+        if c == "v":
+            return self.get(self.get("g"))
+        if c == "a":
+            (n,) = struct.unpack_from(self.e + "I", data, self.pos)
+            self.pos += 4
+            elem = sig[1:]
+            self._align(_ALIGN[elem[0]])
+            end = self.pos + n
+            if elem[0] == "{":
+                k, v = _split(elem[1:-1])
+                d = {}
+                while self.pos < end:
+                    self._align(8)
+                    key = self.get(k)
+                    d[key] = self.get(v)
+                return d
+            if elem == "y":
+                self.pos = end
+                return data[end - n : end]
+            items = []
+            while self.pos < end:
+                items.append(self.get(elem))
+            return items
+        if c == "(":
+            return tuple(self.get(sub) for sub in _split(sig[1:-1]))
+        fmt = _FIXED[c]
+        (v,) = struct.unpack_from(self.e + fmt, data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return bool(v) if c == "b" else v
+
+    def body(self, sig: str) -> list[Any]:
+        return [self.get(t) for t in _split(sig)]
+
+
+class _Message(NamedTuple):
+    type: int
+    serial: int
+    reply_serial: Optional[int]
+    path: Optional[str]
+    interface: Optional[str]
+    member: Optional[str]
+    error_name: Optional[str]
+    body: list[Any]
+    size: int
+
+
+def _parse_message(data: bytes) -> _Message:
+    e = "<" if data[0:1] == b"l" else ">"
+    mtype = data[1]
+    (serial,) = struct.unpack_from(e + "I", data, 8)
+    r = _Reader(data, e, 12)
+    fields = dict(r.get("a(yv)"))
+    r._align(8)
+    sig = fields.get(_SIGNATURE, "")
+    body = r.body(sig) if sig else []
+    return _Message(
+        mtype,
+        serial,
+        fields.get(_REPLY_SERIAL),
+        fields.get(_PATH),
+        fields.get(_INTERFACE),
+        fields.get(_MEMBER),
+        fields.get(_ERROR_NAME),
+        body,
+        len(data),
+    )
+
+
+def _session_bus_socket() -> socket.socket:
+    addrs = os.environ.get("DBUS_SESSION_BUS_ADDRESS") or ""
+    if not addrs:
+        runtime = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+        addrs = f"unix:path={os.path.join(runtime, 'bus')}"
+    last: Optional[Exception] = None
+    for addr in addrs.split(";"):
+        kind, _, params = addr.partition(":")
+        if kind != "unix":
+            continue
+        opts = dict(p.split("=", 1) for p in params.split(",") if "=" in p)
+        if "path" in opts:
+            target = opts["path"]
+        elif "abstract" in opts:
+            target = "\0" + opts["abstract"]
+        else:
+            continue
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(target)
+            return sock
+        except OSError as e:
+            sock.close()
+            last = e
+    raise last or ConnectionError(f"no usable unix address in {addrs!r}")
+
+
+def private_socket_path() -> Optional[str]:
+    """Path of systemd's private socket for this user, if it is usable."""
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+    path = os.path.join(runtime, "systemd", "private")
+    if os.path.exists(path) and os.access(path, os.R_OK | os.W_OK):
+        return path
+    return None
+
+
+class SyncSystemdClient:
+    """Blocking connection to the systemd user manager.
+
+    send() queues a call and returns its serial; reply() reads until that
+    serial's answer arrives. Signals read along the way are kept for
+    wait_job(). Transport selection follows connect_user_bus().
+    """
+
+    def __init__(self, sock: socket.socket, direct: bool):
+        self.sock = sock
+        self.direct = direct
+        self._serial = 0
+        self._buf = bytearray()
+        self._replies: dict[int, _Message] = {}
+        self._signals: list[_Message] = []
+        self._has_list_by_patterns = True
+        # serial -> trace span of calls awaiting a reply (only while tracing)
+        self._spans: dict[int, _trace.Span] = {}
+
+    @classmethod
+    def connect(cls, transport: Optional[str] = None, timeout: float = DEFAULT_CALL_TIMEOUT) -> "SyncSystemdClient":
+        transport = (transport or os.getenv("WW_BUS_TRANSPORT") or "auto").strip().lower()
+        if transport not in ("auto", "private", "session"):
+            raise ValueError(f"unknown bus transport: {transport!r} (expected auto|private|session)")
+        with _trace.span("connect", f"sync/{transport}"):
+            return cls._connect(transport, timeout)
+
+    @classmethod
+    def _connect(cls, transport: str, timeout: float) -> "SyncSystemdClient":
+        sock = None
+        direct = False
+        if transport != "session":
+            path = private_socket_path()
+            if path is not None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    sock.connect(path)
+                    direct = True
+                except OSError:
+                    sock.close()
+                    sock = None
+                    if transport == "private":
+                        raise
+            elif transport == "private":
+                raise FileNotFoundError("systemd private socket not accessible (is XDG_RUNTIME_DIR set?)")
+        if sock is None:
+            sock = _session_bus_socket()
+        sock.settimeout(timeout)
+        client = cls(sock, direct)
+        try:
+            client._authenticate()
+            if not direct:
+                # Hello must be the first call; its reply is read lazily with the next one
+                client.send("org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus", "Hello")
+        except Exception:
+            sock.close()
+            raise
+        return client
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self) -> "SyncSystemdClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _authenticate(self) -> None:
+        uid = str(os.getuid()).encode().hex()
+        self.sock.sendall(b"\0AUTH EXTERNAL " + uid.encode() + b"\r\n")
+        line = b""
+        while not line.endswith(b"\r\n"):
+            chunk = self.sock.recv(256)
+            if not chunk:
+                raise ConnectionError("connection closed during authentication")
+            line += chunk
+        if not line.startswith(b"OK "):
+            raise ConnectionError(f"authentication rejected: {line.strip().decode(errors='replace')}")
+        self.sock.sendall(b"BEGIN\r\n")
+
+    # -- wire ---------------------------------------------------------------
+
+    def send(
+        self,
+        destination: str,
+        path: str,
+        interface: str,
+        member: str,
+        signature: str = "",
+        args: Iterable[Any] = (),
+        no_reply: bool = False,
+    ) -> int:
+        self._serial += 1
+        body = _Writer()
+        for t, a in zip(_split(signature), args):
+            body.put(t, a)
+        fields = [(_PATH, path), (_INTERFACE, interface), (_MEMBER, member)]
+        if not self.direct:
+            fields.append((_DESTINATION, destination))
+        if signature:
+            fields.append((_SIGNATURE, signature))
+        head = _Writer()
+        head.buf += struct.pack(
+            "<cBBBII", b"l", _METHOD_CALL, _NO_REPLY_EXPECTED if no_reply else 0, 1, len(body.buf), self._serial
+        )
+        at = len(head.buf)
+        head.buf += b"\0\0\0\0"
+        start = len(head.buf)
+        for code, value in fields:
+            head.align(8)
+            head.buf += bytes((code,))
+            head.put("g", _HEADER_SIGS[code])
+            head.put(_HEADER_SIGS[code], value)
+        struct.pack_into("<I", head.buf, at, len(head.buf) - start)
+        head.align(8)
+        if _trace.TRACER.active:
+            name = f"{interface.rsplit('.', 1)[-1]}.{member}"
+            self._spans[self._serial] = _trace.Span("dbus", name, path, len(head.buf) + len(body.buf))
+        self.sock.sendall(bytes(head.buf) + bytes(body.buf))
+        return self._serial
+
+    def _read_message(self) -> _Message:
+        while True:
+            if len(self._buf) >= 16:
+                e = "<" if self._buf[0:1] == b"l" else ">"
+                body_len, _, fields_len = struct.unpack_from(e + "III", self._buf, 4)
+                total = 16 + fields_len + (-fields_len % 8) + body_len
+                if len(self._buf) >= total:
+                    data = bytes(self._buf[:total])
+                    del self._buf[:total]
+                    return _parse_message(data)
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("connection closed by peer")
+            self._buf += chunk
+
+    def _pump(self) -> None:
+        msg = self._read_message()
+        if msg.type == _SIGNAL:
+            self._signals.append(msg)
+        elif msg.reply_serial is not None:
+            self._replies[msg.reply_serial] = msg
+            s = self._spans.pop(msg.reply_serial, None)
+            if s is not None:
+                outcome = msg.error_name.rsplit(".", 1)[-1] if msg.type == _ERROR else "ok"
+                _trace.TRACER.finish(s, outcome, msg.size)
+
+    def reply(self, serial: int) -> list[Any]:
+        """Body of the reply to serial; raises BusError for error replies."""
+        while serial not in self._replies:
+            self._pump()
+        msg = self._replies.pop(serial)
+        if msg.type == _ERROR:
+            text = msg.body[0] if msg.body and isinstance(msg.body[0], str) else ""
+            raise BusError(msg.error_name or "", text)
+        return msg.body
+
+    def call(self, path: str, interface: str, member: str, signature: str = "", args: Iterable[Any] = ()) -> list[Any]:
+        return self.reply(self.send(SYSTEMD_DEST, path, interface, member, signature, args))
+
+    def _manager(self, member: str, signature: str = "", args: Iterable[Any] = ()) -> int:
+        return self.send(SYSTEMD_DEST, SYSTEMD_PATH, IFACE_MANAGER, member, signature, args)
+
+    # -- systemd ------------------------------------------------------------
+
+    def reset_failed_unit(self, unit_name: str) -> None:
+        try:
+            self.reply(self._manager("ResetFailedUnit", "s", (unit_name,)))
+        except BusError:
+            # Some versions only expose ResetFailed (global); ignore
+            pass
+
+    def get_unit_by_pid(self, pid: int) -> Optional[str]:
+        """Name of the unit whose cgroup contains pid, or None."""
+        try:
+            (path,) = self.reply(self._manager("GetUnitByPID", "u", (pid,)))
+        except BusError:
+            return None
+        return unit_name_from_path(path)
+
+    def list_ww_units(self, states: Iterable[str] = ()) -> list[UnitRow]:
+        """Same contract as SystemdClient.list_ww_units()."""
+        states = list(states)
+        rows = None
+        if self._has_list_by_patterns:
+            try:
+                (rows,) = self.reply(self._manager("ListUnitsByPatterns", "asas", (states, [WW_UNIT_PATTERN])))
+            except BusError as e:
+                if e.type != "org.freedesktop.DBus.Error.UnknownMethod":
+                    raise
+                self._has_list_by_patterns = False
+        if rows is None:
+            (all_rows,) = self.reply(self._manager("ListUnits"))
+            rows = [r for r in all_rows if is_ww_unit(r[0]) and (not states or r[3] in states or r[4] in states)]
+        return [UnitRow(r[0], r[3], r[4], r[6]) for r in rows]
+
+    def get_statuses(self, paths: Iterable[str], fields: Iterable[str] = STATUS_FIELDS) -> list[dict[str, Any]]:
+        """Requested properties for every path, keyed by D-Bus property name.
+
+        All GetAll calls go out before any reply is read. Interfaces that fail
+        to answer are skipped, so absent keys mean "unknown".
+        """
+        by_iface: dict[str, list[str]] = {}
+        for key in fields:
+            by_iface.setdefault(STATUS_PROPS[key][0], []).append(key)
+        pending = [
+            [(keys, self.send(SYSTEMD_DEST, p, IFACE_PROPERTIES, "GetAll", "s", (iface,))) for iface, keys in by_iface.items()]
+            for p in paths
+        ]
+        out = []
+        for calls in pending:
+            st: dict[str, Any] = {}
+            for keys, serial in calls:
+                try:
+                    (values,) = self.reply(serial)
+                except BusError:
+                    continue
+                for key in keys:
+                    if key in values:
+                        st[key] = values[key]
+            out.append(st)
+        return out
+
+    def get_status(self, unit_name: str, fields: Iterable[str] = STATUS_FIELDS) -> dict[str, Any]:
+        return self.get_statuses([unit_object_path(unit_name)], fields)[0]
+
+    def wait_job(self, job: str, timeout: Optional[float]) -> Optional[str]:
+        """JobRemoved result for job, or None if it did not finish within timeout."""
+        return self.wait_jobs([job], timeout)[job]
+
+    def wait_jobs(self, jobs: Iterable[str], timeout: Optional[float]) -> dict[str, Optional[str]]:
+        """JobRemoved result per job; None for those still running when timeout expires."""
+        results: dict[str, Optional[str]] = {job: None for job in jobs}
+        pending = set(results)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        seen = 0
+        while True:
+            for msg in self._signals[seen:]:
+                if msg.member == "JobRemoved" and msg.interface == IFACE_MANAGER and msg.body[1] in pending:
+                    results[msg.body[1]] = msg.body[3]
+                    pending.discard(msg.body[1])
+            seen = len(self._signals)
+            if not pending:
+                return results
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return results
+                self.sock.settimeout(left)
+            else:
+                self.sock.settimeout(None)
+            try:
+                self._pump()
+            except socket.timeout:
+                return results
+            finally:
+                self.sock.settimeout(DEFAULT_CALL_TIMEOUT)
+
+    def run_job(
+        self, method: str, signature: str, args: Iterable[Any], timeout: Optional[float]
+    ) -> tuple[str, Optional[str]]:
+        """Issue a job-returning Manager call (StopUnit, StartTransientUnit, ...) and wait for its JobRemoved.
+
+        Subscribe (and AddMatch on a bus) are pipelined with the job call, so
+        the signal cannot slip past before we listen for it.
+        """
+        job, result, error = self.run_jobs([(method, signature, args)], timeout)[0]
+        if error is not None:
+            raise error
+        return job, result
+
+    def run_jobs(
+        self, calls: Iterable[tuple[str, str, Iterable[Any]]], timeout: Optional[float]
+    ) -> list[tuple[Optional[str], Optional[str], Optional[BusError]]]:
+        """run_job() for several (method, signature, args) calls at once.
+
+        All calls are written before any reply is read, and the jobs are
+        awaited together, so the total wait is that of the slowest job.
+        Returns (job, result, error) per call: a call systemd refused has
+        job None and its BusError; timeout applies to all jobs together.
+        """
+        setup = [self._manager("Subscribe")]
+        if not self.direct:
+            rule = f"type='signal',sender='{SYSTEMD_DEST}',interface='{IFACE_MANAGER}',member='JobRemoved'"
+            setup.append(
+                self.send("org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus", "AddMatch", "s", (rule,))
+            )
+        serials = [self._manager(method, signature, args) for method, signature, args in calls]
+        for s in setup:
+            try:
+                self.reply(s)
+            except BusError:
+                # Without the subscription the wait below just times out
+                pass
+        issued: list[tuple[Optional[str], Optional[BusError]]] = []
+        for serial in serials:
+            try:
+                (job,) = self.reply(serial)
+                issued.append((job, None))
+            except BusError as e:
+                issued.append((None, e))
+        results = self.wait_jobs([job for job, _ in issued if job is not None], timeout)
+        return [(job, results.get(job) if job else None, error) for job, error in issued]
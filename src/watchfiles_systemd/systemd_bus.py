@@ -1,26 +1,659 @@
 import asyncio
-from typing import Any, Iterable, Optional
+import logging
+import os
+import time
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, NamedTuple, Optional
 
-from dbus_next import BusType, Variant
+from dbus_next import BusType, DBusError, ErrorType, Message, MessageType, Variant
+from dbus_next.errors import AuthError
 from dbus_next.aio import MessageBus
+from dbus_next.introspection import Node
 
+from . import trace as _trace
+from .syncbus import _split, private_socket_path
+from .units import (
+    IFACE_MANAGER,
+    IFACE_PROPERTIES,
+    IFACE_SERVICE,
+    IFACE_UNIT,
+    STATUS_FIELDS,
+    STATUS_PROPS as _STATUS_PROPS,
+    SYSTEMD_DEST,
+    SYSTEMD_PATH,
+    UnitRow,
+    WW_UNIT_PATTERN,
+    is_ww_unit,
+    unit_name_from_path,
+    unit_object_path,
+)
 
-SYSTEMD_DEST = "org.freedesktop.systemd1"
-SYSTEMD_PATH = "/org/freedesktop/systemd1"
-IFACE_MANAGER = "org.freedesktop.systemd1.Manager"
-IFACE_PROPERTIES = "org.freedesktop.DBus.Properties"
-IFACE_SERVICE = "org.freedesktop.systemd1.Service"
 
+# One match rule for every signal systemd emits (unit, job and manager objects)
+_SIGNAL_MATCH = f"type='signal',sender='{SYSTEMD_DEST}',path_namespace='{SYSTEMD_PATH}'"
 
-async def connect_user_bus() -> MessageBus:
-    bus = await MessageBus(bus_type=BusType.SESSION).connect()
+
+# Static introspection data for the parts of systemd's API we call. Building
+# proxies from these avoids an Introspect round trip per object; the method
+# signatures are stable across systemd releases.
+MANAGER_XML = """
+<node>
+  <interface name="org.freedesktop.systemd1.Manager">
+    <method name="GetUnit">
+      <arg type="s" name="name" direction="in"/>
+      <arg type="o" name="unit" direction="out"/>
+    </method>
+    <method name="GetUnitByPID">
+      <arg type="u" name="pid" direction="in"/>
+      <arg type="o" name="unit" direction="out"/>
+    </method>
+    <method name="StartUnit">
+      <arg type="s" name="name" direction="in"/>
+      <arg type="s" name="mode" direction="in"/>
+      <arg type="o" name="job" direction="out"/>
+    </method>
+    <method name="StopUnit">
+      <arg type="s" name="name" direction="in"/>
+      <arg type="s" name="mode" direction="in"/>
+      <arg type="o" name="job" direction="out"/>
+    </method>
+    <method name="RestartUnit">
+      <arg type="s" name="name" direction="in"/>
+      <arg type="s" name="mode" direction="in"/>
+      <arg type="o" name="job" direction="out"/>
+    </method>
+    <method name="ResetFailedUnit">
+      <arg type="s" name="name" direction="in"/>
+    </method>
+    <method name="ListUnits">
+      <arg type="a(ssssssouso)" name="units" direction="out"/>
+    </method>
+    <method name="ListUnitsByPatterns">
+      <arg type="as" name="states" direction="in"/>
+      <arg type="as" name="patterns" direction="in"/>
+      <arg type="a(ssssssouso)" name="units" direction="out"/>
+    </method>
+    <method name="Subscribe"/>
+    <method name="Unsubscribe"/>
+    <method name="StartTransientUnit">
+      <arg type="s" name="name" direction="in"/>
+      <arg type="s" name="mode" direction="in"/>
+      <arg type="a(sv)" name="properties" direction="in"/>
+      <arg type="a(sa(sv))" name="aux" direction="in"/>
+      <arg type="o" name="job" direction="out"/>
+    </method>
+    <signal name="UnitNew">
+      <arg type="s" name="id"/>
+      <arg type="o" name="unit"/>
+    </signal>
+    <signal name="UnitRemoved">
+      <arg type="s" name="id"/>
+      <arg type="o" name="unit"/>
+    </signal>
+    <signal name="JobRemoved">
+      <arg type="u" name="id"/>
+      <arg type="o" name="job"/>
+      <arg type="s" name="unit"/>
+      <arg type="s" name="result"/>
+    </signal>
+  </interface>
+</node>
+"""
+
+PROPERTIES_XML = """
+<node>
+  <interface name="org.freedesktop.DBus.Properties">
+    <method name="Get">
+      <arg type="s" name="interface" direction="in"/>
+      <arg type="s" name="property" direction="in"/>
+      <arg type="v" name="value" direction="out"/>
+    </method>
+    <method name="GetAll">
+      <arg type="s" name="interface" direction="in"/>
+      <arg type="a{sv}" name="properties" direction="out"/>
+    </method>
+    <signal name="PropertiesChanged">
+      <arg type="s" name="interface"/>
+      <arg type="a{sv}" name="changed_properties"/>
+      <arg type="as" name="invalidated_properties"/>
+    </signal>
+  </interface>
+</node>
+"""
+
+
+@lru_cache(maxsize=None)
+def _node(xml: str) -> Node:
+    with _trace.span("introspect", "Node.parse", f"{len(xml)} bytes of XML"):
+        return Node.parse(xml)
+
+
+def _val(v):
+    return v.value if isinstance(v, Variant) else v
+
+
+# Default properties reported after a job finishes
+JOB_STATUS_FIELDS: tuple[str, ...] = ("LoadState", "ActiveState", "SubState", "MainPID", "Result")
+
+
+class UnitStatus:
+    """Snapshot of the Unit/Service properties ww cares about.
+
+    Attributes not requested (or not exposed by this systemd) keep their
+    defaults: "unknown" for the states, 0 for MainPID, None otherwise.
+    """
+
+    __slots__ = ("path",) + tuple(attr for _, attr in _STATUS_PROPS.values())
+
+    def __init__(self, path: str):
+        self.path = path
+        self.load_state: Optional[str] = None
+        self.active_state: str = "unknown"
+        self.sub_state: str = "unknown"
+        self.active_enter_timestamp: Optional[int] = None
+        self.main_pid: int = 0
+        self.working_directory: Optional[str] = None
+        self.exec_start: Optional[list] = None  # a(sasbttttuii): (path, argv, ignore_errors, ...)
+        self.n_restarts: Optional[int] = None
+        self.result: Optional[str] = None
+        self.exec_main_status: Optional[int] = None
+        self.exec_main_code: Optional[int] = None
+
+    @property
+    def found(self) -> bool:
+        """False when the unit is not loaded (only meaningful if LoadState was requested)."""
+        return self.load_state not in (None, "not-found")
+
+    def as_dict(self) -> dict[str, Any]:
+        """Legacy dict form keyed by D-Bus property name (unset keys omitted)."""
+        d: dict[str, Any] = {}
+        for key, (_, attr) in _STATUS_PROPS.items():
+            v = getattr(self, attr)
+            if v is not None and v != "":
+                d[key] = v
+        return d
+
+    def __repr__(self) -> str:
+        return f"UnitStatus({self.path!r}, {self.active_state}/{self.sub_state}, pid={self.main_pid})"
+
+
+class DirectTransportUnavailable(RuntimeError):
+    """The installed dbus-next lacks the internals DirectMessageBus builds on."""
+
+
+class DirectMessageBus(MessageBus):
+    """Peer-to-peer connection to the user manager's private socket.
+
+    There is no broker on the other end: no Hello to send, no unique name to
+    receive and no match rules to register (systemd sends its signals to
+    every direct connection unconditionally).
+    """
+
+    async def connect(self) -> "DirectMessageBus":
+        # Built on dbus-next internals (pinned to 0.2.x); should a release
+        # move them, report it instead of half-connecting
+        try:
+            authenticate, reader, writer = self._authenticate, self._message_reader, self._writer
+        except AttributeError as e:
+            raise DirectTransportUnavailable(f"direct transport does not support this dbus-next: {e}") from e
+        await authenticate()
+        self._loop.add_reader(self._fd, reader)
+        # Placeholder; dbus-next holds writes until a unique name is set
+        self.unique_name = ":direct"
+        writer.schedule_write()
+        return self
+
+    def _call(self, msg, callback):
+        # Bus-driver calls (GetNameOwner, AddMatch, ...) that dbus-next issues
+        # on its own have nobody to answer them here: reply locally. Match
+        # rules need no registering; no name has an owner.
+        if msg.destination != "org.freedesktop.DBus":
+            return super()._call(msg, callback)
+        if not msg.serial:
+            msg.serial = self.next_serial()
+        if msg.member in ("AddMatch", "RemoveMatch"):
+            reply = Message.new_method_return(msg)
+        elif msg.member == "GetNameOwner":
+            reply = Message.new_error(msg, ErrorType.NAME_HAS_NO_OWNER.value, "no bus driver on a direct connection")
+        else:
+            reply = Message.new_error(msg, ErrorType.NOT_SUPPORTED.value, "no bus driver on a direct connection")
+        self._loop.call_soon(callback, reply, None)
+
+
+class _PatientSocket:
+    """Socket proxy for dbus-next's writer: a full send buffer means "wait".
+
+    dbus-next treats EAGAIN from send() as fatal and drops the connection,
+    which a burst of a few thousand queued messages (a 1000-unit snapshot
+    load) is enough to trigger. Reporting 0 bytes sent makes the writer wait
+    for the socket to become writable instead.
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+
+    def send(self, data) -> int:
+        try:
+            return self._sock.send(data)
+        except BlockingIOError:
+            return 0
+
+    def sendmsg(self, *args) -> int:
+        try:
+            return self._sock.sendmsg(*args)
+        except BlockingIOError:
+            return 0
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+def patient_writes(bus: MessageBus) -> MessageBus:
+    """Make bus survive send-buffer backpressure (see _PatientSocket); returns bus.
+
+    A dbus-next without the private writer this patches gets the bus back
+    unchanged: it works, only without the backpressure fix.
+    """
+    try:
+        writer = bus._writer
+        writer.sock = _PatientSocket(writer.sock)
+    except AttributeError:
+        pass
     return bus
 
 
+class JobResult(NamedTuple):
+    """Outcome of a job-tracked start/stop/restart."""
+
+    unit: str
+    job: str
+    result: Optional[str]  # JobRemoved result ("done", "failed", ...); None if the wait timed out
+    status: Optional[UnitStatus]  # unit status once the job finished (or the wait gave up)
+    elapsed: float  # seconds from issuing the call to the final status
+    error: Optional[str] = None  # D-Bus error text when the job could not be queued
+
+    @property
+    def ok(self) -> bool:
+        return self.result == "done"
+
+
+async def connect_user_bus(transport: Optional[str] = None) -> MessageBus:
+    """Connect to the systemd user manager.
+
+    transport: "private" talks to $XDG_RUNTIME_DIR/systemd/private directly
+    (no broker hop, no Hello), "session" goes through the session bus and
+    "auto" (default) tries private first. WW_BUS_TRANSPORT overrides the
+    default.
+    """
+    transport = (transport or os.getenv("WW_BUS_TRANSPORT") or "auto").strip().lower()
+    if transport not in ("auto", "private", "session"):
+        raise ValueError(f"unknown bus transport: {transport!r} (expected auto|private|session)")
+    with _trace.span("connect", f"async/{transport}"):
+        bus = await _connect(transport)
+    _trace.instrument_bus(bus)
+    return bus
+
+
+async def _connect(transport: str) -> MessageBus:
+    if transport != "session":
+        path = private_socket_path()
+        if path is not None:
+            try:
+                return await patient_writes(DirectMessageBus(bus_address=f"unix:path={path}")).connect()
+            except (DirectTransportUnavailable, AuthError, OSError):
+                # The session bus needs no dbus-next internals and no access to the private socket
+                if transport == "private":
+                    raise
+        elif transport == "private":
+            raise FileNotFoundError("systemd private socket not accessible (is XDG_RUNTIME_DIR set?)")
+    return await patient_writes(MessageBus(bus_type=BusType.SESSION)).connect()
+
+
+class SystemdClient:
+    """Long-lived handle on the systemd user manager.
+
+    Owns one MessageBus and caches the Manager proxy. Unit proxies are built
+    from bundled introspection data, so each helper costs exactly the method
+    call it makes.
+    """
+
+    def __init__(self, bus: MessageBus):
+        self.bus = bus
+        self._manager = None
+        # Flipped off once the manager rejects ListUnitsByPatterns (systemd < 230)
+        self._has_list_by_patterns = True
+        self._subscription: Optional[asyncio.Future] = None
+        self._signal_listeners: list[Callable[[Message], None]] = []
+        self._job_waiters: dict[str, asyncio.Future] = {}
+        # JobRemoved results that arrived before anyone waited for them; a job
+        # can finish in the same read as the reply that announced it.
+        self._job_results: "OrderedDict[str, str]" = OrderedDict()
+
+    @classmethod
+    async def connect(cls, transport: Optional[str] = None) -> "SystemdClient":
+        return cls(await connect_user_bus(transport))
+
+    @property
+    def direct(self) -> bool:
+        """True when talking to systemd's private socket rather than via a bus."""
+        return isinstance(self.bus, DirectMessageBus)
+
+    @property
+    def manager(self):
+        if self._manager is None:
+            obj = self.bus.get_proxy_object(SYSTEMD_DEST, SYSTEMD_PATH, _node(MANAGER_XML))
+            self._manager = obj.get_interface(IFACE_MANAGER)
+        return self._manager
+
+    def properties(self, unit_path: str):
+        obj = self.bus.get_proxy_object(SYSTEMD_DEST, unit_path, _node(PROPERTIES_XML))
+        return obj.get_interface(IFACE_PROPERTIES)
+
+    def disconnect(self) -> None:
+        self.bus.disconnect()
+
+    async def subscribe(self) -> None:
+        """Have systemd send unit/job signals to this connection (idempotent).
+
+        One match rule covers every systemd object; listeners registered via
+        add_signal_listener() see each signal once, already demultiplexed
+        from method replies.
+        """
+        # Concurrent callers share one in-flight subscription
+        if self._subscription is None:
+            self._subscription = asyncio.ensure_future(self._subscribe())
+        await self._subscription
+
+    async def _subscribe(self) -> None:
+        self._signal_listeners.insert(0, self._on_job_removed)
+        self.bus.add_message_handler(self._dispatch_signal)
+        calls = [self.manager.call_subscribe()]
+        if not self.direct:
+            calls.append(
+                self.bus.call(
+                    Message(
+                        destination="org.freedesktop.DBus",
+                        path="/org/freedesktop/DBus",
+                        interface="org.freedesktop.DBus",
+                        member="AddMatch",
+                        signature="s",
+                        body=[_SIGNAL_MATCH],
+                    )
+                )
+            )
+        await asyncio.gather(*calls)
+
+    def add_signal_listener(self, fn: Callable[[Message], None]) -> None:
+        self._signal_listeners.append(fn)
+
+    def remove_signal_listener(self, fn: Callable[[Message], None]) -> None:
+        try:
+            self._signal_listeners.remove(fn)
+        except ValueError:
+            pass
+
+    def _on_job_removed(self, msg: Message) -> None:
+        if msg.interface != IFACE_MANAGER or msg.member != "JobRemoved":
+            return
+        _, job, _, result = msg.body
+        fut = self._job_waiters.pop(job, None)
+        if fut is not None:
+            if not fut.done():
+                fut.set_result(result)
+            return
+        self._job_results[job] = result
+        while len(self._job_results) > 256:
+            self._job_results.popitem(last=False)
+
+    async def wait_job(self, job_path: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Wait for JobRemoved on job_path; returns its result, or None on timeout.
+
+        Requires subscribe() to have completed before the job was queued.
+        """
+        result = self._job_results.pop(job_path, None)
+        if result is not None:
+            return result
+        fut = asyncio.get_running_loop().create_future()
+        self._job_waiters[job_path] = fut
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._job_waiters.pop(job_path, None)
+
+    async def _run_job(
+        self,
+        unit_name: str,
+        issue: Callable[[], Any],
+        timeout: Optional[float],
+        fields: Iterable[str],
+    ) -> JobResult:
+        t0 = time.monotonic()
+        await self.subscribe()
+        job = await issue()
+        result = await self.wait_job(job, timeout)
+        fields = tuple(fields)
+        status = await self.get_status(self.unit_path(unit_name), fields) if fields else None
+        return JobResult(unit_name, job, result, status, time.monotonic() - t0)
+
+    def _dispatch_signal(self, msg: Message) -> None:
+        if msg.message_type != MessageType.SIGNAL or not (msg.path or "").startswith(SYSTEMD_PATH):
+            return
+        for fn in list(self._signal_listeners):
+            try:
+                fn(msg)
+            except Exception:
+                logging.exception("systemd signal listener failed")
+
+    async def start_transient(
+        self,
+        name: str,
+        properties: list[tuple[str, Variant]],
+        aux: Optional[list[tuple[str, list[tuple[str, Variant]]]]] = None,
+    ):
+        mode = "fail"
+        if aux is None:
+            aux = []
+        # Returns the job object path; start_transient_and_wait() tracks it to completion
+        return await self.manager.call_start_transient_unit(name, mode, properties, aux)
+
+    def unit_path(self, unit_name: str) -> str:
+        """Object path for unit_name without asking the manager (may not be loaded)."""
+        return unit_object_path(unit_name)
+
+    async def get_unit_path(self, unit_name: str) -> Optional[str]:
+        """Object path of a loaded unit, or None if the manager doesn't know it.
+
+        Asks GetUnit every time; use unit_path() when the unit is known to
+        exist (a listing went stale the moment a unit was removed).
+        """
+        try:
+            return await self.manager.call_get_unit(unit_name)
+        except Exception:
+            return None
+
+    async def get_unit_by_pid(self, pid: int) -> Optional[str]:
+        """Name of the unit whose cgroup contains pid (any process, not just
+        MainPID), or None if it belongs to no loaded unit."""
+        try:
+            path = await self.manager.call_get_unit_by_pid(pid)
+        except DBusError:
+            return None
+        return unit_name_from_path(path)
+
+    async def list_units(self) -> list[dict[str, Any]]:
+        rows = await self.manager.call_list_units()
+        # According to docs, each row is a tuple of many fields; we map minimal ones we need
+        result = []
+        for row in rows:
+            # name, description, load_state, active_state, sub_state, following, unit_path, job_id, job_type, job_path
+            # dbus-next flattens to list/tuple indices
+            result.append(
+                {
+                    "Name": row[0],
+                    "Description": row[1],
+                    "LoadState": row[2],
+                    "ActiveState": row[3],
+                    "SubState": row[4],
+                    "Following": row[5],
+                    "Path": row[6],
+                }
+            )
+        return result
+
+    async def list_ww_units(self, states: Iterable[str] = ()) -> list[UnitRow]:
+        """List ww-* units, filtered by the manager rather than client side.
+
+        states optionally restricts to ActiveState/SubState values (as in
+        `systemctl --state`). Falls back to ListUnits on older systemd.
+        """
+        states = list(states)
+        rows = None
+        if self._has_list_by_patterns:
+            try:
+                rows = await self.manager.call_list_units_by_patterns(states, [WW_UNIT_PATTERN])
+            except DBusError as e:
+                if e.type != "org.freedesktop.DBus.Error.UnknownMethod":
+                    raise
+                self._has_list_by_patterns = False
+        if rows is None:
+            rows = [
+                r
+                for r in await self.manager.call_list_units()
+                if is_ww_unit(r[0])
+                and (not states or r[3] in states or r[4] in states)
+            ]
+        return [UnitRow(r[0], r[3], r[4], r[6]) for r in rows]
+
+    async def get_main_pid(self, unit_path: str) -> int:
+        pid = await self.properties(unit_path).call_get(IFACE_SERVICE, "MainPID")
+        return int(_val(pid))
+
+    async def get_status(self, unit_path: str, fields: Iterable[str] = STATUS_FIELDS) -> UnitStatus:
+        """Fetch the requested properties with one GetAll per interface.
+
+        fields are D-Bus property names (see STATUS_FIELDS); interfaces none of
+        them live on are not queried at all. Missing interfaces are tolerated.
+        """
+        st = UnitStatus(unit_path)
+        by_iface: dict[str, list[str]] = {}
+        for key in fields:
+            by_iface.setdefault(_STATUS_PROPS[key][0], []).append(key)
+        if not by_iface:
+            return st
+        props = self.properties(unit_path)
+        ifaces = list(by_iface)
+        replies = await asyncio.gather(
+            *(props.call_get_all(iface) for iface in ifaces), return_exceptions=True
+        )
+        for iface, values in zip(ifaces, replies):
+            if isinstance(values, BaseException):
+                # optional, ignore if not present on this unit/systemd
+                continue
+            for key in by_iface[iface]:
+                if key in values:
+                    setattr(st, _STATUS_PROPS[key][1], _val(values[key]))
+        return st
+
+    async def get_unit_status(self, unit_path: str) -> dict[str, Any]:
+        """Fetch a snapshot of key Unit/Service properties.
+
+        Returns a dict including:
+          - ActiveState, SubState (Unit)
+          - MainPID, NRestarts, Result (Service) when available
+          - ActiveEnterTimestamp (Unit) when available
+        """
+        return (await self.get_status(unit_path)).as_dict()
+
+    async def stop_unit(self, unit_name: str, mode: str = "fail"):
+        return await self.manager.call_stop_unit(unit_name, mode)
+
+    async def start_unit(self, unit_name: str, mode: str = "replace"):
+        return await self.manager.call_start_unit(unit_name, mode)
+
+    async def restart_unit(self, unit_name: str, mode: str = "replace"):
+        return await self.manager.call_restart_unit(unit_name, mode)
+
+    async def reset_failed_unit(self, unit_name: str):
+        try:
+            await self.manager.call_reset_failed_unit(unit_name)
+        except Exception:
+            # Some versions only expose ResetFailed (global); ignore
+            pass
+
+    async def run_bulk(
+        self,
+        op: Callable[[str], Awaitable[JobResult]],
+        units: Iterable[str],
+        concurrency: int = 16,
+    ) -> list[JobResult]:
+        """Run a job-tracked op for many units concurrently (at most concurrency in flight).
+
+        Results come back in the order of units; a unit whose call fails
+        gets a JobResult with result None and error set instead of raising.
+        """
+        await self.subscribe()
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(unit: str) -> JobResult:
+            async with sem:
+                t0 = time.monotonic()
+                try:
+                    return await op(unit)
+                except DBusError as e:
+                    return JobResult(unit, "", None, None, time.monotonic() - t0, e.text)
+
+        return list(await asyncio.gather(*(one(u) for u in units)))
+
+    # Job-tracked variants: return once systemd reports the job finished
+    # (JobRemoved), together with the unit's status at that point.
+
+    async def start_transient_and_wait(
+        self,
+        name: str,
+        properties: list[tuple[str, Variant]],
+        aux: Optional[list[tuple[str, list[tuple[str, Variant]]]]] = None,
+        timeout: Optional[float] = 30.0,
+        fields: Iterable[str] = JOB_STATUS_FIELDS,
+    ) -> JobResult:
+        return await self._run_job(name, lambda: self.start_transient(name, properties, aux), timeout, fields)
+
+    async def stop_unit_and_wait(
+        self,
+        unit_name: str,
+        mode: str = "fail",
+        timeout: Optional[float] = 30.0,
+        fields: Iterable[str] = JOB_STATUS_FIELDS,
+    ) -> JobResult:
+        return await self._run_job(unit_name, lambda: self.stop_unit(unit_name, mode), timeout, fields)
+
+    async def restart_unit_and_wait(
+        self,
+        unit_name: str,
+        mode: str = "replace",
+        timeout: Optional[float] = 30.0,
+        fields: Iterable[str] = JOB_STATUS_FIELDS,
+    ) -> JobResult:
+        return await self._run_job(unit_name, lambda: self.restart_unit(unit_name, mode), timeout, fields)
+
+
+# Module-level helpers kept for callers that hold a bare MessageBus. They share
+# one SystemdClient per bus, so the Manager proxy is still built only once.
+_clients: "weakref.WeakKeyDictionary[MessageBus, SystemdClient]" = weakref.WeakKeyDictionary()
+
+
+def client_for(bus: MessageBus) -> SystemdClient:
+    client = _clients.get(bus)
+    if client is None:
+        client = _clients[bus] = SystemdClient(bus)
+    return client
+
+
 async def get_manager(bus: MessageBus):
-    intro = await bus.introspect(SYSTEMD_DEST, SYSTEMD_PATH)
-    obj = bus.get_proxy_object(SYSTEMD_DEST, SYSTEMD_PATH, intro)
-    return obj.get_interface(IFACE_MANAGER)
+    return client_for(bus).manager
 
 
 async def start_transient(
@@ -29,145 +662,235 @@ async def start_transient(
     properties: list[tuple[str, Variant]],
     aux: Optional[list[tuple[str, list[tuple[str, Variant]]]]] = None,
 ):
-    mgr = await get_manager(bus)
-    mode = "fail"
-    if aux is None:
-        aux = []
-    # StartTransientUnit returns object path to job; we don't use it here
-    return await mgr.call_start_transient_unit(name, mode, properties, aux)
+    return await client_for(bus).start_transient(name, properties, aux)
 
 
 async def get_unit_path(bus: MessageBus, unit_name: str) -> Optional[str]:
-    mgr = await get_manager(bus)
-    try:
-        path = await mgr.call_get_unit(unit_name)
-        return path
-    except Exception:
-        return None
+    return await client_for(bus).get_unit_path(unit_name)
 
 
 async def list_units(bus: MessageBus) -> list[dict[str, Any]]:
-    mgr = await get_manager(bus)
-    rows = await mgr.call_list_units()
-    # According to docs, each row is a tuple of many fields; we map minimal ones we need
-    result = []
-    for row in rows:
-        # name, description, load_state, active_state, sub_state, following, unit_path, job_id, job_type, job_path
-        # dbus-next flattens to list/tuple indices
-        name = row[0]
-        description = row[1]
-        load_state = row[2]
-        active_state = row[3]
-        sub_state = row[4]
-        following = row[5]
-        unit_path = row[6]
-        result.append(
-            {
-                "Name": name,
-                "Description": description,
-                "LoadState": load_state,
-                "ActiveState": active_state,
-                "SubState": sub_state,
-                "Following": following,
-                "Path": unit_path,
-            }
-        )
-    return result
+    return await client_for(bus).list_units()
+
+
+async def list_ww_units(bus: MessageBus, states: Iterable[str] = ()) -> list[UnitRow]:
+    return await client_for(bus).list_ww_units(states)
 
 
 async def get_main_pid(bus: MessageBus, unit_path: str) -> int:
-    intro = await bus.introspect(SYSTEMD_DEST, unit_path)
-    obj = bus.get_proxy_object(SYSTEMD_DEST, unit_path, intro)
-    props = obj.get_interface(IFACE_PROPERTIES)
-    pid = await props.call_get(IFACE_SERVICE, "MainPID")
-    # dbus-next Variant from call_get
-    if isinstance(pid, Variant):
-        return int(pid.value)
-    return int(pid)
+    return await client_for(bus).get_main_pid(unit_path)
 
 
 async def get_unit_status(bus: MessageBus, unit_path: str) -> dict[str, Any]:
-    """Fetch a snapshot of key Unit/Service properties.
+    return await client_for(bus).get_unit_status(unit_path)
 
-    Returns a dict including:
-      - ActiveState, SubState (Unit)
-      - MainPID, NRestarts, Result (Service) when available
-      - ActiveEnterTimestamp (Unit) when available
-    """
-    intro = await bus.introspect(SYSTEMD_DEST, unit_path)
-    obj = bus.get_proxy_object(SYSTEMD_DEST, unit_path, intro)
-    props = obj.get_interface(IFACE_PROPERTIES)
-    def _val(v):
-        return v.value if isinstance(v, Variant) else v
-    st: dict[str, Any] = {}
-    # Unit-level
-    try:
-        st["ActiveState"] = _val(await props.call_get("org.freedesktop.systemd1.Unit", "ActiveState"))
-    except Exception:
-        st["ActiveState"] = "unknown"
-    try:
-        st["SubState"] = _val(await props.call_get("org.freedesktop.systemd1.Unit", "SubState"))
-    except Exception:
-        st["SubState"] = "unknown"
-    try:
-        ts = _val(await props.call_get("org.freedesktop.systemd1.Unit", "ActiveEnterTimestamp"))
-        # Timestamp is in microseconds since the epoch
-        try:
-            st["ActiveEnterTimestamp"] = int(ts)
-        except Exception:
-            pass
-    except Exception:
-        pass
 
-    # Service-level
-    try:
-        pid = _val(await props.call_get(IFACE_SERVICE, "MainPID"))
-        try:
-            pid = int(pid)
-        except Exception:
-            pid = 0
-        st["MainPID"] = pid
-    except Exception:
-        st["MainPID"] = 0
-    # WorkingDirectory (helpful for dashboards)
-    try:
-        wd = _val(await props.call_get(IFACE_SERVICE, "WorkingDirectory"))
-        if isinstance(wd, str) and wd:
-            st["WorkingDirectory"] = wd
-    except Exception:
-        # optional, ignore if missing
-        pass
-    for key in ("NRestarts", "Result", "ExecMainStatus", "ExecMainCode"):
-        try:
-            st[key] = _val(await props.call_get(IFACE_SERVICE, key))
-        except Exception:
-            # optional, ignore if not present on this systemd
-            pass
-    return st
+async def get_status(bus: MessageBus, unit_path: str, fields: Iterable[str] = STATUS_FIELDS) -> UnitStatus:
+    return await client_for(bus).get_status(unit_path, fields)
 
 
 async def stop_unit(bus: MessageBus, unit_name: str, mode: str = "fail"):
-    mgr = await get_manager(bus)
-    return await mgr.call_stop_unit(unit_name, mode)
+    return await client_for(bus).stop_unit(unit_name, mode)
 
 
 async def start_unit(bus: MessageBus, unit_name: str, mode: str = "replace"):
-    mgr = await get_manager(bus)
-    return await mgr.call_start_unit(unit_name, mode)
+    return await client_for(bus).start_unit(unit_name, mode)
 
 
 async def restart_unit(bus: MessageBus, unit_name: str, mode: str = "replace"):
-    mgr = await get_manager(bus)
-    return await mgr.call_restart_unit(unit_name, mode)
+    return await client_for(bus).restart_unit(unit_name, mode)
 
 
 async def reset_failed_unit(bus: MessageBus, unit_name: str):
-    mgr = await get_manager(bus)
-    try:
-        await mgr.call_reset_failed_unit(unit_name)
-    except Exception:
-        # Some versions only expose ResetFailed (global); ignore
-        pass
+    await client_for(bus).reset_failed_unit(unit_name)
+
+
+class UnitEvent(NamedTuple):
+    """One change to a cached unit, as yielded by UnitCache.changes()."""
+
+    kind: str  # "new" | "changed" | "removed" | "job"
+    unit: str
+    changed: dict[str, tuple[Any, Any]]  # D-Bus property -> (old, new); for "job": {"Job": (path, result)}
+    status: UnitStatus  # live record; reflects later changes too
+    timestamp: float  # time.monotonic() when the signal was processed
+
+
+class UnitCache:
+    """Live, signal-fed table of ww-* units.
+
+    start() subscribes once and loads a snapshot; after that systemd pushes
+    UnitNew/UnitRemoved and PropertiesChanged, so reads are dict lookups and
+    changes() yields them as they happen, along with the JobRemoved of each
+    ww unit. units limits the table to those unit names.
+    """
+
+    FIELDS: tuple[str, ...] = (
+        "LoadState",
+        "ActiveState",
+        "SubState",
+        "ActiveEnterTimestamp",
+        "MainPID",
+        "NRestarts",
+        "Result",
+        "WorkingDirectory",
+    )
+
+    def __init__(self, client: SystemdClient, units: Optional[Iterable[str]] = None):
+        self.client = client
+        self._only: Optional[frozenset[str]] = None if units is None else frozenset(units)
+        self._units: dict[str, UnitStatus] = {}
+        self._names: dict[str, str] = {}  # object path -> unit name
+        self._queues: set[asyncio.Queue] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> "UnitCache":
+        await self.client.subscribe()
+        self.client.add_signal_listener(self._on_signal)
+        rows = await self.client.list_ww_units()
+        await asyncio.gather(*(self._load(r.name, r.path, emit=False) for r in rows if self._wants(r.name)))
+        return self
+
+    def stop(self) -> None:
+        """Detach from the client and end every changes() iterator."""
+        self.client.remove_signal_listener(self._on_signal)
+        for t in self._tasks:
+            t.cancel()
+        for q in self._queues:
+            q.put_nowait(None)
+
+    async def refresh(self, unit_name: str) -> None:
+        """Re-read unit_name now instead of waiting for its signals."""
+        await self._load(unit_name, unit_object_path(unit_name))
+
+    def get(self, unit_name: str) -> Optional[UnitStatus]:
+        return self._units.get(unit_name)
+
+    def units(self) -> list[UnitStatus]:
+        return list(self._units.values())
+
+    def names(self) -> list[str]:
+        return list(self._units)
+
+    def __contains__(self, unit_name: str) -> bool:
+        return unit_name in self._units
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    def changes(self) -> AsyncIterator[UnitEvent]:
+        """Every UnitEvent from this call on, until stop().
+
+        The subscription starts here, not at the first iteration, so a caller
+        can take it before reading a snapshot and miss nothing in between.
+        """
+        q: asyncio.Queue = asyncio.Queue()
+        self._queues.add(q)
+        return self._drain(q)
+
+    async def _drain(self, q: asyncio.Queue) -> AsyncIterator[UnitEvent]:
+        try:
+            while True:
+                ev = await q.get()
+                if ev is None:
+                    return
+                yield ev
+        finally:
+            self._queues.discard(q)
+
+    def _emit(self, kind: str, unit: str, changed: dict[str, tuple[Any, Any]], st: UnitStatus) -> None:
+        ev = UnitEvent(kind, unit, changed, st, time.monotonic())
+        for q in self._queues:
+            q.put_nowait(ev)
+
+    def _spawn(self, coro) -> None:
+        t = asyncio.ensure_future(coro)
+        self._tasks.add(t)
+        t.add_done_callback(self._tasks.discard)
+
+    async def _load(self, name: str, path: str, fields: Iterable[str] = FIELDS, emit: bool = True) -> None:
+        try:
+            fresh = await self.client.get_status(path, fields)
+        except Exception:
+            return
+        st = self._units.get(name)
+        if st is None:
+            # LoadState is only among the fields on a full load
+            if not fresh.found:
+                return
+            self._units[name] = fresh
+            self._names[path] = name
+            if emit:
+                self._emit("new", name, {}, fresh)
+            return
+        diff = {}
+        for key in fields:
+            attr = _STATUS_PROPS[key][1]
+            old, new = getattr(st, attr), getattr(fresh, attr)
+            if old != new:
+                setattr(st, attr, new)
+                diff[key] = (old, new)
+        if diff and emit:
+            self._emit("changed", name, diff, st)
+
+    def _wants(self, unit_name: str) -> bool:
+        return is_ww_unit(unit_name) and (self._only is None or unit_name in self._only)
+
+    def _on_signal(self, msg: Message) -> None:
+        if msg.interface == IFACE_MANAGER:
+            if msg.member == "UnitNew":
+                name, path = msg.body
+                if self._wants(name) and name not in self._units:
+                    self._spawn(self._load(name, path))
+            elif msg.member == "JobRemoved":
+                _, job, name, result = msg.body
+                if self._wants(name):
+                    st = self._units.get(name) or UnitStatus(unit_object_path(name))
+                    self._emit("job", name, {"Job": (job, result)}, st)
+            elif msg.member == "UnitRemoved":
+                name, path = msg.body
+                st = self._units.pop(name, None)
+                if st is not None:
+                    self._names.pop(path, None)
+                    self._emit("removed", name, {}, st)
+            return
+        if msg.interface != IFACE_PROPERTIES or msg.member != "PropertiesChanged":
+            return
+        name = self._names.get(msg.path)
+        if name is None:
+            return
+        iface, changed, invalidated = msg.body
+        st = self._units[name]
+        diff = {}
+        for key, v in changed.items():
+            spec = _STATUS_PROPS.get(key)
+            if spec is None or spec[0] != iface or key not in self.FIELDS:
+                continue
+            old, new = getattr(st, spec[1]), _val(v)
+            if old != new:
+                setattr(st, spec[1], new)
+                diff[key] = (old, new)
+        if diff:
+            self._emit("changed", name, diff, st)
+        stale = [k for k in invalidated if k in self.FIELDS and _STATUS_PROPS[k][0] == iface]
+        if stale:
+            self._spawn(self._load(name, msg.path, stale))
+
+
+def to_dbus(sig: str, value: Any) -> Any:
+    """Plain value (as syncbus/JSON carry it) -> dbus-next value for sig.
+
+    Variants are given as (signature, value) pairs, e.g. the properties from
+    launch.transient_properties().
+    """
+    c = sig[0]
+    if c == "v":
+        inner, item = value
+        return Variant(inner, to_dbus(inner, item))
+    if c == "a":
+        return [to_dbus(sig[1:], item) for item in value]
+    if c == "(":
+        return [to_dbus(sub, item) for sub, item in zip(_split(sig[1:-1]), value)]
+    return value
 
 
 def build_execstart_variant(argv: Iterable[str]):
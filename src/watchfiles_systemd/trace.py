@@ -0,0 +1,228 @@
+"""Opt-in timing of D-Bus calls and child processes (WW_TRACE=1 or --trace).
+
+Every traced operation becomes a Span: kind ("dbus", "exec", "introspect",
+"connect"), name (e.g. Manager.ListUnitsByPatterns or journalctl), target
+(object path or argv), bytes sent/received, latency and outcome. At exit a
+per-name summary (count, p50/p95, total) goes to stderr. With
+WW_TRACE_JSON=<file> the spans are also written as Chrome trace events
+(load in chrome://tracing or https://ui.perfetto.dev).
+
+Disabled tracing costs one attribute check per call site.
+"""
+
+import atexit
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+
+class Span:
+    __slots__ = ("kind", "name", "target", "start", "end", "bytes_out", "bytes_in", "outcome")
+
+    def __init__(self, kind: str, name: str, target: str = "", bytes_out: int = 0):
+        self.kind = kind
+        self.name = name
+        self.target = target
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.bytes_out = bytes_out
+        self.bytes_in = 0
+        self.outcome = "ok"
+
+    @property
+    def ms(self) -> float:
+        return ((self.end or self.start) - self.start) * 1000
+
+
+class _Tracer:
+    def __init__(self):
+        self.active = False
+        self.spans: list[Span] = []
+        self.t0 = time.perf_counter()
+        self.json_path: Optional[str] = None
+        self.untraced_bus = False  # instrument_bus() met a dbus-next it cannot hook
+
+    def finish(self, span: Span, outcome: Optional[str] = None, bytes_in: int = 0) -> None:
+        span.end = time.perf_counter()
+        if outcome is not None:
+            span.outcome = outcome
+        span.bytes_in += bytes_in
+        self.spans.append(span)
+
+
+TRACER = _Tracer()
+
+
+def enable(json_path: Optional[str] = None) -> None:
+    """Start recording; the report is emitted when the process exits."""
+    if json_path:
+        TRACER.json_path = json_path
+    if TRACER.active:
+        return
+    TRACER.active = True
+    TRACER.t0 = time.perf_counter()
+    atexit.register(_report)
+
+
+def enable_from_env() -> None:
+    value = os.getenv("WW_TRACE", "")
+    json_path = os.getenv("WW_TRACE_JSON") or None
+    if value.lower() in ("1", "true", "yes", "on") or json_path:
+        enable(json_path)
+
+
+def active() -> bool:
+    return TRACER.active
+
+
+@contextmanager
+def span(kind: str, name: str, target: str = "", bytes_out: int = 0) -> Iterator[Optional[Span]]:
+    """Time the enclosed block; yields None when tracing is off.
+
+    An exception marks the span with the exception type and propagates.
+    Callers may set span.bytes_in / span.outcome before the block ends.
+    """
+    if not TRACER.active:
+        yield None
+        return
+    s = Span(kind, name, target, bytes_out)
+    try:
+        yield s
+    except BaseException as e:
+        TRACER.finish(s, type(e).__name__)
+        raise
+    TRACER.finish(s)
+
+
+def exec_span(argv: list[str]):
+    """span() for a child process, named after the executable."""
+    return span("exec", os.path.basename(str(argv[0])) if argv else "?", " ".join(map(str, argv)))
+
+
+def _short_iface(interface: Optional[str]) -> str:
+    return (interface or "").rsplit(".", 1)[-1]
+
+
+def instrument_bus(bus: Any) -> None:
+    """Wrap a dbus-next bus so each method call (and its reply) is recorded.
+
+    Hooks the private _call(msg, callback) that proxies, bus.call() and the
+    bus's own AddMatch/GetNameOwner traffic all go through. A dbus-next
+    without that hook is left alone: its D-Bus calls go untraced (the summary
+    says so) rather than broken.
+    """
+    if not TRACER.active:
+        return
+    orig = getattr(bus, "_call", None)
+    if not _hookable(orig):
+        TRACER.untraced_bus = True
+        return
+
+    def _call(msg, callback: Callable[[Any, Any], None]):
+        s = Span("dbus", f"{_short_iface(msg.interface)}.{msg.member}", msg.path or "", _size(msg))
+
+        def _done(reply, err):
+            if err is not None:
+                outcome = type(err).__name__
+            elif reply is not None and reply.error_name:
+                outcome = reply.error_name.rsplit(".", 1)[-1]
+            else:
+                outcome = "ok"
+            TRACER.finish(s, outcome, _size(reply) if reply is not None else 0)
+            callback(reply, err)
+
+        return orig(msg, _done)
+
+    bus._call = _call
+
+
+def _hookable(fn: Any) -> bool:
+    import inspect
+
+    if not callable(fn):
+        return False
+    try:
+        return list(inspect.signature(fn).parameters) == ["msg", "callback"]
+    except (TypeError, ValueError):
+        return False
+
+
+def _size(msg: Any) -> int:
+    try:
+        return len(msg._marshall())
+    except Exception:
+        return 0
+
+
+def _pct(sorted_ms: list[float], p: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(len(sorted_ms) * p))]
+
+
+def summary_lines() -> list[str]:
+    groups: dict[tuple[str, str], list[Span]] = {}
+    for s in TRACER.spans:
+        groups.setdefault((s.kind, s.name), []).append(s)
+    wall = (time.perf_counter() - TRACER.t0) * 1000
+    lines = [
+        f"ww trace: {len(TRACER.spans)} spans over {wall:.1f} ms",
+        f"{'kind':<10} {'name':<36} {'count':>5} {'p50 ms':>8} {'p95 ms':>8} {'total ms':>9} {'bytes':>8} {'errors':>6}",
+    ]
+    if TRACER.untraced_bus:
+        lines.insert(1, "ww trace: async D-Bus calls not traced (unsupported dbus-next)")
+    rows = []
+    for (kind, name), spans in groups.items():
+        ms = sorted(s.ms for s in spans)
+        rows.append((sum(ms), kind, name, spans, ms))
+    for total, kind, name, spans, ms in sorted(rows, key=lambda r: r[0], reverse=True):
+        nbytes = sum(s.bytes_out + s.bytes_in for s in spans)
+        errors = sum(1 for s in spans if s.outcome != "ok")
+        lines.append(
+            f"{kind:<10} {name[:36]:<36} {len(spans):>5} {_pct(ms, 0.5):>8.2f} {_pct(ms, 0.95):>8.2f} "
+            f"{total:>9.2f} {nbytes:>8} {errors:>6}"
+        )
+    return lines
+
+
+def chrome_trace() -> dict[str, Any]:
+    """Spans as Chrome trace-event JSON; overlapping spans go to separate lanes."""
+    events = []
+    lanes: list[float] = []
+    pid = os.getpid()
+    for s in sorted(TRACER.spans, key=lambda s: s.start):
+        for i, busy_until in enumerate(lanes):
+            if busy_until <= s.start:
+                lanes[i] = s.end or s.start
+                tid = i + 1
+                break
+        else:
+            lanes.append(s.end or s.start)
+            tid = len(lanes)
+        events.append(
+            {
+                "name": s.name,
+                "cat": s.kind,
+                "ph": "X",
+                "ts": round((s.start - TRACER.t0) * 1e6, 1),
+                "dur": round(s.ms * 1000, 1),
+                "pid": pid,
+                "tid": tid,
+                "args": {"target": s.target, "bytes_out": s.bytes_out, "bytes_in": s.bytes_in, "outcome": s.outcome},
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _report() -> None:
+    try:
+        for line in summary_lines():
+            print(line, file=sys.stderr)
+        if TRACER.json_path:
+            import json
+
+            with open(TRACER.json_path, "w") as f:
+                json.dump(chrome_trace(), f)
+            print(f"ww trace: wrote {TRACER.json_path}", file=sys.stderr)
+    except Exception as e:  # never turn a traced run into a failed one
+        print(f"ww trace: report failed: {e}", file=sys.stderr)
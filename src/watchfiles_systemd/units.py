@@ -0,0 +1,126 @@
+"""Unit naming and display helpers shared by the async and blocking D-Bus clients.
+
+Kept free of dbus-next so the one-shot fast path can use it without paying
+for that import.
+"""
+
+import fnmatch
+from typing import NamedTuple, Optional
+
+
+SYSTEMD_DEST = "org.freedesktop.systemd1"
+SYSTEMD_PATH = "/org/freedesktop/systemd1"
+IFACE_MANAGER = "org.freedesktop.systemd1.Manager"
+IFACE_PROPERTIES = "org.freedesktop.DBus.Properties"
+IFACE_SERVICE = "org.freedesktop.systemd1.Service"
+IFACE_UNIT = "org.freedesktop.systemd1.Unit"
+WW_UNIT_PATTERN = "ww-*.service"
+
+# Seconds to wait for systemd to finish a start/stop/restart job
+JOB_TIMEOUT = 30.0
+
+
+class UnitRow(NamedTuple):
+    """One ListUnits row, trimmed to the columns ww uses."""
+
+    name: str
+    active_state: str
+    sub_state: str
+    path: str
+
+
+# D-Bus property -> (interface, UnitStatus attribute)
+STATUS_PROPS: dict[str, tuple[str, str]] = {
+    "LoadState": (IFACE_UNIT, "load_state"),
+    "ActiveState": (IFACE_UNIT, "active_state"),
+    "SubState": (IFACE_UNIT, "sub_state"),
+    "ActiveEnterTimestamp": (IFACE_UNIT, "active_enter_timestamp"),
+    "MainPID": (IFACE_SERVICE, "main_pid"),
+    "WorkingDirectory": (IFACE_SERVICE, "working_directory"),
+    "ExecStart": (IFACE_SERVICE, "exec_start"),
+    "NRestarts": (IFACE_SERVICE, "n_restarts"),
+    "Result": (IFACE_SERVICE, "result"),
+    "ExecMainStatus": (IFACE_SERVICE, "exec_main_status"),
+    "ExecMainCode": (IFACE_SERVICE, "exec_main_code"),
+}
+# Default field set; ExecStart is only fetched when asked for by name
+STATUS_FIELDS: tuple[str, ...] = tuple(k for k in STATUS_PROPS if k != "ExecStart")
+
+
+def unit_object_path(unit_name: str) -> str:
+    """Return the object path systemd uses for unit_name, computed locally.
+
+    Mirrors sd-bus label escaping: every byte outside [A-Za-z0-9] (and a
+    leading digit) becomes _xx, e.g. ww-test.service -> ww_2dtest_2eservice.
+    """
+    raw = unit_name.encode()
+    if not raw:
+        return f"{SYSTEMD_PATH}/unit/_"
+    out = []
+    for i, b in enumerate(raw):
+        if (0x41 <= b <= 0x5A) or (0x61 <= b <= 0x7A) or (i > 0 and 0x30 <= b <= 0x39):
+            out.append(chr(b))
+        else:
+            out.append(f"_{b:02x}")
+    return f"{SYSTEMD_PATH}/unit/{''.join(out)}"
+
+
+def unit_name_from_path(path: str) -> Optional[str]:
+    """Inverse of unit_object_path(); None for paths outside the unit namespace."""
+    prefix = f"{SYSTEMD_PATH}/unit/"
+    if not path.startswith(prefix):
+        return None
+    label = path[len(prefix):]
+    if label == "_":
+        return ""
+    out = bytearray()
+    i = 0
+    while i < len(label):
+        if label[i] == "_" and i + 3 <= len(label):
+            try:
+                out.append(int(label[i + 1 : i + 3], 16))
+                i += 3
+                continue
+            except ValueError:
+                pass
+        out.append(ord(label[i]))
+        i += 1
+    return out.decode(errors="replace")
+
+
+def is_ww_unit(unit_name: str) -> bool:
+    return fnmatch.fnmatchcase(unit_name, WW_UNIT_PATTERN)
+
+
+def friendly_from_unit(unit_name: str) -> str:
+    n = unit_name
+    if n.endswith(".service"):
+        n = n[: -len(".service")]
+    if n.startswith("ww-"):
+        n = n[len("ww-") :]
+    return n
+
+
+def display_state(active: str, sub: str, pid: int) -> str:
+    """The state column of `ww ps`: ActiveState refined by SubState/MainPID."""
+    if active == "failed":
+        return "failed"
+    if active == "activating":
+        if sub == "auto-restart":
+            return "flapping"
+        if pid > 0:
+            return f"activating({sub})"
+        return "activating"
+    if active == "active":
+        return f"active({sub})" if sub and sub != "running" else "active"
+    return active
+
+
+def journal_argv(unit_name: str, n: int = 100, follow: bool = False, since_usec: int = 0) -> list[str]:
+    """journalctl command for a unit's logs; since_usec (e.g. ActiveEnterTimestamp) limits them to one run."""
+    cmd = ["journalctl", "--user", "-u", unit_name, "-n", str(n)]
+    if since_usec > 0:
+        cmd.extend(["--since", f"@{since_usec // 1_000_000}"])
+    if follow:
+        cmd.append("-f")
+    return cmd
@@ -102,10 +102,33 @@ def _resolve_uvx_bin() -> str:
     return which or prefer
 
 
-def build_watchfiles_exec(inner_argv: Iterable[str], watch_paths: Optional[list[str]] = None) -> list[str]:
+def cache_dir() -> Path:
+    """$XDG_CACHE_HOME/ww (default ~/.cache/ww); not created here."""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "ww"
+
+
+def pin_path() -> Path:
+    """Where `ww doctor --warm` records the watchfiles version it installed."""
+    return cache_dir() / "watchfiles-version"
+
+
+def watchfiles_spec() -> str:
+    """uvx --from requirement: WW_WF_VERSION, else the version pinned by `ww doctor --warm`."""
+    version = os.getenv("WW_WF_VERSION")
+    if not version:
+        try:
+            version = pin_path().read_text().strip()
+        except OSError:
+            version = ""
+    return f"watchfiles=={version}" if version else "watchfiles"
+
+
+def build_watchfiles_exec(
+    inner_argv: Iterable[str], watch_paths: Optional[list[str]] = None, ignores: Iterable[str] = ()
+) -> list[str]:
     # Use uvx + python -m watchfiles to avoid console-script resolution pitfalls
-    wf_version = os.getenv("WW_WF_VERSION")
-    spec = "watchfiles" if not wf_version else f"watchfiles=={wf_version}"
+    spec = watchfiles_spec()
     # Built-in python filter; target is a single shell command string
     import shlex
 
@@ -125,12 +148,14 @@ def build_watchfiles_exec(inner_argv: Iterable[str], watch_paths: Optional[list[
         target,
     ]
 
-    # Combine ignore paths: built-ins plus optional WW_IGNORE (comma-separated)
+    # Combine ignore paths: built-ins, optional WW_IGNORE (comma-separated) and per-target ignores
     extra = os.getenv("WW_IGNORE", "").strip()
+    given = list(ignores)
     ignores = [p.rstrip("/") for p in PY_IGNORES]
     if extra:
         # split on comma, strip whitespace and trailing slashes
         ignores.extend(x.strip().rstrip("/") for x in extra.split(",") if x.strip())
+    ignores.extend(x.rstrip("/") for x in given)
     # de-dupe while preserving order
     seen = set()
     ignores = [x for x in ignores if not (x in seen or seen.add(x))]
@@ -160,4 +185,8 @@ def env_list(extra_ignores: Optional[str] = None) -> list[str]:
     wf_version = os.environ.get("WW_WF_VERSION")
     if wf_version:
         env.append(f"WW_WF_VERSION={wf_version}")
+    # Same uv cache as `ww doctor --warm` filled
+    uv_cache = os.environ.get("UV_CACHE_DIR")
+    if uv_cache:
+        env.append(f"UV_CACHE_DIR={uv_cache}")
     return env
@@ -0,0 +1,67 @@
+"""Shared fixtures: a fake systemd user manager and a way to run `ww` against it.
+
+The fake (fake_systemd.py) serves org.freedesktop.systemd1 on a private
+dbus-daemon from a background thread, so these tests need the dbus-daemon
+binary but no systemd.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+
+from fake_systemd import FakeSystemd
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+
+@pytest.fixture(scope="session")
+def _fake_systemd_server() -> Iterator[FakeSystemd]:
+    if shutil.which("dbus-daemon") is None:
+        pytest.skip("dbus-daemon not found on PATH")
+    with FakeSystemd() as fake:
+        yield fake
+
+
+@pytest.fixture
+def fake_systemd(_fake_systemd_server: FakeSystemd, monkeypatch, tmp_path: Path) -> Iterator[FakeSystemd]:
+    """An empty fake manager with the process environment pointing at it."""
+    for key, value in _fake_systemd_server.env().items():
+        monkeypatch.setenv(key, value)
+    # No agent, and the completion index goes to a scratch runtime dir
+    monkeypatch.setenv("WW_AGENT", "0")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "run"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    (tmp_path / "run").mkdir()
+    _fake_systemd_server.clear()
+    yield _fake_systemd_server
+
+
+def ww_env(**extra: str) -> dict[str, str]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(SRC), os.getenv("PYTHONPATH")])))
+    env.update(extra)
+    return env
+
+
+@pytest.fixture
+def ww(fake_systemd: FakeSystemd, tmp_path: Path) -> Callable[..., subprocess.CompletedProcess]:
+    """ww(*argv, stdin=None, **env) -> CompletedProcess (text, stdout/stderr captured), run in tmp_path."""
+
+    def run(*argv: str, stdin: str | None = None, **env: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, "-m", "watchfiles_systemd", *argv],
+            cwd=tmp_path,
+            env=ww_env(**env),
+            input=stdin,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+
+    return run
@@ -0,0 +1,531 @@
+"""Scriptable stand-in for the systemd user manager on a private dbus-daemon.
+
+Implements the slice of org.freedesktop.systemd1 that ww uses, with
+dbus-next ServiceInterface objects:
+
+- Manager: GetUnit, GetUnitByPID, ListUnits, ListUnitsByPatterns,
+  StartTransientUnit, StartUnit, StopUnit, RestartUnit, ResetFailedUnit,
+  Subscribe/Unsubscribe.
+- Signals: UnitNew, UnitRemoved and JobRemoved, plus PropertiesChanged on the
+  Unit/Service interfaces.
+- Properties Get/GetAll on every unit.
+
+Units behave like ww's transient services. Stopping one garbage-collects it
+(UnitRemoved). Jobs finish after `job_delay` seconds. Each unit owns two PIDs:
+MainPID (the watchfiles wrapper) and MainPID + 1 (the app). Both resolve
+through GetUnitByPID.
+
+`latency` delays every incoming call, including property reads, to mimic a
+busy manager. `noise` adds non-ww rows to ListUnits, as a real session has.
+`calls` counts handled messages by "Interface.Member".
+
+In-process, in a background thread:
+
+    with FakeSystemd(units=100) as fake:
+        os.environ.update(fake.env())
+        ...  # ww code now talks to the fake
+
+In the test suite, request the `fake_systemd` fixture (tests/conftest.py):
+an empty manager with the environment already pointing at it.
+
+Standalone, e.g. as a benchmark target (prints the bus address):
+
+    python tests/fake_systemd.py --units 1000 --latency-ms 1
+
+Requires the `dbus-daemon` binary.
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Iterable, Optional
+
+from dbus_next import DBusError, Message, MessageType
+from dbus_next.aio import MessageBus
+from dbus_next.service import PropertyAccess, ServiceInterface, dbus_property, method
+from dbus_next.service import signal as dbus_signal
+
+from watchfiles_systemd.systemd_bus import patient_writes
+from watchfiles_systemd.units import (
+    IFACE_MANAGER,
+    IFACE_SERVICE,
+    IFACE_UNIT,
+    SYSTEMD_DEST,
+    SYSTEMD_PATH,
+    unit_object_path,
+)
+
+
+class _UnitIface(ServiceInterface):
+    def __init__(self, unit: "FakeUnit"):
+        super().__init__(IFACE_UNIT)
+        self.u = unit
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Id(self) -> "s":
+        return self.u.name
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Description(self) -> "s":
+        return self.u.description
+
+    @dbus_property(access=PropertyAccess.READ)
+    def LoadState(self) -> "s":
+        return "loaded"
+
+    @dbus_property(access=PropertyAccess.READ)
+    def ActiveState(self) -> "s":
+        return self.u.active_state
+
+    @dbus_property(access=PropertyAccess.READ)
+    def SubState(self) -> "s":
+        return self.u.sub_state
+
+    @dbus_property(access=PropertyAccess.READ)
+    def ActiveEnterTimestamp(self) -> "t":
+        return self.u.active_enter_timestamp
+
+
+class _ServiceIface(ServiceInterface):
+    def __init__(self, unit: "FakeUnit"):
+        super().__init__(IFACE_SERVICE)
+        self.u = unit
+
+    @dbus_property(access=PropertyAccess.READ)
+    def MainPID(self) -> "u":
+        return self.u.main_pid
+
+    @dbus_property(access=PropertyAccess.READ)
+    def WorkingDirectory(self) -> "s":
+        return self.u.working_directory
+
+    @dbus_property(access=PropertyAccess.READ)
+    def NRestarts(self) -> "u":
+        return self.u.n_restarts
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Result(self) -> "s":
+        return self.u.result
+
+    @dbus_property(access=PropertyAccess.READ)
+    def ExecMainStatus(self) -> "i":
+        return 0
+
+    @dbus_property(access=PropertyAccess.READ)
+    def ExecMainCode(self) -> "i":
+        return 0
+
+    @dbus_property(access=PropertyAccess.READ)
+    def ExecStart(self) -> "a(sasbttttuii)":
+        argv = self.u.exec_start
+        return [[argv[0], argv, False, 0, 0, 0, 0, 0, 0, 0]] if argv else []
+
+
+class FakeUnit:
+    """State of one fake service; mutate through FakeManager.set_state()."""
+
+    _next_pid = 10_000
+
+    def __init__(self, name: str, working_directory: str = "/", exec_start: Iterable[str] = ("python", "main.py")):
+        self.name = name
+        self.path = unit_object_path(name)
+        self.description = f"ww:{name}"
+        self.working_directory = working_directory
+        self.exec_start = list(exec_start)
+        self.active_state = "inactive"
+        self.sub_state = "dead"
+        self.main_pid = 0
+        self.n_restarts = 0
+        self.result = "success"
+        self.active_enter_timestamp = 0
+        self.unit_iface = _UnitIface(self)
+        self.service_iface = _ServiceIface(self)
+
+    def _activate(self) -> None:
+        FakeUnit._next_pid += 2
+        self.main_pid = FakeUnit._next_pid
+        self.active_state, self.sub_state = "active", "running"
+        self.active_enter_timestamp = int(time.time() * 1_000_000)
+
+    def row(self) -> list[Any]:
+        """ListUnits tuple (ssssssouso)."""
+        return [self.name, self.description, "loaded", self.active_state, self.sub_state, "", self.path, 0, "", "/"]
+
+
+class FakeManager(ServiceInterface):
+    def __init__(self, bus: MessageBus, job_delay: float = 0.01, noise: int = 0):
+        super().__init__(IFACE_MANAGER)
+        self.bus = bus
+        self.units: dict[str, FakeUnit] = {}
+        self.job_delay = job_delay
+        self.noise = noise
+        self._jobs = 0
+
+    # -- scripting (run on the fake's loop, e.g. via FakeSystemd.call) --
+
+    def add_unit(self, unit: FakeUnit, active: bool = True) -> FakeUnit:
+        if active:
+            unit._activate()
+        self.units[unit.name] = unit
+        self.bus.export(unit.path, unit.unit_iface)
+        self.bus.export(unit.path, unit.service_iface)
+        self.UnitNew(unit.name, unit.path)
+        return unit
+
+    def remove_unit(self, name: str) -> None:
+        unit = self.units.pop(name, None)
+        if unit is not None:
+            self.bus.unexport(unit.path)
+            self.UnitRemoved(unit.name, unit.path)
+
+    def set_state(self, name: str, active_state: str, sub_state: str, main_pid: Optional[int] = None) -> None:
+        """Change a unit's state and emit PropertiesChanged like systemd does."""
+        u = self.units[name]
+        u.active_state, u.sub_state = active_state, sub_state
+        u.unit_iface.emit_properties_changed({"ActiveState": active_state, "SubState": sub_state})
+        if main_pid is not None and main_pid != u.main_pid:
+            u.main_pid = main_pid
+            u.service_iface.emit_properties_changed({"MainPID": main_pid})
+
+    # -- internals --
+
+    def _unit(self, name: str) -> FakeUnit:
+        unit = self.units.get(name)
+        if unit is None:
+            raise DBusError("org.freedesktop.systemd1.NoSuchUnit", f"Unit {name} not loaded.")
+        return unit
+
+    def _job(self, unit: str, then=None, result: str = "done") -> str:
+        self._jobs += 1
+        job_id = self._jobs
+        path = f"{SYSTEMD_PATH}/job/{job_id}"
+
+        def _finish():
+            if then is not None:
+                then()
+            self.JobRemoved(job_id, path, unit, result)
+
+        asyncio.get_running_loop().call_later(self.job_delay, _finish)
+        return path
+
+    def _start(self, u: FakeUnit) -> None:
+        u._activate()
+        u.unit_iface.emit_properties_changed(
+            {"ActiveState": u.active_state, "SubState": u.sub_state, "ActiveEnterTimestamp": u.active_enter_timestamp}
+        )
+        u.service_iface.emit_properties_changed({"MainPID": u.main_pid})
+
+    # -- D-Bus API --
+
+    @method()
+    def GetUnit(self, name: "s") -> "o":
+        return self._unit(name).path
+
+    @method()
+    def GetUnitByPID(self, pid: "u") -> "o":
+        for u in self.units.values():
+            if u.main_pid and pid in (u.main_pid, u.main_pid + 1):
+                return u.path
+        raise DBusError("org.freedesktop.systemd1.NoUnitForPID", f"PID {pid} does not belong to any loaded unit.")
+
+    @method()
+    def ListUnits(self) -> "a(ssssssouso)":
+        rows = [u.row() for u in self.units.values()]
+        rows += [
+            [f"noise-{i}.service", "", "loaded", "active", "running", "", f"{SYSTEMD_PATH}/unit/noise_{i}", 0, "", "/"]
+            for i in range(self.noise)
+        ]
+        return rows
+
+    @method()
+    def ListUnitsByPatterns(self, states: "as", patterns: "as") -> "a(ssssssouso)":
+        return [
+            u.row()
+            for u in self.units.values()
+            if (not patterns or any(fnmatch.fnmatchcase(u.name, p) for p in patterns))
+            and (not states or u.active_state in states or u.sub_state in states)
+        ]
+
+    @method()
+    def StartTransientUnit(self, name: "s", mode: "s", properties: "a(sv)", aux: "a(sa(sv))") -> "o":
+        if name in self.units:
+            raise DBusError("org.freedesktop.systemd1.UnitExists", f"Unit {name} was already loaded or has a fragment file.")
+        props = {k: v.value for k, v in properties}
+        exec_start = props.get("ExecStart") or [["/bin/true", ["/bin/true"], False]]
+        u = self.add_unit(FakeUnit(name, props.get("WorkingDirectory", "/"), exec_start[0][1]), active=False)
+        if "Description" in props:
+            u.description = props["Description"]
+        return self._job(name, lambda: self._start(u))
+
+    @method()
+    def StartUnit(self, name: "s", mode: "s") -> "o":
+        u = self._unit(name)
+        return self._job(name, None if u.active_state == "active" else (lambda: self._start(u)))
+
+    @method()
+    def StopUnit(self, name: "s", mode: "s") -> "o":
+        self._unit(name)
+
+        def _stopped():
+            self.set_state(name, "inactive", "dead", 0)
+            # Transient units are garbage-collected once inactive
+            self.remove_unit(name)
+
+        return self._job(name, _stopped)
+
+    @method()
+    def RestartUnit(self, name: "s", mode: "s") -> "o":
+        u = self._unit(name)
+
+        def _restarted():
+            u.n_restarts += 1
+            self._start(u)
+
+        return self._job(name, _restarted)
+
+    @method()
+    def ResetFailedUnit(self, name: "s"):
+        u = self._unit(name)
+        if u.active_state == "failed":
+            self.remove_unit(name)
+
+    @method()
+    def Subscribe(self):
+        pass
+
+    @method()
+    def Unsubscribe(self):
+        pass
+
+    @dbus_signal()
+    def UnitNew(self, name, path) -> "so":
+        return [name, path]
+
+    @dbus_signal()
+    def UnitRemoved(self, name, path) -> "so":
+        return [name, path]
+
+    @dbus_signal()
+    def JobRemoved(self, job_id, path, unit, result) -> "uoss":
+        return [job_id, path, unit, result]
+
+
+class _ServerBus(MessageBus):
+    """Service-side bus that counts incoming calls and can delay them."""
+
+    latency = 0.0
+    calls: Counter
+
+    def _on_message(self, msg: Message) -> None:
+        if msg.message_type == MessageType.METHOD_CALL:
+            self.calls[f"{(msg.interface or '').rsplit('.', 1)[-1]}.{msg.member}"] += 1
+            if self.latency > 0:
+                self._loop.call_later(self.latency, super()._on_message, msg)
+                return
+        super()._on_message(msg)
+
+
+class DBusDaemon:
+    """A throwaway session dbus-daemon; address is set once started."""
+
+    def __init__(self):
+        self.proc: Optional[subprocess.Popen] = None
+        self.address = ""
+
+    def start(self) -> "DBusDaemon":
+        exe = shutil.which("dbus-daemon")
+        if exe is None:
+            raise FileNotFoundError("dbus-daemon not found on PATH")
+        self.proc = subprocess.Popen(
+            [exe, "--session", "--nofork", "--nopidfile", "--print-address=1"],
+            stdout=subprocess.PIPE,
+            # Unprivileged daemons warn about the fd limit on every start
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        self.address = self.proc.stdout.readline().strip()
+        if not self.address:
+            self.stop()
+            raise RuntimeError("dbus-daemon did not report an address")
+        return self
+
+    def stop(self) -> None:
+        if self.proc is not None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+            self.proc = None
+
+
+class FakeSystemd:
+    """Private dbus-daemon plus FakeManager, served from a background thread."""
+
+    def __init__(
+        self,
+        units: int = 0,
+        latency: float = 0.0,
+        job_delay: float = 0.01,
+        noise: int = 0,
+        address: Optional[str] = None,
+    ):
+        self.initial_units = units
+        self.latency = latency
+        self.job_delay = job_delay
+        self.noise = noise
+        self.calls: Counter = Counter()
+        self.manager: Optional[FakeManager] = None
+        self._daemon: Optional[DBusDaemon] = None
+        self._address = address
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    @property
+    def address(self) -> str:
+        return self._address or ""
+
+    def env(self) -> dict[str, str]:
+        """Environment that points ww at this fake (session bus, no fast-path socket)."""
+        return {"DBUS_SESSION_BUS_ADDRESS": self.address, "WW_BUS_TRANSPORT": "session"}
+
+    # -- lifecycle --
+
+    def start(self) -> "FakeSystemd":
+        if self._address is None:
+            self._daemon = DBusDaemon().start()
+            self._address = self._daemon.address
+        self._thread = threading.Thread(target=self._run, name="fake-systemd", daemon=True)
+        self._thread.start()
+        self._ready.wait(10)
+        if self._error is not None:
+            self.stop()
+            raise self._error
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        if self._daemon is not None:
+            self._daemon.stop()
+            self._daemon = None
+
+    def __enter__(self) -> "FakeSystemd":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        except BaseException as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _serve(self) -> None:
+        bus = patient_writes(_ServerBus(bus_address=self._address))
+        bus.calls = self.calls
+        await bus.connect()
+        self.manager = FakeManager(bus, self.job_delay, self.noise)
+        bus.export(SYSTEMD_PATH, self.manager)
+        for i in range(self.initial_units):
+            self.manager.add_unit(FakeUnit(f"ww-unit{i}.service", f"/srv/unit{i}", ["python", f"unit{i}.py"]))
+        await bus.request_name(SYSTEMD_DEST)
+        # Latency applies to client calls only, not to the setup above
+        bus.latency = self.latency
+
+    # -- scripting from the caller's thread --
+
+    def call(self, fn, *args, **kwargs) -> Any:
+        """Run fn(*args) on the fake's loop and return its result."""
+        done = threading.Event()
+        box: list = []
+
+        def _invoke():
+            try:
+                box.append((True, fn(*args, **kwargs)))
+            except BaseException as e:
+                box.append((False, e))
+            done.set()
+
+        self._loop.call_soon_threadsafe(_invoke)
+        done.wait(10)
+        ok, value = box[0]
+        if not ok:
+            raise value
+        return value
+
+    def add_units(self, names: Iterable[str], working_directory: str = "/", active: bool = True) -> list[FakeUnit]:
+        def _add():
+            return [self.manager.add_unit(FakeUnit(n, working_directory), active) for n in names]
+
+        return self.call(_add)
+
+    def clear(self) -> None:
+        """Remove every unit and reset the call counters."""
+
+        def _clear():
+            for name in list(self.manager.units):
+                self.manager.remove_unit(name)
+
+        self.call(_clear)
+        self.calls.clear()
+
+    @property
+    def units(self) -> dict[str, FakeUnit]:
+        return self.manager.units if self.manager is not None else {}
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Serve a fake systemd user manager on a private dbus-daemon.")
+    ap.add_argument("--units", "-n", type=int, default=10, help="ww-* units to preload")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every incoming call")
+    ap.add_argument("--job-delay-ms", type=float, default=10.0, help="time until JobRemoved for each job")
+    ap.add_argument("--noise", type=int, default=100, help="non-ww units reported by ListUnits")
+    ap.add_argument("--address", help="serve on an existing bus instead of starting dbus-daemon")
+    args = ap.parse_args(argv)
+
+    fake = FakeSystemd(
+        units=args.units,
+        latency=args.latency_ms / 1000,
+        job_delay=args.job_delay_ms / 1000,
+        noise=args.noise,
+        address=args.address,
+    ).start()
+    print(f"DBUS_SESSION_BUS_ADDRESS={fake.address}", flush=True)
+    print(f"fake systemd: {args.units} units; export the line above and WW_BUS_TRANSPORT=session", file=sys.stderr)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.stop()
+        print("calls: " + ", ".join(f"{k}={v}" for k, v in fake.calls.most_common()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
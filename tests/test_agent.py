@@ -0,0 +1,175 @@
+"""`ww agent` against the fake systemd: forwarding, the socket claim, and falling back without it."""
+
+from __future__ import annotations
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from conftest import ww_env
+from fake_systemd import FakeSystemd
+from watchfiles_systemd import agent as agent_mod
+from watchfiles_systemd.syncbus import SyncSystemdClient
+
+
+def _start_agent(tmp_path: Path) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "watchfiles_systemd", "agent"],
+        cwd=tmp_path,
+        env=ww_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            pytest.fail(f"ww agent exited with {proc.returncode}: {proc.stderr.read()}")
+        try:
+            with agent_mod.AgentClient.connect() as client:
+                client.ping()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    pytest.fail("ww agent did not answer within 20s")
+
+
+def _agent_spans(stderr: str) -> set[str]:
+    """Names of the forwarded ops in a WW_TRACE summary."""
+    return {line.split()[1] for line in stderr.splitlines() if line.startswith("agent ")}
+
+
+@pytest.fixture
+def agent(fake_systemd: FakeSystemd, tmp_path: Path):
+    fake_systemd.add_units(["ww-api.service", "ww-worker.service"])
+    proc = _start_agent(tmp_path)
+    try:
+        yield proc
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def test_client_forwards_to_the_agent(agent, fake_systemd, monkeypatch):
+    monkeypatch.setenv("WW_AGENT", "1")
+    api = fake_systemd.units["ww-api.service"]
+    client = agent_mod.connect()
+    with client:
+        assert isinstance(client, agent_mod.AgentClient)
+        assert client.ping()["pid"] == agent.pid
+        rows = sorted(client.list_ww_units())
+        assert [(r.name, r.active_state, r.sub_state) for r in rows] == [
+            ("ww-api.service", "active", "running"),
+            ("ww-worker.service", "active", "running"),
+        ]
+        assert client.get_status("ww-api.service", ("MainPID", "ActiveState")) == {
+            "MainPID": api.main_pid,
+            "ActiveState": "active",
+        }
+        assert client.get_unit_by_pid(api.main_pid) == "ww-api.service"
+
+        old_pid = api.main_pid
+        job, result = client.run_job("RestartUnit", "ss", ["ww-api.service", "replace"], 10)
+        assert job.startswith("/org/freedesktop/systemd1/job/") and result == "done"
+        assert api.n_restarts == 1
+        # The agent refreshes its cache after the job: no stale MainPID
+        assert api.main_pid != old_pid
+        assert client.get_status("ww-api.service", ("MainPID",)) == {"MainPID": api.main_pid}
+
+
+def test_run_job_rejects_other_methods(agent):
+    with agent_mod.AgentClient.connect() as client:
+        with pytest.raises(agent_mod.BusError, match="not a job method"):
+            client.run_job("KillUnit", "ssi", ["ww-api.service", "all", 9], 5)
+
+
+def test_cli_commands_go_through_the_agent(ww, agent, fake_systemd):
+    api = fake_systemd.units["ww-api.service"]
+    r = ww("ps", WW_AGENT="1", WW_TRACE="1")
+    assert r.returncode == 0, r.stderr
+    assert f"api\t{api.main_pid}\tactive\tww-api.service" in r.stdout
+    assert "list_ww_units" in _agent_spans(r.stderr)
+
+    r = ww("status", "api", WW_AGENT="1", WW_TRACE="1")
+    assert r.returncode == 0, r.stderr
+    assert "state: active (running)" in r.stdout
+    assert "get_statuses" in _agent_spans(r.stderr)
+
+    r = ww("restart", "api", WW_AGENT="1", WW_TRACE="1")
+    assert r.returncode == 0, r.stderr
+    assert api.n_restarts == 1
+    assert "run_job" in _agent_spans(r.stderr)
+
+
+def test_falls_back_when_the_agent_is_gone(ww, fake_systemd, tmp_path, monkeypatch):
+    monkeypatch.setenv("WW_AGENT", "1")
+    (api,) = fake_systemd.add_units(["ww-api.service"])
+    proc = _start_agent(tmp_path)
+    # SIGKILL leaves the socket file behind with nobody listening
+    proc.send_signal(signal.SIGKILL)
+    proc.wait(10)
+    assert os.path.exists(agent_mod.socket_path())
+
+    client = agent_mod.connect("session")
+    with client:
+        assert isinstance(client, SyncSystemdClient)
+    r = ww("ps", WW_AGENT="1", WW_TRACE="1")
+    assert r.returncode == 0, r.stderr
+    assert f"api\t{api.main_pid}\tactive\tww-api.service" in r.stdout
+    assert not _agent_spans(r.stderr)
+
+
+def test_agent_replaces_a_stale_socket(fake_systemd, tmp_path):
+    path = agent_mod.socket_path()
+    os.makedirs(os.path.dirname(path))
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+
+    proc = _start_agent(tmp_path)
+    try:
+        # A second agent refuses to take over the live socket
+        second = subprocess.run(
+            [sys.executable, "-m", "watchfiles_systemd", "agent"],
+            cwd=tmp_path,
+            env=ww_env(),
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        assert second.returncode == 1
+        assert "another ww agent is already serving" in second.stderr
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    # A clean shutdown removes the socket
+    assert not os.path.exists(path)
+
+
+def test_claim(tmp_path):
+    path = str(tmp_path / "ww" / "agent.sock")
+    agent_mod._claim(path)
+    assert os.path.isdir(tmp_path / "ww") and not os.path.exists(path)
+
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    agent_mod._claim(path)
+    assert not os.path.exists(path)
+
+    live = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    live.bind(path)
+    live.listen()
+    try:
+        with pytest.raises(RuntimeError, match="already serving"):
+            agent_mod._claim(path)
+        assert os.path.exists(path)
+    finally:
+        live.close()
@@ -0,0 +1,102 @@
+"""The public async API (api.Client) against the fake systemd."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from pathlib import Path
+
+import pytest
+
+from watchfiles_systemd.api import Client, IdentifierError, PsRow
+
+
+def _run(fn):
+    """fn(client) on a fresh Client, closed afterwards."""
+
+    async def main():
+        async with Client() as client:
+            return await fn(client)
+
+    return asyncio.run(main())
+
+
+def test_resolve(fake_systemd):
+    (api,) = fake_systemd.add_units(["ww-api.service"])
+
+    async def resolve(client):
+        return [
+            await client.resolve("api"),
+            await client.resolve(str(api.main_pid)),
+            await client.resolve(str(api.main_pid + 1)),  # another process in the unit
+            await client.resolve("ww-api"),
+            await client.resolve("ww-gone.service"),  # unit names are not looked up
+            await client.resolve("gone", unloaded=True),
+        ]
+
+    assert _run(resolve) == [
+        "ww-api.service",
+        "ww-api.service",
+        "ww-api.service",
+        "ww-api.service",
+        "ww-gone.service",
+        "ww-gone.service",
+    ]
+
+
+@pytest.mark.parametrize("ident, message", [("gone", "Not found: gone"), ("4000000", "No ww-* unit with PID 4000000")])
+def test_resolve_raises_identifier_error(fake_systemd, ident, message):
+    fake_systemd.add_units(["ww-web.service"])
+
+    async def resolve(client):
+        return await client.resolve(ident)
+
+    with pytest.raises(IdentifierError, match=re.escape(message)) as exc:
+        _run(resolve)
+    assert isinstance(exc.value, RuntimeError)
+
+
+def test_ps(fake_systemd):
+    api, _ = fake_systemd.add_units(["ww-api.service", "ww-worker.service"])
+    fake_systemd.call(fake_systemd.manager.set_state, "ww-worker.service", "activating", "auto-restart", 0)
+
+    async def ps(client):
+        return await client.ps()
+
+    assert sorted(_run(ps)) == [
+        PsRow("api", api.main_pid, "active", "ww-api.service"),
+        PsRow("worker", 0, "flapping", "ww-worker.service"),
+    ]
+
+
+def test_start_reuse_restart_new(fake_systemd, tmp_path: Path):
+    (tmp_path / "app.py").write_text("print('hi')\n")
+
+    async def starts(client):
+        return [
+            await client.start(tmp_path / "app.py"),
+            await client.start(tmp_path / "app.py"),
+            await client.start(tmp_path / "app.py", mode="restart"),
+            await client.start(tmp_path / "app.py", mode="new"),
+        ]
+
+    started, reused, restarted, new = _run(starts)
+    assert (started.unit, started.action, started.result, started.ok) == ("ww-app.service", "started", "done", True)
+    unit = fake_systemd.units["ww-app.service"]
+    assert unit.working_directory == str(tmp_path)
+    assert (reused.unit, reused.action, reused.result, reused.ok) == ("ww-app.service", "reused", None, True)
+    assert reused.status.active_state == "active"
+    assert (restarted.unit, restarted.action, restarted.result) == ("ww-app.service", "restarted", "done")
+    assert unit.n_restarts == 1
+    assert restarted.status.main_pid == unit.main_pid
+    assert (new.unit, new.action) == ("ww-app-2.service", "started")
+    assert sorted(fake_systemd.units) == ["ww-app-2.service", "ww-app.service"]
+
+
+def test_start_a_path_without_an_entrypoint(fake_systemd, tmp_path: Path):
+    async def start(client):
+        return await client.start(tmp_path / "missing.py")
+
+    with pytest.raises(FileNotFoundError):
+        _run(start)
+    assert fake_systemd.units == {}
@@ -0,0 +1,80 @@
+"""`ww batch` scheduling against the fake systemd: what waits for what."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import time
+
+import pytest
+
+from watchfiles_systemd.batch import run_batch
+
+JOB_DELAY = 0.4
+
+
+@pytest.fixture
+def slow_jobs(fake_systemd, monkeypatch, tmp_path):
+    monkeypatch.setattr(fake_systemd.manager, "job_delay", JOB_DELAY)
+    monkeypatch.chdir(tmp_path)
+    return fake_systemd
+
+
+def _batch(*commands: dict, order: str = "submit") -> tuple[int, list[dict], float]:
+    """(exit code, output records in emit order, seconds taken)."""
+    out: list[dict] = []
+    stdin = io.StringIO("".join(json.dumps(cmd) + "\n" for cmd in commands))
+    t0 = time.monotonic()
+    rc = asyncio.run(run_batch(stdin, lambda line: out.append(json.loads(line)), order=order))
+    return rc, out, time.monotonic() - t0
+
+
+def test_run_then_status_of_the_same_unit_keeps_order(slow_jobs, tmp_path):
+    (tmp_path / "a.py").write_text("")
+    rc, out, _ = _batch({"cmd": "run", "path": "a.py"}, {"cmd": "status", "name": "a"}, {"cmd": "pid", "name": "a"})
+    assert rc == 0, out
+    started = out[0]["result"]
+    assert (started["name"], started["job"]) == ("ww-a.service", "done")
+    # Without ordering, status and pid would look before the unit exists
+    assert out[1]["result"]["state"] == "active"
+    assert out[2]["result"]["pid"] == started["pid"] == slow_jobs.units["ww-a.service"].main_pid
+
+
+def test_different_units_overlap_and_the_same_unit_serialises(slow_jobs):
+    slow_jobs.add_units(["ww-a.service", "ww-b.service"])
+    rc, out, elapsed = _batch({"cmd": "restart", "name": "a"}, {"cmd": "restart", "name": "b"})
+    assert rc == 0, out
+    assert elapsed < 2 * JOB_DELAY
+
+    rc, out, elapsed = _batch({"cmd": "restart", "name": "a"}, {"cmd": "restart", "name": "ww-a.service"})
+    assert rc == 0, out
+    assert elapsed >= 2 * JOB_DELAY
+    assert slow_jobs.units["ww-a.service"].n_restarts == 3
+
+
+def test_ps_waits_for_earlier_commands(slow_jobs):
+    (a,) = slow_jobs.add_units(["ww-a.service"])
+    old_pid = a.main_pid
+    rc, out, _ = _batch({"cmd": "restart", "name": "a"}, {"cmd": "ps"})
+    assert rc == 0, out
+    new_pid = out[0]["result"]["pid"]
+    assert new_pid != old_pid
+    assert out[1]["result"]["units"] == [{"name": "a", "pid": new_pid, "state": "active", "unit": "ww-a.service"}]
+
+
+def test_pid_identifiers_wait_for_earlier_commands(slow_jobs):
+    (a,) = slow_jobs.add_units(["ww-a.service"])
+    old_pid = a.main_pid
+    rc, out, _ = _batch({"cmd": "restart", "name": "a"}, {"cmd": "status", "name": str(old_pid)})
+    # The old PID is gone once the restart finished
+    assert out[1] == {"seq": 1, "id": None, "cmd": "status", "ok": False, "error": f"No ww-* unit with PID {old_pid}"}
+    assert rc == 1
+
+
+@pytest.mark.parametrize("order, seqs", [("submit", [0, 1]), ("completion", [1, 0])])
+def test_output_order(slow_jobs, order, seqs):
+    slow_jobs.add_units(["ww-a.service", "ww-b.service"])
+    rc, out, _ = _batch({"cmd": "restart", "name": "a"}, {"cmd": "pid", "name": "b"}, order=order)
+    assert rc == 0, out
+    assert [o["seq"] for o in out] == seqs
@@ -0,0 +1,321 @@
+"""`ww` commands end to end, as subprocesses talking to the fake systemd."""
+
+from __future__ import annotations
+
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from conftest import ww_env
+from fake_systemd import FakeSystemd
+
+# Short commands run on the blocking fast path by default; WW_FASTPATH=0 routes
+# them through Typer and the async client
+PATHS = [pytest.param({}, id="fastpath"), pytest.param({"WW_FASTPATH": "0"}, id="typer")]
+
+
+def _json_lines(out: str) -> list[dict]:
+    return [json.loads(line) for line in out.splitlines() if line.startswith("{")]
+
+
+@pytest.fixture
+def app(tmp_path: Path) -> Path:
+    path = tmp_path / "app.py"
+    path.write_text("print('hi')\n")
+    return path
+
+
+@pytest.mark.parametrize("argv", [["--version"], ["-V"], ["version"]])
+def test_version(ww, argv):
+    from watchfiles_systemd import __version__
+
+    r = ww(*argv)
+    assert (r.returncode, r.stdout) == (0, f"{__version__}\n"), r.stderr
+    assert __version__.count(".") == 2
+
+
+@pytest.mark.parametrize("env", PATHS)
+def test_ps(ww, fake_systemd, env):
+    api, worker = fake_systemd.add_units(["ww-api.service", "ww-worker.service"])
+    fake_systemd.call(fake_systemd.manager.set_state, "ww-worker.service", "activating", "auto-restart", 0)
+    r = ww("ps", **env)
+    assert r.returncode == 0, r.stderr
+    assert sorted(r.stdout.splitlines()) == [
+        f"api\t{api.main_pid}\tactive\tww-api.service",
+        "worker\t0\tflapping\tww-worker.service",
+    ]
+
+
+@pytest.mark.parametrize("env", PATHS)
+def test_pid_and_status_accept_every_identifier(ww, fake_systemd, env):
+    (api,) = fake_systemd.add_units(["ww-api.service"])
+    # Friendly name, MainPID, a PID elsewhere in the unit, unit name
+    for ident in ("api", str(api.main_pid), str(api.main_pid + 1), "ww-api.service"):
+        r = ww("pid", ident, **env)
+        assert (r.returncode, r.stdout.strip()) == (0, str(api.main_pid)), (ident, r.stderr)
+    r = ww("status", "api", **env)
+    assert r.returncode == 0, r.stderr
+    assert "name: ww-api.service" in r.stdout
+    assert "state: active (running)" in r.stdout
+
+
+@pytest.mark.parametrize("env", PATHS)
+def test_unknown_identifier_exits_1(ww, fake_systemd, env):
+    r = ww("status", "nope", **env)
+    assert r.returncode == 1
+    assert "Not found: nope" in r.stderr
+    assert "Traceback" not in r.stderr
+
+
+@pytest.mark.parametrize("env", PATHS)
+def test_restart_stop_rm(ww, fake_systemd, env):
+    api, _ = fake_systemd.add_units(["ww-api.service", "ww-db.service"])
+    old_pid = api.main_pid
+    r = ww("restart", "api", **env)
+    assert r.returncode == 0, r.stderr
+    assert api.n_restarts == 1 and api.main_pid != old_pid
+    assert f"pid: {api.main_pid}" in r.stdout
+
+    r = ww("stop", "api", **env)
+    assert r.returncode == 0, r.stderr
+    assert "ww-api.service" not in fake_systemd.units
+
+    fake_systemd.call(fake_systemd.manager.set_state, "ww-db.service", "failed", "failed", 0)
+    r = ww("rm", "ww-db.service", **env)
+    assert r.returncode == 0, r.stderr
+    assert fake_systemd.units == {}
+
+
+def test_bulk_patterns_select_a_subset(ww, fake_systemd):
+    fake_systemd.add_units(["ww-web.service", "ww-worker.service", "ww-api.service"])
+    # A friendly-name glob: w* is not every ww-* unit
+    r = ww("stop-all", "w*")
+    assert r.returncode == 0, r.stderr
+    assert sorted(fake_systemd.units) == ["ww-api.service"]
+    assert "stopped 2/2 ww-* units" in r.stdout
+
+    fake_systemd.add_units(["ww-web.service"])
+    r = ww("stop-all", "ww-a*")
+    assert r.returncode == 0, r.stderr
+    assert sorted(fake_systemd.units) == ["ww-web.service"]
+
+    r = ww("stop-all", "nope*")
+    assert r.returncode == 0, r.stderr
+    assert r.stdout.strip() == "no matching ww-* units"
+
+
+def test_run_starts_then_reuses_restarts_or_adds(ww, fake_systemd, app, tmp_path):
+    r = ww("app.py")
+    assert r.returncode == 0, r.stderr
+    (started,) = _json_lines(r.stdout)
+    assert (started["name"], started["action"], started["job"]) == ("ww-app.service", "started", "done")
+    unit = fake_systemd.units["ww-app.service"]
+    assert unit.working_directory == str(tmp_path)
+
+    r = ww("run", "app.py")
+    assert r.returncode == 0, r.stderr
+    assert _json_lines(r.stdout)[0]["action"] == "reused"
+    assert "already runs this target" in r.stderr
+
+    r = ww("run", "app.py", "--restart")
+    assert _json_lines(r.stdout)[0]["action"] == "restarted"
+    assert unit.n_restarts == 1
+
+    r = ww("run", "app.py", "--new")
+    assert _json_lines(r.stdout)[0]["name"] == "ww-app-2.service"
+    assert sorted(fake_systemd.units) == ["ww-app-2.service", "ww-app.service"]
+
+
+def test_run_several_targets(ww, fake_systemd, app, tmp_path):
+    (tmp_path / "b.py").write_text("print('b')\n")
+    r = ww("run", "app.py", "b.py", "missing.py")
+    assert r.returncode == 2
+    assert fake_systemd.units == {}
+    r = ww("run", "app.py", "b.py")
+    assert r.returncode == 0, r.stderr
+    assert sorted(rec["name"] for rec in _json_lines(r.stdout)) == ["ww-app.service", "ww-b.service"]
+    assert "2/2 units ok" in r.stderr
+
+
+def test_batch(ww, fake_systemd, app):
+    fake_systemd.add_units(["ww-api.service"])
+    stdin = "\n".join(
+        json.dumps(cmd)
+        for cmd in (
+            {"cmd": "run", "path": "app.py"},
+            {"cmd": "status", "name": "app"},
+            {"cmd": "pid", "name": "nope", "id": "x"},
+            {"cmd": "restart", "name": "api"},
+            {"cmd": "ps"},
+            {"cmd": "bogus"},
+        )
+    )
+    r = ww("batch", stdin=stdin)
+    assert r.returncode == 1  # nope and bogus failed
+    out = _json_lines(r.stdout)
+    assert [o["seq"] for o in out] == list(range(6))
+    assert [o["ok"] for o in out] == [True, True, False, True, True, False]
+    assert out[0]["result"]["action"] == "started"
+    assert out[1]["result"]["state"] == "active"
+    assert (out[2]["id"], out[2]["error"]) == ("x", "Not found: nope")
+    assert sorted(u["name"] for u in out[4]["result"]["units"]) == ["api", "app"]
+
+
+def test_up_and_down(ww, fake_systemd, tmp_path):
+    (tmp_path / "db.py").write_text("")
+    (tmp_path / "api.py").write_text("")
+    (tmp_path / "ww.toml").write_text(
+        "[services.db]\npath = 'db.py'\n\n[services.api]\npath = 'api.py'\nafter = ['db']\n"
+    )
+    r = ww("up", "api")  # brings db along
+    assert r.returncode == 0, r.stderr
+    assert [rec["name"] for rec in _json_lines(r.stdout)] == ["ww-db.service", "ww-api.service"]
+    assert sorted(fake_systemd.units) == ["ww-api.service", "ww-db.service"]
+
+    r = ww("up")
+    assert [rec["action"] for rec in _json_lines(r.stdout)] == ["reused", "reused"]
+
+    r = ww("down")
+    assert r.returncode == 0, r.stderr
+    assert [rec["name"] for rec in _json_lines(r.stdout)] == ["ww-api.service", "ww-db.service"]
+    assert fake_systemd.units == {}
+
+
+def _reader(proc: subprocess.Popen) -> "queue.Queue[str]":
+    lines: queue.Queue = queue.Queue()
+
+    def pump() -> None:
+        for line in proc.stdout:
+            lines.put(line)
+
+    threading.Thread(target=pump, daemon=True).start()
+    return lines
+
+
+def test_events_streams_transitions(fake_systemd, tmp_path):
+    fake_systemd.add_units(["ww-api.service", "ww-other.service"])
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "watchfiles_systemd", "events", "api"],
+        cwd=tmp_path,
+        env=ww_env(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        lines = _reader(proc)
+        deadline = time.monotonic() + 20
+        record = None
+        # The subscription is not observable from outside: flip the state until a line shows up
+        while record is None and time.monotonic() < deadline:
+            fake_systemd.call(fake_systemd.manager.set_state, "ww-other.service", "failed", "failed")
+            fake_systemd.call(fake_systemd.manager.set_state, "ww-api.service", "failed", "failed")
+            try:
+                record = json.loads(lines.get(timeout=0.5))
+            except queue.Empty:
+                fake_systemd.call(fake_systemd.manager.set_state, "ww-api.service", "active", "running")
+        assert record is not None, "no event within 20s"
+        assert record["unit"] == "ww-api.service"  # ww-other is filtered out
+        assert record["event"] == "changed"
+        assert set(record["changed"]) <= {"ActiveState", "SubState"}
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def test_events_reports_a_lost_bus(tmp_path):
+    # A private fake: this one goes away mid-stream
+    with FakeSystemd() as fake:
+        fake.add_units(["ww-api.service"])
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "watchfiles_systemd", "events"],
+            cwd=tmp_path,
+            env=ww_env(**fake.env()),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            lines = _reader(proc)
+            deadline = time.monotonic() + 20
+            streaming = False
+            while not streaming and time.monotonic() < deadline:
+                fake.call(fake.manager.set_state, "ww-api.service", "failed", "failed")
+                fake.call(fake.manager.set_state, "ww-api.service", "active", "running")
+                try:
+                    streaming = bool(lines.get(timeout=0.5))
+                except queue.Empty:
+                    pass
+            assert streaming, "no event within 20s"
+        except BaseException:
+            proc.kill()
+            raise
+    assert proc.wait(10) == 1
+    stderr = proc.stderr.read()
+    assert "ww events: lost the systemd connection" in stderr
+    assert "Traceback" not in stderr
+
+
+def test_wait_for_a_unit_that_is_not_loaded(ww, fake_systemd):
+    # After `ww stop db` the transient unit is gone; the friendly name still means ww-db.service
+    r = ww("wait", "db", "--state", "inactive", "--timeout", "5")
+    assert r.returncode == 0, r.stderr
+    assert r.stdout.startswith("db\t0\tinactive\tww-db.service\t")
+
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "watchfiles_systemd", "wait", "db", "--state", "active", "--timeout", "20"],
+        env=ww_env(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        deadline = time.monotonic() + 20
+        # Re-add the unit until the waiter, subscribed by then, sees it appear
+        while proc.poll() is None and time.monotonic() < deadline:
+            fake_systemd.add_units(["ww-db.service"])
+            time.sleep(0.2)
+            fake_systemd.call(fake_systemd.manager.remove_unit, "ww-db.service")
+        out, err = proc.communicate(timeout=10)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+    assert proc.returncode == 0, err
+    assert "\tww-db.service\t" in out
+
+
+def test_wait_rejects_an_unknown_pid(ww, fake_systemd):
+    r = ww("wait", "99999", "--timeout", "1")
+    assert r.returncode == 1
+    assert "No ww-* unit with PID 99999" in r.stderr
+
+
+@pytest.mark.parametrize("argv", [["app.py"], ["run", "app.py"]], ids=["shorthand", "run"])
+def test_run_ignores_arguments_it_does_not_take(ww, fake_systemd, app, argv):
+    r = ww(*argv, "--port", "8000", "--restart", "--timeout", "10")
+    assert r.returncode == 0, r.stderr
+    assert [rec["name"] for rec in _json_lines(r.stdout)] == ["ww-app.service"]
+    assert "Ignoring arguments ww does not take: --port 8000" in r.stderr
+    assert sorted(fake_systemd.units) == ["ww-app.service"]
+
+
+def test_run_rejects_a_bad_timeout(ww, fake_systemd, app):
+    r = ww("app.py", "--timeout", "soon")
+    assert r.returncode == 2
+    assert "--timeout: not a number" in r.stderr
+    assert fake_systemd.units == {}
+
+
+@pytest.mark.parametrize("env", PATHS)
+def test_logs_of_a_unit_that_is_not_loaded(ww, fake_systemd, env):
+    r = ww("logs", "ww-nonexist.service", **env)
+    assert (r.returncode, r.stderr.strip()) == (1, "Unit not found: ww-nonexist.service")
+    fake_systemd.add_units(["ww-api.service"])
+    r = ww("logs", "ww-api.service", "-n", "1", **env)
+    assert "Unit not found" not in r.stderr
@@ -0,0 +1,119 @@
+"""Shell completion: the unit index and what each position completes to."""
+
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+
+from watchfiles_systemd import complete
+from watchfiles_systemd.complete import INDEX_TTL, candidates, identifiers, index_path, load_index, save_index
+
+
+@pytest.fixture
+def runtime(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _age(seconds: float) -> None:
+    then = time.time() - seconds
+    os.utime(index_path(), (then, then))
+
+
+def test_save_index_is_atomic_and_keeps_known_pids(runtime):
+    save_index(["ww-api.service", "ww-db.service"], {"ww-api.service": 42})
+    assert load_index() == {"ww-api.service": ("api", 42), "ww-db.service": ("db", 0)}
+    # A listing without PIDs keeps the ones already known
+    save_index(["ww-api.service", "ww-web-2.service"])
+    assert load_index() == {"ww-api.service": ("api", 42), "ww-web-2.service": ("web-2", 0)}
+    assert os.listdir(runtime / "ww") == ["units.idx"]  # no temporary file left behind
+
+
+def test_load_index_honours_max_age_and_ignores_garbage(runtime):
+    assert load_index() is None
+    save_index(["ww-api.service"])
+    _age(INDEX_TTL + 1)
+    assert load_index(INDEX_TTL) is None
+    assert load_index() == {"ww-api.service": ("api", 0)}
+    with open(index_path(), "w") as f:
+        f.write("not an index\n")
+    assert load_index() is None
+
+
+def test_fresh_index_is_used_without_asking_systemd(runtime, monkeypatch):
+    monkeypatch.setattr(complete, "_refresh", lambda with_pids: pytest.fail("refreshed a fresh index"))
+    save_index(["ww-api.service", "ww-apple.service", "ww-db.service"], {"ww-api.service": 4242})
+    assert identifiers("ap") == ["api", "apple"]
+    assert identifiers("ww-d") == ["ww-db.service"]
+    assert identifiers("42") == ["4242"]
+
+
+def test_stale_index_is_refreshed(fake_systemd):
+    save_index(["ww-gone.service"])
+    _age(INDEX_TTL + 1)
+    fake_systemd.add_units(["ww-api.service"])
+    assert identifiers("") == ["api", "ww-api.service"]
+    assert load_index(INDEX_TTL) == {"ww-api.service": ("api", 0)}
+
+
+def test_pid_completion_refreshes_an_index_without_pids(fake_systemd):
+    (api,) = fake_systemd.add_units(["ww-api.service"])
+    save_index(["ww-api.service"])  # fresh, but as written by a name lookup: no PIDs
+    assert identifiers(str(api.main_pid)[:2]) == [str(api.main_pid)]
+    assert load_index() == {"ww-api.service": ("api", api.main_pid)}
+
+
+def test_stale_index_is_still_used_when_systemd_is_unreachable(runtime, tmp_path, monkeypatch):
+    monkeypatch.setenv("WW_AGENT", "0")
+    monkeypatch.setenv("WW_BUS_TRANSPORT", "session")
+    monkeypatch.setenv("DBUS_SESSION_BUS_ADDRESS", f"unix:path={tmp_path / 'no-bus'}")
+    save_index(["ww-api.service"])
+    _age(INDEX_TTL + 1)
+    assert identifiers("a") == ["api"]
+
+
+def test_manifest_services(tmp_path, monkeypatch):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "ww.toml").write_text("[services.api]\npath = 'a.py'\n[services.db]\npath = 'b.py'\n")
+    monkeypatch.chdir(tmp_path / "sub")  # found in a parent, as `ww up` finds it
+    assert candidates(1, ["up", ""]) == ["api", "db"]
+    assert candidates(2, ["down", "api", "d"]) == ["db"]
+    (tmp_path / "ww.toml").write_text("[services.api\n")
+    assert candidates(1, ["up", ""]) == []
+
+
+@pytest.mark.parametrize(
+    "index, words, expected",
+    [
+        (0, ["re"], ["restart", "restart-all", ":files"]),
+        (1, ["logs", "-"], ["-n", "-f", "-a", "--all"]),
+        (3, ["wait", "api", "--state", "f"], ["failed"]),
+        (2, ["stop", "--timeout", ""], []),
+        (2, ["up", "-f", ""], [":files"]),
+        (1, ["completion", "z"], ["zsh"]),
+        (2, ["completion", "zsh", ""], []),
+        (1, ["ww-api.service", "re"], ["restart"]),
+        (1, ["run", ""], [":files"]),
+        (1, ["./app.py", ""], [":files"]),
+        (1, ["ps", ""], []),
+    ],
+)
+def test_candidates_by_position(runtime, index, words, expected):
+    assert candidates(index, words) == expected
+
+
+def test_identifier_positions(runtime):
+    save_index(["ww-api.service"], {"ww-api.service": 7})
+    assert candidates(1, ["logs", "a"]) == ["api"]
+    assert candidates(3, ["logs", "-n", "5", "a"]) == ["api"]
+    assert candidates(2, ["logs", "-f", "a"]) == ["api"]  # -f follows here, it takes no file
+    assert candidates(2, ["logs", "api", "a"]) == []  # logs takes one identifier
+    assert candidates(2, ["wait", "api", "a"]) == ["api"]  # wait and events take several
+
+
+def test_main_prints_one_candidate_per_line(runtime, capsys):
+    assert complete.main(["0", "sto"]) == 0
+    assert capsys.readouterr().out == "stop\nstop-all\n:files\n"
+    assert complete.main(["x"]) == 2
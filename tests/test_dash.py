@@ -0,0 +1,37 @@
+"""The dashboard's signal-fed status table when the bus goes away."""
+
+from __future__ import annotations
+
+import asyncio
+
+from fake_systemd import FakeSystemd
+from watchfiles_systemd.api import Client
+from watchfiles_systemd.dash.app import WWDashApp
+from watchfiles_systemd.dash.models import AppState
+
+
+async def _until(predicate, timeout: float = 10.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+def test_status_watch_falls_back_to_polling_when_the_bus_drops(monkeypatch):
+    async def main(fake: FakeSystemd) -> list[str]:
+        app = WWDashApp(AppState())
+        async with app.run_test():
+            await _until(lambda: app._cache is not None)
+            await asyncio.get_running_loop().run_in_executor(None, fake.stop)
+            await _until(lambda: app._cache is None)
+            status_task = app._status_task
+            assert status_task is not None and not status_task.done()  # now polling
+            lines = [strip.text for strip in app.log_widget.lines]
+        Client.shared().close()
+        return lines
+
+    with FakeSystemd() as fake:
+        for key, value in fake.env().items():
+            monkeypatch.setenv(key, value)
+        lines = asyncio.run(main(fake))
+    assert "[note] lost the systemd connection; polling unit status every 10s" in lines
@@ -0,0 +1,150 @@
+"""`ww doctor`: the uv-check cache, --warm and the concurrent checks, with a stand-in uvx."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from watchfiles_systemd import doctor
+
+UVX = """#!{python}
+import os, sys, time
+log = os.path.join(os.path.dirname(__file__), "calls.log")
+argv = sys.argv[1:]
+with open(log, "a") as f:
+    f.write("start " + " ".join(argv[:2]) + "\\n")
+time.sleep(float(os.environ.get("FAKE_UVX_DELAY", "0")))
+with open(log, "a") as f:
+    f.write("end " + " ".join(argv[:2]) + "\\n")
+if argv == ["--version"]:
+    print("uv 0.9.0")
+elif argv[0] == "--from" and not os.path.exists(os.path.join(os.path.dirname(__file__), "broken")):
+    print("1.1.0")
+else:
+    sys.exit("no watchfiles here")
+"""
+
+
+@pytest.fixture
+def uvx(fake_systemd, tmp_path: Path, monkeypatch) -> Path:
+    """A uvx (plus uv) that answers --version and the watchfiles probe, logging each call.
+
+    The cache goes to tmp_path/cache (XDG_CACHE_HOME, set by fake_systemd).
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    path = bin_dir / "uvx"
+    path.write_text(UVX.format(python=sys.executable))
+    path.chmod(0o755)
+    (bin_dir / "uv").write_text("")
+    monkeypatch.setenv("WW_UV_BIN", str(path))
+    monkeypatch.delenv("WW_WF_VERSION", raising=False)
+    monkeypatch.delenv("UV_CACHE_DIR", raising=False)
+    return path
+
+
+def _calls(uvx: Path) -> list[str]:
+    log = uvx.parent / "calls.log"
+    lines = log.read_text().splitlines() if log.exists() else []
+    log.unlink(missing_ok=True)
+    return [line[len("start ") :] for line in lines if line.startswith("start ")]
+
+
+def _doctor(capsys, **kw) -> tuple[int, dict[str, str]]:
+    rc = asyncio.run(doctor.run(**kw))
+    lines = capsys.readouterr().out.splitlines()
+    return rc, {line.split(":", 1)[0]: line.split(":", 1)[1].strip() for line in lines}
+
+
+def test_cache_key(uvx, monkeypatch):
+    key = doctor._cache_key(str(uvx), "watchfiles")
+    assert key["spec"] == "watchfiles" and key["uv_cache"] == ""
+    assert [tool[0] for tool in key["tools"]] == [str(uvx), str(uvx.parent / "uv")]
+
+    assert doctor._cache_key(str(uvx), "watchfiles==1.1.0") != key
+    monkeypatch.setenv("UV_CACHE_DIR", "/elsewhere")
+    assert doctor._cache_key(str(uvx), "watchfiles") != key
+    monkeypatch.delenv("UV_CACHE_DIR")
+    # An upgraded uv is a different binary
+    (uvx.parent / "uv").write_text("upgraded")
+    assert doctor._cache_key(str(uvx), "watchfiles") != key
+    assert doctor._cache_key(str(uvx.parent / "missing"), "watchfiles") is None
+
+
+def test_uv_checks_are_cached(uvx, capsys):
+    rc, out = _doctor(capsys)
+    assert rc == 0
+    assert out["uvx"].startswith("ok (uv 0.9.0) [") and out["uvx"].endswith(" ms]")
+    assert out["watchfiles via uvx"].startswith("ok 1.1.0 [")
+    assert sorted(_calls(uvx)) == ["--from watchfiles", "--version"]
+
+    rc, out = _doctor(capsys)
+    assert (out["uvx"], out["watchfiles via uvx"]) == ("ok (uv 0.9.0) [cached]", "ok 1.1.0 [cached]")
+    assert _calls(uvx) == []
+
+    # --no-cache runs the checks again, and so does an entry past CACHE_TTL
+    rc, out = _doctor(capsys, use_cache=False)
+    assert not out["uvx"].endswith("[cached]")
+    assert len(_calls(uvx)) == 2
+    path = Path(os.environ["XDG_CACHE_HOME"]) / "ww" / "doctor.json"
+    data = json.loads(path.read_text())
+    for entry in data["checks"].values():
+        entry["at"] = time.time() - doctor.CACHE_TTL - 1
+    path.write_text(json.dumps(data))
+    rc, out = _doctor(capsys)
+    assert not out["watchfiles via uvx"].endswith("[cached]")
+    assert len(_calls(uvx)) == 2
+
+
+def test_a_failed_check_is_not_cached(uvx, capsys):
+    (uvx.parent / "broken").touch()
+    rc, out = _doctor(capsys)
+    assert rc == 0
+    assert out["watchfiles via uvx"].startswith("FAIL [")
+    data = json.loads((Path(os.environ["XDG_CACHE_HOME"]) / "ww" / "doctor.json").read_text())
+    assert list(data["checks"]) == ["uvx"]
+    _calls(uvx)
+
+    # Fixed: both checks run again (the pair is cached or run as one)
+    (uvx.parent / "broken").unlink()
+    rc, out = _doctor(capsys)
+    assert out["watchfiles via uvx"].startswith("ok 1.1.0 [") and not out["watchfiles via uvx"].endswith("[cached]")
+    assert sorted(_calls(uvx)) == ["--from watchfiles", "--version"]
+
+
+def test_warm_pins_the_version(uvx, capsys):
+    rc, out = _doctor(capsys, warm=True)
+    assert rc == 0
+    pin = Path(os.environ["XDG_CACHE_HOME"]) / "ww" / "watchfiles-version"
+    assert pin.read_text() == "1.1.0\n"
+    assert out["watchfiles via uvx"].startswith(f"ok 1.1.0 (pinned in {pin}) [")
+    # Resolved unpinned, then as units will ask for it
+    calls = _calls(uvx)
+    assert sorted(calls[:2]) == ["--from watchfiles", "--version"]
+    assert calls[2:] == ["--from watchfiles==1.1.0"]
+
+    # The cache entry is under the pinned spec, so the next plain run uses it
+    rc, out = _doctor(capsys)
+    assert out["watchfiles via uvx"] == f"ok 1.1.0 (pinned in {pin}) [cached]"
+
+
+def test_warm_fails_without_watchfiles(uvx, capsys):
+    (uvx.parent / "broken").touch()
+    rc, out = _doctor(capsys, warm=True)
+    assert rc == 1
+    assert out["watchfiles via uvx"].startswith("FAIL")
+    assert not (Path(os.environ["XDG_CACHE_HOME"]) / "ww" / "watchfiles-version").exists()
+
+
+def test_uv_checks_run_concurrently(uvx, monkeypatch):
+    monkeypatch.setenv("FAKE_UVX_DELAY", "0.5")
+    uvx_check, wf = asyncio.run(doctor._uv_checks(str(uvx), "watchfiles", warm=False))
+    assert uvx_check.ok and wf.ok
+    events = [line.split()[0] for line in (uvx.parent / "calls.log").read_text().splitlines()]
+    assert events == ["start", "start", "end", "end"]
@@ -0,0 +1,43 @@
+"""events.until_disconnect against a fake systemd that goes away."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from fake_systemd import FakeSystemd
+from watchfiles_systemd.events import until_disconnect
+from watchfiles_systemd.systemd_bus import SystemdClient
+
+
+def test_until_disconnect_raises_connection_error_and_cancels_work(monkeypatch):
+    async def main(fake: FakeSystemd) -> asyncio.Future:
+        client = await SystemdClient.connect()
+        work = asyncio.ensure_future(asyncio.Event().wait())  # never finishes by itself
+        try:
+            with pytest.raises(ConnectionError, match="lost the systemd connection"):
+                await asyncio.gather(
+                    until_disconnect(client, work),
+                    asyncio.get_running_loop().run_in_executor(None, fake.stop),
+                )
+        finally:
+            client.disconnect()
+        return work
+
+    with FakeSystemd() as fake:
+        for key, value in fake.env().items():
+            monkeypatch.setenv(key, value)
+        work = asyncio.run(main(fake))
+    assert work.cancelled()
+
+
+def test_until_disconnect_returns_the_result_while_connected(fake_systemd):
+    async def main() -> int:
+        client = await SystemdClient.connect()
+        try:
+            return await until_disconnect(client, asyncio.ensure_future(asyncio.sleep(0, 42)))
+        finally:
+            client.disconnect()
+
+    assert asyncio.run(main()) == 42
@@ -0,0 +1,25 @@
+"""fastpath.run() failure handling, without a bus."""
+
+from __future__ import annotations
+
+import socket
+
+import pytest
+
+from watchfiles_systemd import fastpath
+from watchfiles_systemd.syncbus import SyncSystemdClient
+
+
+@pytest.mark.parametrize("argv", [["ps"], ["status", "api"], ["pid", "ww-api.service"], ["restart", "ww-api.service"]])
+def test_connection_dropped_mid_command_is_an_error_not_a_traceback(argv, monkeypatch, capsys):
+    ours, theirs = socket.socketpair()
+    theirs.close()
+    monkeypatch.setattr(fastpath._agent, "connect", lambda: SyncSystemdClient(ours, direct=True))
+    monkeypatch.delenv("WW_FASTPATH", raising=False)
+    assert fastpath.run(argv) == 1
+    assert capsys.readouterr().err.startswith("Lost the systemd user manager:")
+
+
+def test_defers_what_it_does_not_handle():
+    assert fastpath.run(["ps", "--watch"]) is None
+    assert fastpath.run(["logs"]) is None
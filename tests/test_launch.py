@@ -0,0 +1,183 @@
+"""Instance naming and the reuse check behind `ww <path>` (no bus needed)."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from watchfiles_systemd.launch import (
+    _report,
+    candidate_statuses,
+    is_instance_name,
+    job_call,
+    parse_run_args,
+    pick_free_name,
+    plan_starts,
+    running_instance,
+    runs_target,
+    start_candidates,
+    start_mode,
+    transient_properties,
+)
+from watchfiles_systemd.units import UnitRow
+from watchfiles_systemd.util import resolve_target
+
+
+@pytest.fixture
+def target(tmp_path: Path):
+    (tmp_path / "app.py").write_text("")
+    return resolve_target(tmp_path / "app.py")
+
+
+def _status(target, unit: str = "ww-app.service", state: str = "active", **overrides) -> dict:
+    """What the reuse check reads back for a unit started by transient_properties()."""
+    props = dict(transient_properties(target, unit))
+    # systemd reports ExecStart as a(sasbttttuii): the argv, then timestamps and status
+    exec_start = [(path, argv, ignore, 0, 0, 0, 0, 0, 0, 0) for path, argv, ignore in props["ExecStart"][1]]
+    st = {"ActiveState": state, "WorkingDirectory": props["WorkingDirectory"][1], "ExecStart": exec_start}
+    st.update(overrides)
+    return st
+
+
+@pytest.mark.parametrize(
+    "taken, expected",
+    [
+        ([], "ww-app.service"),
+        (["ww-other.service", "ww-apple.service"], "ww-app.service"),
+        (["ww-app.service"], "ww-app-2.service"),
+        (["ww-app.service", "ww-app-2.service", "ww-app-4.service"], "ww-app-3.service"),
+        # A free base name is handed out again even when numbered instances remain
+        (["ww-app-2.service"], "ww-app.service"),
+    ],
+)
+def test_pick_free_name(taken, expected):
+    assert pick_free_name(taken, "app") == expected
+
+
+@pytest.mark.parametrize(
+    "unit, base, expected",
+    [
+        ("ww-app.service", "app", True),
+        ("ww-app-2.service", "app", True),
+        ("ww-app-10.service", "app", True),
+        ("ww-app-.service", "app", False),
+        ("ww-app-x.service", "app", False),
+        ("ww-app-2-3.service", "app", False),
+        ("ww-apple.service", "app", False),
+        ("app.service", "app", False),
+        ("ww-app.service.bak", "app", False),
+        # The slug is literal, not a pattern
+        ("ww-my.app.service", "my.app", True),
+        ("ww-myxapp.service", "my.app", False),
+        # A slug that ends in -N: its own instances, and also the N-th of the shorter slug
+        ("ww-app-2-3.service", "app-2", True),
+        ("ww-app-2.service", "app-2", True),
+    ],
+)
+def test_is_instance_name(unit, base, expected):
+    assert is_instance_name(unit, base) is expected
+
+
+def test_runs_target(target, tmp_path):
+    assert runs_target(target, _status(target))
+    assert not runs_target(target, _status(target, WorkingDirectory="/elsewhere"))
+    assert not runs_target(target, _status(target, ExecStart=[]))
+    assert not runs_target(target, {})
+    (tmp_path / "other.py").write_text("")
+    other = resolve_target(tmp_path / "other.py")
+    assert not runs_target(target, _status(other))
+
+
+def test_running_instance_reuse_restart_or_new(target):
+    # reuse/restart act on the first live unit that runs the target; new ignores them
+    statuses = [
+        ("ww-app.service", _status(target, state="failed")),
+        ("ww-app-2.service", _status(target, WorkingDirectory="/elsewhere")),
+        ("ww-app-3.service", _status(target, state="activating")),
+        ("ww-app-4.service", _status(target)),
+    ]
+    assert running_instance(target, statuses) == statuses[2]
+    assert running_instance(target, statuses[:2]) is None
+    assert pick_free_name((name for name, _ in statuses), "app") == "ww-app-5.service"
+
+
+def test_plan_starts(target, tmp_path):
+    (tmp_path / "other.py").write_text("")
+    other = resolve_target(tmp_path / "other.py")
+    units = [
+        UnitRow("ww-app.service", "active", "running", "/u/app"),
+        UnitRow("ww-app-2.service", "failed", "failed", "/u/app2"),
+        UnitRow("ww-db.service", "active", "running", "/u/db"),
+    ]
+    assert [u.name for u in start_candidates(units, [target, other], "reuse")] == ["ww-app.service"]
+    assert start_candidates(units, [target], "new") == []
+
+    # The MATCH_FIELDS read comes without the states: the listing's are merged in
+    read = _status(target)
+    del read["ActiveState"]
+    candidates = candidate_statuses(units[:1], [read])
+    assert candidates[0][1]["ActiveState"] == "active"
+
+    taken = [u.name for u in units]
+    assert plan_starts([target, other], taken, candidates, "reuse") == [
+        ("ww-app.service", "reused", target),
+        ("ww-other.service", "started", other),
+    ]
+    assert plan_starts([target], taken, candidates, "restart") == [("ww-app.service", "restarted", target)]
+    # New instances get distinct names, also within one plan
+    assert plan_starts([target, target], taken, candidates, "new") == [
+        ("ww-app-3.service", "started", target),
+        ("ww-app-4.service", "started", target),
+    ]
+
+    assert job_call("ww-app.service", "reused", target) is None
+    assert job_call("ww-app.service", "restarted", target) == ("RestartUnit", "ss", ("ww-app.service", "replace"))
+    method, signature, args = job_call("ww-app-3.service", "started", target)
+    assert (method, signature, args[:2], args[3]) == ("StartTransientUnit", "ssa(sv)a(sa(sv))", ("ww-app-3.service", "fail"), [])
+    assert args[2] == transient_properties(target, "ww-app-3.service")
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (["a.py"], (["a.py"], 30.0, "reuse", [])),
+        (["a.py", "b.py", "--restart"], (["a.py", "b.py"], 30.0, "restart", [])),
+        (["a.py", "--timeout=5", "--new"], (["a.py"], 5.0, "new", [])),
+        (["a.py", "--port", "8000", "--timeout", "5"], (["a.py"], 5.0, "reuse", ["--port", "8000"])),
+        (["a.py", "-v", "b.py"], (["a.py"], 30.0, "reuse", ["-v", "b.py"])),
+    ],
+)
+def test_parse_run_args(argv, expected):
+    assert parse_run_args(argv) == expected
+
+
+@pytest.mark.parametrize("argv", [["a.py", "--timeout"], ["a.py", "--timeout", "x"], ["a.py", "--restart", "--new"]])
+def test_parse_run_args_rejects(argv):
+    with pytest.raises(ValueError):
+        parse_run_args(argv)
+
+
+def test_start_mode():
+    assert start_mode() == "reuse"
+    assert start_mode(restart=True) == "restart"
+    assert start_mode(new=True) == "new"
+    with pytest.raises(ValueError):
+        start_mode(True, True)
+
+
+@pytest.mark.parametrize(
+    "action, result, rc, err",
+    [
+        ("started", "done", 0, ""),
+        ("reused", None, 0, "already runs this target"),
+        ("restarted", "failed", 1, "ww-app.service: job failed"),
+        ("started", None, 1, "job still running after 5s"),
+    ],
+)
+def test_report(action, result, rc, err, capsys):
+    st = {"MainPID": 7, "ActiveState": "active", "SubState": "running"}
+    assert _report("ww-app.service", st, action, result, 5.0) == rc
+    out, stderr = capsys.readouterr()
+    assert "name: ww-app.service\npid: 7\nstate: active\n" in out
+    assert err in stderr
@@ -0,0 +1,106 @@
+"""ww.toml parsing and `ww up` ordering (no bus needed)."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from watchfiles_systemd.manifest import ManifestError, levels, load, select
+
+
+def _load(tmp_path: Path, services: str) -> dict:
+    for name in ("a", "b", "c", "d"):
+        (tmp_path / f"{name}.py").write_text("")
+    path = tmp_path / "ww.toml"
+    path.write_text(services)
+    return load(path)
+
+
+def _names(order) -> list[list[str]]:
+    return [[svc.name for svc in level] for level in order]
+
+
+def test_levels_follow_dependencies(tmp_path):
+    services = _load(
+        tmp_path,
+        """
+[services.d]
+path = "d.py"
+after = ["b", "c"]
+[services.c]
+path = "c.py"
+after = ["a"]
+[services.b]
+path = "b.py"
+[services.a]
+path = "a.py"
+""",
+    )
+    # Sorted within a level; d waits for its deepest dependency
+    assert _names(levels(services)) == [["a", "b"], ["c"], ["d"]]
+    assert _names(levels(select(services, ["c"], with_deps=True))) == [["a"], ["c"]]
+    # Without dependencies, an edge to a service not selected is ignored
+    assert _names(levels(select(services, ["d"], with_deps=False))) == [["d"]]
+
+
+def test_dependency_cycle_is_reported(tmp_path):
+    services = _load(
+        tmp_path,
+        """
+[services.a]
+path = "a.py"
+[services.b]
+path = "b.py"
+after = ["c"]
+[services.c]
+path = "c.py"
+after = ["b"]
+""",
+    )
+    with pytest.raises(ManifestError, match="dependency cycle between b, c"):
+        levels(services)
+
+
+def test_unknown_dependency(tmp_path):
+    with pytest.raises(ManifestError, match=r"services.a.after: unknown services zz"):
+        _load(tmp_path, '[services.a]\npath = "a.py"\nafter = ["zz"]\n')
+
+
+@pytest.mark.parametrize(
+    "toml, expected",
+    [
+        ('memory_max = "512M"', [("MemoryMax", ("t", 512 << 20))]),
+        ('memory_max = "1.5G"', [("MemoryMax", ("t", 3 << 29))]),
+        ("memory_max = 4096", [("MemoryMax", ("t", 4096))]),
+        ('memory_max = "infinity"', [("MemoryMax", ("t", (1 << 64) - 1))]),
+        ('cpu_quota = "50%"', [("CPUQuotaPerSecUSec", ("t", 500_000))]),
+        ('cpu_quota = "150%"', [("CPUQuotaPerSecUSec", ("t", 1_500_000))]),
+        ("tasks_max = 64", [("TasksMax", ("t", 64))]),
+        ("tasks_max = 0", [("TasksMax", ("t", 0))]),
+        ('tasks_max = "infinity"', [("TasksMax", ("t", (1 << 64) - 1))]),
+    ],
+)
+def test_limits(tmp_path, toml, expected):
+    services = _load(tmp_path, f'[services.a]\npath = "a.py"\n{toml}\n')
+    assert services["a"].limits == expected
+
+
+@pytest.mark.parametrize(
+    "toml, message",
+    [
+        ("memory_max = -1", "memory_max: out of range"),
+        ('memory_max = "-512M"', "memory_max: out of range"),
+        ('memory_max = "lots"', "memory_max: expected bytes or a size"),
+        ("tasks_max = -1", "tasks_max: expected a non-negative integer"),
+        # A count, not a size: no suffixes, no strings other than infinity
+        ('tasks_max = "1K"', "tasks_max: expected a non-negative integer"),
+        ('tasks_max = "64"', "tasks_max: expected a non-negative integer"),
+        ("tasks_max = 1.5", "tasks_max: expected a non-negative integer"),
+        ("tasks_max = true", "tasks_max: expected a non-negative integer"),
+        ('cpu_quota = "-5%"', "cpu_quota: out of range"),
+    ],
+)
+def test_invalid_limits(tmp_path, toml, message):
+    with pytest.raises(ManifestError, match=message):
+        _load(tmp_path, f'[services.a]\npath = "a.py"\n{toml}\n')
@@ -0,0 +1,103 @@
+"""`ww ps --watch` text and JSON output against the fake systemd."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import queue
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import ww_env
+from test_cli import _reader
+from watchfiles_systemd.pswatch import PsWatch
+from watchfiles_systemd.systemd_bus import SystemdClient, UnitCache
+
+
+def _watch(tmp_path, *args: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "watchfiles_systemd", "ps", "--watch", *args],
+        cwd=tmp_path,
+        env=ww_env(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+
+def _next(lines: queue.Queue, fake, unit: str) -> str:
+    """The next line, flipping unit failed/active until the watcher reports something."""
+    deadline = time.monotonic() + 20
+    active = True
+    while time.monotonic() < deadline:
+        try:
+            return lines.get(timeout=0.5).rstrip("\n")
+        except queue.Empty:
+            active = not active
+            fake.call(fake.manager.set_state, unit, *(("active", "running") if active else ("failed", "failed")))
+    pytest.fail("no line within 20s")
+
+
+def test_text_mode(fake_systemd, tmp_path):
+    (api,) = fake_systemd.add_units(["ww-api.service"])
+    proc = _watch(tmp_path)
+    try:
+        lines = _reader(proc)
+        assert _next(lines, fake_systemd, "ww-api.service") == f"api\t{api.main_pid}\tactive\tww-api.service"
+        line = _next(lines, fake_systemd, "ww-api.service")
+        assert line.startswith("api\t") and line.endswith("\tww-api.service\tfailed")
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def test_json_mode(fake_systemd, tmp_path):
+    (api,) = fake_systemd.add_units(["ww-api.service"])
+    proc = _watch(tmp_path, "--json")
+    try:
+        lines = _reader(proc)
+        snapshot = json.loads(_next(lines, fake_systemd, "ww-api.service"))
+        assert snapshot == {"event": "snapshot", "name": "api", "pid": api.main_pid, "state": "active", "unit": "ww-api.service"}
+        record = json.loads(_next(lines, fake_systemd, "ww-api.service"))
+        assert (record["event"], record["state"], record["note"]) == ("changed", "failed", "failed")
+        assert record["changed"]["ActiveState"] == ["active", "failed"]
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def test_a_change_right_after_the_snapshot_is_not_lost(fake_systemd, capsys):
+    fake_systemd.add_units(["ww-api.service"])
+
+    class Racy(PsWatch):
+        def snapshot(self):
+            super().snapshot()
+            # As if a signal was processed before the feeder task first ran
+            st = self.cache.get("ww-api.service")
+            st.active_state = st.sub_state = "failed"
+            self.cache._emit("changed", "ww-api.service", {"ActiveState": ("active", "failed")}, st)
+
+    async def main() -> list[str]:
+        client = await SystemdClient.connect()
+        cache = await UnitCache(client).start()
+        # No write=: output goes to sys.stdout as it is now (capsys's)
+        task = asyncio.ensure_future(Racy(cache, "text").run())
+        out = ""
+        try:
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                out += capsys.readouterr().out
+                if out.count("\n") >= 2:
+                    break
+        finally:
+            task.cancel()
+            cache.stop()
+            client.disconnect()
+        return out.splitlines()
+
+    snapshot, change = asyncio.run(main())
+    assert snapshot.endswith("\tactive\tww-api.service")
+    assert change.endswith("\tfailed\tww-api.service\tfailed")
@@ -0,0 +1,128 @@
+"""The fast path's wire format: syncbus._Writer/_Reader and reply handling."""
+
+from __future__ import annotations
+
+import socket
+import struct
+
+import pytest
+from dbus_next import Message, MessageType, Variant
+
+from watchfiles_systemd.syncbus import BusError, SyncSystemdClient, _parse_message, _Reader, _split, _Writer
+
+
+def _marshal(sig: str, *values) -> bytes:
+    w = _Writer()
+    for t, v in zip(_split(sig), values):
+        w.put(t, v)
+    return bytes(w.buf)
+
+
+def test_split_signature():
+    assert _split("sa{sv}(uo)as") == ["s", "a{sv}", "(uo)", "as"]
+    assert _split("a(sa(sv))") == ["a(sa(sv))"]
+
+
+def test_strings_and_fixed_types_are_aligned():
+    data = _marshal("ysut", 7, "ab", 5, 1)
+    assert data == (
+        b"\x07\0\0\0"  # y, then padding to 4 for the string length
+        + b"\x02\0\0\0ab\0"
+        + b"\0"  # pad to 4
+        + b"\x05\0\0\0"
+        + b"\x01\0\0\0\0\0\0\0"  # already 8-aligned at 16
+    )
+    assert _Reader(data, "<").body("ysut") == [7, "ab", 5, 1]
+
+
+def test_array_length_excludes_padding_before_the_first_element():
+    # The length sits at 4; 8-byte elements start at 8 even when the array is empty
+    assert _marshal("ua(t)", 1, []) == b"\x01\0\0\0" + b"\0\0\0\0"
+    data = _marshal("ua(t)", 1, [(2,)])
+    assert struct.unpack_from("<I", data, 4) == (8,)
+    assert len(data) == 16
+    assert _Reader(data, "<").body("ua(t)") == [1, [(2,)]]
+
+
+def test_variants_are_signature_value_pairs():
+    data = _marshal("a(sv)", [("Description", ("s", "x")), ("RemainAfterExit", ("b", True)), ("PIDs", ("au", [1, 2]))])
+    # Unwrapped on the way back
+    assert _Reader(data, "<").body("a(sv)") == [[("Description", "x"), ("RemainAfterExit", True), ("PIDs", [1, 2])]]
+
+
+def test_matches_dbus_next():
+    from dbus_next._private.marshaller import Marshaller
+
+    ours = [("ExecStart", ("a(sasb)", [("/bin/python", ["python", "a.py"], False)])), ("Slice", ("s", "ww.slice"))]
+    # dbus-next wants structs as lists and variants as Variant
+    theirs = [
+        ["ExecStart", Variant("a(sasb)", [["/bin/python", ["python", "a.py"], False]])],
+        ["Slice", Variant("s", "ww.slice")],
+    ]
+    assert _marshal("a(sv)", ours) == bytes(Marshaller("a(sv)", [theirs]).marshall())
+
+
+def test_reads_dicts_of_variants():
+    from dbus_next._private.marshaller import Marshaller
+
+    props = {"ActiveState": Variant("s", "active"), "MainPID": Variant("u", 42), "NRestarts": Variant("u", 0)}
+    data = bytes(Marshaller("a{sv}", [props]).marshall())
+    assert _Reader(data, "<").body("a{sv}") == [{"ActiveState": "active", "MainPID": 42, "NRestarts": 0}]
+    empty = bytes(Marshaller("a{sv}", [{}]).marshall())
+    assert _Reader(empty, "<").body("a{sv}") == [{}]
+
+
+def test_reads_big_endian():
+    data = struct.pack(">I", 3) + b"abc\0" + struct.pack(">i", -5)
+    assert _Reader(data, ">").body("si") == ["abc", -5]
+
+
+def _wire(msg: Message) -> bytes:
+    return bytes(msg._marshall())
+
+
+def test_parse_method_return():
+    msg = Message(
+        message_type=MessageType.METHOD_RETURN, reply_serial=3, serial=8, signature="ao", body=[["/a", "/b"]]
+    )
+    parsed = _parse_message(_wire(msg))
+    assert (parsed.type, parsed.serial, parsed.reply_serial, parsed.body) == (2, 8, 3, [["/a", "/b"]])
+
+
+@pytest.fixture
+def pair():
+    ours, theirs = socket.socketpair()
+    ours.settimeout(5)
+    with SyncSystemdClient(ours, direct=True) as client, theirs:
+        yield client, theirs
+
+
+def test_error_reply_raises_bus_error(pair):
+    client, peer = pair
+    serial = client.send("org.freedesktop.systemd1", "/org/freedesktop/systemd1", "a.b", "GetUnit", "s", ["x"])
+    error = Message(
+        message_type=MessageType.ERROR,
+        error_name="org.freedesktop.systemd1.NoSuchUnit",
+        reply_serial=serial,
+        serial=1,
+        signature="s",
+        body=["Unit x not loaded."],
+    )
+    ok = Message(message_type=MessageType.METHOD_RETURN, reply_serial=serial + 1, serial=2, signature="u", body=[7])
+    # Replies may arrive out of order and split across reads
+    data = _wire(ok) + _wire(error)
+    peer.sendall(data[:5])
+    peer.sendall(data[5:])
+    client.send("org.freedesktop.systemd1", "/", "a.b", "Other")
+    with pytest.raises(BusError) as exc:
+        client.reply(serial)
+    assert (exc.value.type, exc.value.text) == ("org.freedesktop.systemd1.NoSuchUnit", "Unit x not loaded.")
+    assert client.reply(serial + 1) == [7]
+
+
+def test_closed_connection_raises_connection_error(pair):
+    client, peer = pair
+    serial = client.send("org.freedesktop.systemd1", "/", "a.b", "Ping")
+    peer.close()
+    with pytest.raises(ConnectionError):
+        client.reply(serial)
@@ -0,0 +1,106 @@
+"""Transport selection when dbus-next's internals are not what systemd_bus expects."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import socket
+
+import pytest
+
+from dbus_next import ErrorType, Message, MessageType
+
+from watchfiles_systemd.systemd_bus import (
+    DirectMessageBus,
+    DirectTransportUnavailable,
+    SystemdClient,
+    patient_writes,
+)
+
+
+def _missing(self):
+    raise AttributeError("_message_reader")
+
+
+@pytest.fixture
+def private_socket(tmp_path, monkeypatch):
+    """A listening $XDG_RUNTIME_DIR/systemd/private that nobody answers on."""
+    (tmp_path / "systemd").mkdir()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(str(tmp_path / "systemd" / "private"))
+        sock.listen()
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+        yield
+
+
+def test_patient_writes_leaves_an_unknown_bus_alone():
+    bus = object()
+    assert patient_writes(bus) is bus
+
+
+def test_unsupported_direct_transport_falls_back_to_the_session_bus(fake_systemd, private_socket, monkeypatch):
+    monkeypatch.setattr(DirectMessageBus, "_message_reader", property(_missing), raising=False)
+    fake_systemd.add_units(["ww-api.service"])
+
+    async def main(transport: str) -> list[str]:
+        client = await SystemdClient.connect(transport)
+        try:
+            assert not client.direct
+            return [u.name for u in await client.list_ww_units()]
+        finally:
+            client.disconnect()
+
+    assert asyncio.run(main("auto")) == ["ww-api.service"]
+    with pytest.raises(DirectTransportUnavailable, match="direct transport"):
+        asyncio.run(main("private"))
+
+
+def test_direct_bus_answers_bus_driver_calls(tmp_path, private_socket, caplog):
+    async def main() -> list:
+        bus = DirectMessageBus(bus_address=f"unix:path={tmp_path / 'systemd' / 'private'}")
+        try:
+            # dbus-next's own AddMatch is answered without an error being logged
+            bus._add_match_rule("type='signal',interface='org.freedesktop.systemd1.Manager'")
+            replies = []
+            for member, signature, body in [
+                ("AddMatch", "s", ["type='signal'"]),
+                ("GetNameOwner", "s", ["org.freedesktop.systemd1"]),
+                ("ListNames", "", []),
+            ]:
+                msg = Message(
+                    destination="org.freedesktop.DBus",
+                    path="/org/freedesktop/DBus",
+                    interface="org.freedesktop.DBus",
+                    member=member,
+                    signature=signature,
+                    body=body,
+                )
+                reply = await asyncio.wait_for(bus.call(msg), 5)
+                replies.append((reply.message_type, reply.error_name))
+            return replies
+        finally:
+            bus.disconnect()
+
+    with caplog.at_level(logging.ERROR):
+        assert asyncio.run(main()) == [
+            (MessageType.METHOD_RETURN, None),
+            (MessageType.ERROR, ErrorType.NAME_HAS_NO_OWNER.value),
+            (MessageType.ERROR, ErrorType.NOT_SUPPORTED.value),
+        ]
+    assert not caplog.records
+
+
+def test_get_unit_path_forgets_removed_units(fake_systemd):
+    fake_systemd.add_units(["ww-api.service"])
+
+    async def main() -> list:
+        client = await SystemdClient.connect()
+        try:
+            await client.list_ww_units()
+            before = await client.get_unit_path("ww-api.service")
+            fake_systemd.call(fake_systemd.manager.remove_unit, "ww-api.service")
+            return [before, await client.get_unit_path("ww-api.service")]
+        finally:
+            client.disconnect()
+
+    assert asyncio.run(main()) == ["/org/freedesktop/systemd1/unit/ww_2dapi_2eservice", None]
@@ -0,0 +1,119 @@
+"""WW_TRACE: spans, the summary table, Chrome trace JSON and the bus hook."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from watchfiles_systemd import trace
+from watchfiles_systemd.trace import _Tracer
+
+
+@pytest.fixture
+def tracer(monkeypatch) -> _Tracer:
+    """An active tracer of its own (enable() would also register the atexit report)."""
+    t = _Tracer()
+    t.active = True
+    monkeypatch.setattr(trace, "TRACER", t)
+    return t
+
+
+def _rows(lines: list[str]) -> dict[tuple[str, str], list[str]]:
+    return {(row.split()[0], row.split()[1]): row.split()[2:] for row in lines[2:]}
+
+
+def test_span_is_a_no_op_when_off(monkeypatch):
+    monkeypatch.setattr(trace, "TRACER", _Tracer())
+    with trace.span("dbus", "Manager.GetUnit") as s:
+        assert s is None
+    assert trace.TRACER.spans == []
+
+
+def test_summary(tracer):
+    for _ in range(3):
+        with trace.span("dbus", "Manager.GetUnit", "/org/freedesktop/systemd1", 100) as s:
+            s.bytes_in = 50
+    with pytest.raises(ConnectionError):
+        with trace.span("exec", "journalctl"):
+            raise ConnectionError
+    with trace.span("agent", "ping") as s:
+        s.outcome = "error"
+
+    lines = trace.summary_lines()
+    assert lines[0].startswith("ww trace: 5 spans over ")
+    assert lines[1].split() == ["kind", "name", "count", "p50", "ms", "p95", "ms", "total", "ms", "bytes", "errors"]
+    rows = _rows(lines)
+    assert set(rows) == {("dbus", "Manager.GetUnit"), ("exec", "journalctl"), ("agent", "ping")}
+    count, *_, nbytes, errors = rows[("dbus", "Manager.GetUnit")]
+    assert (count, nbytes, errors) == ("3", "450", "0")
+    assert rows[("exec", "journalctl")][0] == "1" and rows[("exec", "journalctl")][-1] == "1"
+    assert rows[("agent", "ping")][-1] == "1"
+    assert tracer.spans[3].outcome == "ConnectionError"
+
+
+def test_chrome_trace_lanes(tracer):
+    with trace.span("dbus", "outer", "/a"):
+        with trace.span("dbus", "inner", "/b", 7):
+            pass
+    with trace.span("exec", "after"):
+        pass
+
+    doc = json.loads(json.dumps(trace.chrome_trace()))
+    assert doc["displayTimeUnit"] == "ms"
+    events = {e["name"]: e for e in doc["traceEvents"]}
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events.values())
+    # Overlapping spans get separate lanes; a later one reuses the first
+    assert (events["outer"]["tid"], events["inner"]["tid"], events["after"]["tid"]) == (1, 2, 1)
+    assert events["inner"]["cat"] == "dbus"
+    assert events["inner"]["args"] == {"target": "/b", "bytes_out": 7, "bytes_in": 0, "outcome": "ok"}
+    assert events["outer"]["ts"] <= events["inner"]["ts"] < events["after"]["ts"]
+
+
+def test_instrument_bus(tracer):
+    class Msg:
+        interface, member, path = "org.freedesktop.systemd1.Manager", "GetUnit", "/org/freedesktop/systemd1"
+
+    class Bus:
+        def _call(self, msg, callback):
+            callback(None, None)
+
+    bus = Bus()
+    trace.instrument_bus(bus)
+    replies = []
+    bus._call(Msg(), lambda reply, err: replies.append((reply, err)))
+    assert replies == [(None, None)]
+    assert [(s.kind, s.name, s.target) for s in tracer.spans] == [("dbus", "Manager.GetUnit", "/org/freedesktop/systemd1")]
+
+
+def test_an_unexpected_bus_is_left_alone(tracer):
+    class Other:
+        def _call(self, msg, reply_handler, timeout):
+            pass
+
+    class Bare:
+        pass
+
+    for bus in (Bare(), Other()):
+        trace.instrument_bus(bus)
+        assert "_call" not in vars(bus)
+    assert "not traced" in trace.summary_lines()[1]
+
+
+@pytest.mark.parametrize("fastpath", ["1", "0"])
+def test_ww_trace(ww, fake_systemd, tmp_path, fastpath):
+    fake_systemd.add_units(["ww-api.service"])
+    out = tmp_path / "trace.json"
+    r = ww("ps", WW_TRACE="1", WW_TRACE_JSON=str(out), WW_FASTPATH=fastpath)
+    assert r.returncode == 0, r.stderr
+    assert r.stdout.startswith("api\t")
+    lines = r.stderr.splitlines()
+    start = next(i for i, line in enumerate(lines) if line.startswith("ww trace: "))
+    rows = _rows(lines[start:])
+    assert ("dbus", "Manager.ListUnitsByPatterns") in rows
+    assert ("connect", "sync/session" if fastpath == "1" else "async/session") in rows
+    assert lines[-1] == f"ww trace: wrote {out}"
+
+    events = json.loads(out.read_text())["traceEvents"]
+    assert {e["name"] for e in events} >= {"Manager.ListUnitsByPatterns", "Properties.GetAll"}
+    assert len(events) == int(lines[start].split()[2])
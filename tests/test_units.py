@@ -0,0 +1,31 @@
+"""Unit names and systemd object paths."""
+
+from __future__ import annotations
+
+import pytest
+
+from watchfiles_systemd.units import unit_name_from_path, unit_object_path
+
+UNIT = "/org/freedesktop/systemd1/unit/"
+
+
+@pytest.mark.parametrize(
+    "name, label",
+    [
+        ("ww-test.service", "ww_2dtest_2eservice"),
+        ("dbus.service", "dbus_2eservice"),
+        ("ww-app-2.service", "ww_2dapp_2d2_2eservice"),
+        ("1foo.service", "_31foo_2eservice"),  # a leading digit is escaped, later ones are not
+        ("a_b@c.service", "a_5fb_40c_2eservice"),
+        ("wé.service", "w_c3_a9_2eservice"),  # UTF-8 bytes one by one
+        ("", "_"),
+    ],
+)
+def test_object_path_escaping(name, label):
+    assert unit_object_path(name) == UNIT + label
+    assert unit_name_from_path(UNIT + label) == name
+
+
+def test_paths_outside_the_unit_namespace():
+    assert unit_name_from_path("/org/freedesktop/systemd1/job/42") is None
+    assert unit_name_from_path("/org/freedesktop/systemd1") is None